@@ -1,22 +1,50 @@
 """
 Aplikacja Afirmator - generator spersonalizowanych afirmacji - wersja ulepszona.
 """
+import importlib
+import logging
+import time
 import streamlit as st
 
-# Importy modułów
+# Importy modułów - tylko lekkie moduły potrzebne do ekranu powitalnego.
+# Moduły zakładek (OpenAI SDK, Pillow, pydub) są ładowane przy pierwszym użyciu.
 from config.constants import DEFAULT_SESSION_STATE
-from modules.utils import init_session_state, check_api_key
-from modules.daily import display_daily_affirmation_section
-from modules.generator import display_generator_interface, generate_affirmation, display_affirmation_result
-from modules.visual_quote import display_visual_quote_section
-from modules.audio_player import display_audio_player_section
-from modules.musical_affirmation import display_musical_affirmation_section
-from services.openai_service import OpenAIService
+from modules.utils import init_session_state, check_api_key, load_persisted_history, get_session_id
+from modules.warmup import start_warmup
+from monitoring.timing import timed, begin_rerun, KIND_RERUN
+from monitoring.metrics import start_metrics_server, set_metrics_session
 from ui.styles import inject_custom_css
 from ui.sidebar import display_sidebar
 from ui.components import header, create_tabs, api_key_input, spacer
 
+logger = logging.getLogger(__name__)
 
+# Sekcje zakładek (klucze jak w TABS): moduł i funkcja wyświetlająca
+SECTIONS = {
+    "daily": ("modules.daily", "display_daily_affirmation_section"),
+    "generator": ("modules.generator", "display_generator_section"),
+    "visual": ("modules.visual_quote", "display_visual_quote_section"),
+    "reader": ("modules.audio_player", "display_audio_player_section"),
+    "music": ("modules.musical_affirmation", "display_musical_affirmation_section"),
+}
+
+def load_section(tab):
+    """
+    Importuje moduł zakładki i zwraca funkcję wyświetlającą jej sekcję.
+    
+    Args:
+        tab (str): Klucz zakładki (zob. TABS).
+        
+    Returns:
+        callable: Funkcja przyjmująca instancję serwisu OpenAI.
+    """
+    module_name, function_name = SECTIONS.get(tab, SECTIONS["daily"])
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms >= 1:
+        logger.info("Import %s: %.1f ms", module_name, elapsed_ms)
+    return getattr(module, function_name)
 
 def welcome_screen():
     """
@@ -92,6 +120,7 @@ def welcome_screen():
         st.session_state.api_key = key
         st.rerun()
 
+@timed(KIND_RERUN, name="rerun")
 def main():
     """
     Główna funkcja aplikacji
@@ -104,8 +133,18 @@ def main():
         initial_sidebar_state="expanded"
     )
     
+    # Pomiary czasu z tego przebiegu są grupowane pod wspólnym identyfikatorem
+    rerun_id = begin_rerun()
+    
+    # Rozgrzewka wspólnych zasobów i punkt końcowy /metrics (raz na proces serwera, w tle).
+    # Przy uruchomieniu przez serve.py oba działają już od startu serwera i te wywołania nic nie robią.
+    start_warmup()
+    start_metrics_server()
+    
     # Inicjalizacja stanu sesji
     init_session_state()
+    # Liczniki metryk z tego przebiegu trafiają też do statystyk sesji (panel boczny)
+    set_metrics_session(get_session_id())
     
     # Wstrzykiwanie CSS
     inject_custom_css()
@@ -115,7 +154,8 @@ def main():
         welcome_screen()
         return
     
-    # Inicjalizacja serwisu OpenAI
+    # Inicjalizacja serwisu OpenAI (SDK jest importowane dopiero po podaniu klucza)
+    from services.openai_service import OpenAIService
     try:
         openai_service = OpenAIService()
     except ValueError as e:
@@ -131,40 +171,19 @@ def main():
         welcome_screen()
         return
     
+    # Wczytanie ostatnich afirmacji z trwałej historii
+    load_persisted_history()
+    
     # Layout aplikacji
     header()
     
     # Wyświetlenie panelu bocznego
     display_sidebar()
     
-    # Główna zawartość - pięć zakładek!
-    tab1, tab2, tab3, tab4, tab5 = create_tabs()
-    
-    # Zakładka Afirmacja dnia
-    with tab1:
-        display_daily_affirmation_section(openai_service)
-    
-    # Zakładka Generator afirmacji
-    with tab2:
-        form_data = display_generator_interface()
-        
-        if form_data:
-            generate_affirmation(form_data, openai_service)
-            
-        # Wyświetlenie wyniku
-        display_affirmation_result(openai_service)
-    
-    # Zakładka Wizualny cytat
-    with tab3:
-        display_visual_quote_section()
-    
-    # Zakładka Czytanie afirmacji
-    with tab4:
-        display_audio_player_section(openai_service)
-        
-    # Zakładka Muzyczna afirmacja
-    with tab5:
-        display_musical_affirmation_section(openai_service)
+    # Główna zawartość - pięć zakładek, wykonywana jest tylko wybrana
+    current_tab = create_tabs()
+    display_section = load_section(current_tab)
+    display_section(openai_service)
     
     # Dodajemy stopkę
     spacer("2rem")
@@ -174,6 +193,9 @@ def main():
             <p>Afirmator V1.1 | Stworzone z ❤️ | © 2025</p>
         </div>
     """, unsafe_allow_html=True)
+    
+    # Panel deweloperski pokazuje pomiary zakończonego przebiegu
+    st.session_state.last_rerun_id = rerun_id
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -12,6 +12,75 @@ VOICE_OPTIONS = {
     "Spokojny uspokajający": "shimmer"
 }
 
+# Głos i prędkość zaznaczone domyślnie w ustawieniach czytania (i używane przez nagrania w tle)
+DEFAULT_VOICE_INDEX = 2
+DEFAULT_TTS_SPEED = 0.8
+
+# Pamięć podręczna nagrań TTS i nagrania przygotowywane w tle
+TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Łączny rozmiar nagrań w pamięci
+TTS_PREFETCH_BUDGET = 10  # Maksymalna liczba nagrań w tle na sesję
+TTS_PREFETCH_WORKERS = 2  # Liczba wątków przygotowujących nagrania
+
+# Odpowiedniki głosów OpenAI w lokalnym silniku espeak-ng (język polski + wariant głosu)
+LOCAL_VOICE_MAP = {
+    "alloy": "pl+f3",
+    "echo": "pl+m1",
+    "fable": "pl+m3",
+    "onyx": "pl+m2",
+    "nova": "pl+f2",
+    "shimmer": "pl+f4"
+}
+LOCAL_TTS_BINARY = "espeak-ng"  # Program lokalnej syntezy mowy
+LOCAL_TTS_BASE_WPM = 160  # Tempo (słowa na minutę) odpowiadające prędkości 1.0
+LOCAL_TTS_TIMEOUT = 20.0  # Limit czasu lokalnej syntezy (sek.)
+
+# Maksymalna liczba równoczesnych zapytań asynchronicznego serwisu OpenAI
+ASYNC_MAX_CONCURRENCY = 4
+
+# Limity zapytań do OpenAI API (zapytań na minutę) dla harmonogramu
+RATE_LIMITS = {
+    "gpt-4": 500,
+    "gpt-4o": 500,
+    "gpt-4o-mini": 500,
+    "tts-1": 50,
+    "tts-1-hd": 50
+}
+DEFAULT_RATE_LIMIT = 60  # Limit dla modeli spoza listy
+SCHEDULER_MAX_RETRIES = 4  # Maksymalna liczba ponowień po odpowiedzi 429
+SCHEDULER_BASE_BACKOFF = 1.0  # Bazowe opóźnienie ponowienia (sek.)
+SCHEDULER_MAX_BACKOFF = 30.0  # Maksymalne opóźnienie ponowienia (sek.)
+SCHEDULER_MAX_LIMIT_KEYS = 1000  # Maksymalna liczba par (klucz API, model) z własnym kubełkiem
+
+# Limity czasu wywołań OpenAI API (sek.) dla poszczególnych punktów końcowych
+API_DEADLINES = {
+    "chat": 20.0,
+    "chat_stream": 10.0,  # Limit na nawiązanie połączenia i każdy kolejny fragment
+    "tts": 30.0,
+    "probe": 5.0  # Sprawdzanie dostępności usługi w tle
+}
+
+# Routing modeli dla generowania afirmacji: modele w kolejności preferencji,
+# budżet opóźnienia p95 (sek.) i maksymalny koszt jednego wywołania (USD)
+MODEL_ROUTES = {
+    "daily": {"models": ["gpt-4", "gpt-4o-mini"], "latency_budget": 4.0, "cost_budget": 0.01},
+    "generator": {"models": ["gpt-4", "gpt-4o"], "latency_budget": 8.0, "cost_budget": 0.02},
+    "batch": {"models": ["gpt-4o-mini", "gpt-4o"], "latency_budget": 30.0, "cost_budget": 0.005}
+}
+
+# Orientacyjny koszt 1000 tokenów odpowiedzi (USD)
+MODEL_COSTS = {
+    "gpt-4": 0.06,
+    "gpt-4o": 0.01,
+    "gpt-4o-mini": 0.0006
+}
+LATENCY_WINDOW_SECONDS = 300  # Okno kroczące statystyk opóźnień (sek.)
+LATENCY_MIN_SAMPLES = 5  # Minimalna liczba próbek do oceny modelu
+ROUTER_MAX_FAILURE_RATE = 0.2  # Udział nieudanych wywołań w oknie, od którego model przekracza budżet
+
+# Bezpiecznik (circuit breaker) dla OpenAI API
+CIRCUIT_FAILURE_THRESHOLD = 3  # Liczba kolejnych awarii otwierająca bezpiecznik
+CIRCUIT_RECOVERY_TIMEOUT = 30.0  # Odstęp między próbami usługi w tle (sek.)
+
 # Predefiniowane podkłady muzyczne
 BACKGROUND_SOUNDS = {
     "Szum morza": "assets/sounds/ocean_waves.mp3",
@@ -41,7 +110,9 @@ DAILY_AFFIRMATION_TOPICS = [
 ]
 
 # Opcje dla formularza generowania afirmacji
-FOCUS_AREAS = ["Pewność siebie", "Motywacja", "Wyciszenie", "Relacje", "Zdrowie", "Bogactwo", "✨ Własne cele ✨"]
+CUSTOM_FOCUS_AREA = "✨ Własne cele ✨"
+
+FOCUS_AREAS = ["Pewność siebie", "Motywacja", "Wyciszenie", "Relacje", "Zdrowie", "Bogactwo", CUSTOM_FOCUS_AREA]
 
 EMOTION_STATES = [
     "Neutralnie", 
@@ -62,6 +133,16 @@ AFFIRMATION_TONES = [
     "Mocny i stanowczy"
 ]
 
+# Pula wcześniej wygenerowanych afirmacji generatora
+NAME_PLACEHOLDER = "[IMIĘ]"  # Znacznik imienia podmieniany lokalnie
+AFFIRMATION_POOL_SIZE = 5  # Docelowa liczba wariantów na kombinację opcji
+AFFIRMATION_POOL_LOW_WATERMARK = 1  # Poniżej tej liczby kubełek jest uzupełniany
+AFFIRMATION_POOL_WORKERS = 2  # Liczba wątków uzupełniających pulę
+
+# Tryb wariantów generatora
+AFFIRMATION_VARIANTS = 3  # Liczba wariantów generowanych w jednym zapytaniu
+VARIANT_CACHE_SIZE = 10  # Liczba zapamiętanych zestawów wariantów na sesję
+
 # Predefiniowane rozmiary obrazków
 IMAGE_SIZES = {
     "Instagram (1080x1080)": (1080, 1080),
@@ -92,6 +173,61 @@ import os
 # Ścieżka do folderu z czcionkami (względem głównego katalogu)
 FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets", "fonts")
 
+# Trwała historia afirmacji (SQLite)
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+HISTORY_DB_PATH = os.path.join(DATA_DIR, "history.db")
+HISTORY_PAGE_SIZE = 20  # Liczba afirmacji na stronie wyników w panelu bocznym
+SESSION_HISTORY_LIMIT = 50  # Liczba ostatnich afirmacji przechowywanych w sesji
+
+# Wykrywanie prawie identycznych afirmacji w historii (MinHash + LSH)
+MINHASH_PERMUTATIONS = 64  # Długość sygnatury MinHash
+MINHASH_BANDS = 32  # Liczba pasm LSH (po 2 wartości sygnatury)
+MINHASH_SHINGLE_SIZE = 5  # Długość fragmentu tekstu w znakach
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Podobieństwo, od którego afirmacje są scalane
+SIMILAR_AFFIRMATION_THRESHOLD = 0.3  # Podobieństwo dla zapytań "podobne do tej"
+
+# Wspólny magazyn nagrań sesji (adresowany treścią)
+BLOB_MEMORY_LIMIT = 256 * 1024 * 1024  # Rozmiar nagrań w pamięci, nadmiar trafia na dysk
+BLOB_SESSION_QUOTA = 64 * 1024 * 1024  # Łączny rozmiar nagrań jednej sesji
+BLOB_TTL_SECONDS = 60 * 60  # Po takim czasie bezczynności nagrania sesji są zwalniane
+BLOB_SPILL_DIR = os.path.join(DATA_DIR, "blobs")  # Każdy proces serwera ma tu własny podkatalog
+
+# Klucz serwisowy OpenAI, którym uzupełniana jest wspólna pula afirmacji generatora;
+# bez niego pula jest wyłączona, a każda afirmacja powstaje na żywo kluczem użytkownika
+AFFIRMATION_POOL_API_KEY = os.environ.get("AFIRMATOR_POOL_API_KEY")
+
+# Współdzielone pamięci podręczne zasobów i rozgrzewka procesu serwera
+FONT_CACHE_SIZE = 512  # Liczba załadowanych czcionek (plik i rozmiar)
+GRADIENT_CACHE_SIZE = 32  # Liczba zapamiętanych teł gradientowych
+GRADIENT_CACHE_MAX_PIXELS = 1920 * 1080  # Większe tła (np. A4) nie są zapamiętywane
+WARMUP_IMAGE_SIZES = ["Instagram (1080x1080)"]  # Rozmiary, dla których gradienty powstają przy starcie
+WARMUP_FONT_SIZES = tuple(range(60, 18, -2))  # Rozmiary sprawdzane przy domyślnym rozmiarze czcionki
+
+# Pomiary czasu sekcji i wywołań usług (monitoring/timing.py)
+DEV_PANEL_ENABLED = os.environ.get("AFIRMATOR_DEV_PANEL", "") == "1"  # Panel deweloperski w panelu bocznym
+TIMING_LOG_PATH = os.environ.get("AFIRMATOR_TIMING_LOG")  # Plik JSON Lines z każdym pomiarem (opcjonalnie)
+TIMING_WINDOW_SECONDS = 600  # Okno kroczące statystyk
+TIMING_MAX_SAMPLES = 1000  # Maksymalna liczba pomiarów jednej nazwy w oknie
+TIMING_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)  # Granice przedziałów histogramu
+
+# Metryki Prometheus (monitoring/metrics.py)
+METRICS_HOST = os.environ.get("AFIRMATOR_METRICS_HOST", "127.0.0.1")  # Domyślnie tylko lokalnie
+METRICS_PORT = int(os.environ.get("AFIRMATOR_METRICS_PORT", "9464"))  # 0 wyłącza punkt końcowy /metrics
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # Sekundy
+METRICS_MAX_SESSIONS = 1000  # Liczba sesji, dla których liczniki pamiętają wartości (panel boczny)
+
+# Śledzenie akcji użytkownika (monitoring/tracing.py); pusta wartość AFIRMATOR_TRACE_LOG wyłącza zapis
+TRACE_LOG_PATH = os.environ.get("AFIRMATOR_TRACE_LOG", os.path.join(DATA_DIR, "traces.jsonl"))
+TRACE_LOG_MAX_BYTES = 10 * 1024 * 1024  # Po przekroczeniu plik jest przenoszony do traces.jsonl.1
+
+# Profilowanie operacji (monitoring/profiling.py): każde wywołanie albo losowa część wywołań
+PROFILE_ENABLED = os.environ.get("AFIRMATOR_PROFILE", "") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("AFIRMATOR_PROFILE_SAMPLE", "0"))  # Np. 0.05 = co dwudzieste wywołanie
+PROFILE_DIR = os.environ.get("AFIRMATOR_PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+PROFILE_MAX_CAPTURES = 200  # Starsze pomiary są usuwane
+PROFILE_TOP_ALLOCATIONS = 25  # Liczba miejsc alokacji zapisywanych z każdego pomiaru
+PROFILE_TRACEMALLOC_FRAMES = 10  # Głębokość stosu zapisywana przez tracemalloc
+
 # Predefiniowane style czcionek
 FONT_STYLES = {
     "Klasyczny": {"font": os.path.join(FONT_DIR, "Lato-Regular.ttf"), "style": "normal"},
@@ -116,21 +252,57 @@ DPI_OPTIONS = {
     "Ekran/Web (72 DPI)": 72
 }
 
+# Zakładki aplikacji (klucz stanu sesji "current_tab" -> etykieta)
+TABS = {
+    "daily": "🌟 Afirmacja dnia",
+    "generator": "🛠️ Generator afirmacji",
+    "visual": "🎨 Wizualny cytat",
+    "reader": "🎧 Czytanie afirmacji",
+    "music": "🎵 Muzyczna afirmacja",
+}
+
+# Klucze widżetów zakładek, których wartości są zachowywane, gdy zakładka jest ukryta.
+# Bez przycisków i pól przesyłania plików (Streamlit nie pozwala ustawiać ich wartości)
+# oraz list afirmacji z historii (ich opcje zmieniają się między odświeżeniami).
+TAB_WIDGET_KEYS = {
+    "daily": ("daily_name_input",),
+    "generator": (
+        "generator_user_name", "generator_focus_area", "generator_specific_goal",
+        "generator_emotion_state", "generator_preferred_style", "generator_affirmation_length",
+        "generator_affirmation_timing", "generator_affirmation_tone", "generator_variant_mode",
+    ),
+    "visual": (
+        "text_source_radio", "custom_affirmation", "visual_background_type", "visual_gradient_preset",
+        "visual_gradient_direction", "gradient_start_color", "gradient_end_color", "visual_size_preset",
+        "visual_dpi", "visual_custom_width", "visual_custom_height", "visual_text_color",
+        "custom_text_color_picker", "custom_shadow_color_picker", "font_style_selector",
+        "visual_text_position", "visual_custom_x", "visual_custom_y", "visual_font_size",
+    ),
+    "reader": (
+        "audio_player_text_source", "audio_player_custom_text", "audio_player_voice_select",
+        "audio_player_speed_slider", "audio_player_preview",
+    ),
+    "music": (
+        "music_aff_text_source", "music_aff_custom_text", "music_aff_voice_select",
+        "music_aff_speed_slider", "music_aff_repetitions", "music_aff_pause",
+        "music_aff_sound_source", "music_aff_bg_select", "music_aff_bg_volume",
+    ),
+}
+
 # Początkowe wartości sesji
 DEFAULT_SESSION_STATE = {
     'editing': False,
     'edited_affirmation': "",
-    'audio_data': None,
+    'audio_data': None,  # Identyfikator nagrania w magazynie (services/blob_store.py)
     'affirmation': "",
     'selected_voice': "fable",
     'api_key': "",
-    'history': [],
     'daily_affirmation': None,
     'daily_affirmation_name': "",
     'show_daily_affirmation_input': True,
-    'show_daily_affirmation': False,
-    'daily_audio_data': None,
-    'player_audio_data': None,
-    'music_affirmation_audio': None,
+    'daily_audio_data': None,  # Identyfikator nagrania w magazynie (services/blob_store.py)
+    'player_audio_data': None,  # Identyfikator nagrania w magazynie (services/blob_store.py)
+    'music_affirmation_audio': None,  # Identyfikator nagrania w magazynie (services/blob_store.py)
+    'injected_css': None,  # Skrót arkusza stylów wysłanego już w tej sesji (ui/styles.py)
     'current_tab': "daily"  # Domyślnie pokazujemy zakładkę "Afirmacja dnia"
 }
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Wyselekcjonowane afirmacje używane, gdy OpenAI API jest niedostępne.
+
+Każda afirmacja ma przypisane tematy z DAILY_AFFIRMATION_TOPICS i obszary
+z FOCUS_AREAS. Znacznik {name} jest zastępowany imieniem użytkownika.
+"""
+
+FALLBACK_AFFIRMATIONS = [
+    {
+        "text": "Ja, {name}, wybieram dziś radość i dostrzegam dobro w każdej chwili. Mój uśmiech dodaje energii mnie i innym.",
+        "topics": ["ogólna pozytywność i dobry nastrój"],
+        "focus": ["Motywacja"]
+    },
+    {
+        "text": "Ja, {name}, budzę się z lekkością i ciekawością. Każdy dzień przynosi mi nowe powody do zadowolenia.",
+        "topics": ["ogólna pozytywność i dobry nastrój"],
+        "focus": ["Motywacja", "Zdrowie"]
+    },
+    {
+        "text": "Ja, {name}, jestem wdzięczny/a za to, co mam. Zauważam małe dary codzienności i pozwalam im wypełnić mnie spokojem.",
+        "topics": ["wdzięczność i docenianie życia"],
+        "focus": ["Wyciszenie", "Bogactwo"]
+    },
+    {
+        "text": "Ja, {name}, doceniam swoje życie takim, jakie jest dziś. Z wdzięcznością przyjmuję ludzi i chwile, które mnie otaczają.",
+        "topics": ["wdzięczność i docenianie życia", "relacje z innymi ludźmi"],
+        "focus": ["Relacje"]
+    },
+    {
+        "text": "Ja, {name}, mam w sobie siłę, by poradzić sobie z każdym wyzwaniem. Z każdej trudności wychodzę mądrzejszy/a i silniejszy/a.",
+        "topics": ["siła wewnętrzna i odporność"],
+        "focus": ["Pewność siebie", "Motywacja"]
+    },
+    {
+        "text": "Ja, {name}, jestem odporny/a i elastyczny/a. Gdy coś idzie nie tak, oddycham głęboko i spokojnie szukam rozwiązania.",
+        "topics": ["siła wewnętrzna i odporność", "spokój umysłu i redukcja stresu"],
+        "focus": ["Wyciszenie"]
+    },
+    {
+        "text": "Ja, {name}, działam z koncentracją i lekkością. Moje pomysły płyną swobodnie, a każde zadanie przybliża mnie do celu.",
+        "topics": ["produktywność i kreatywność"],
+        "focus": ["Motywacja"]
+    },
+    {
+        "text": "Ja, {name}, pozwalam sobie tworzyć bez lęku przed oceną. Moja kreatywność rośnie z każdym krokiem, który dziś stawiam.",
+        "topics": ["produktywność i kreatywność", "rozwój osobisty i samodoskonalenie"],
+        "focus": ["Pewność siebie"]
+    },
+    {
+        "text": "Ja, {name}, oddycham spokojnie i wracam do chwili obecnej. Mój umysł jest jasny, a ciało rozluźnione.",
+        "topics": ["spokój umysłu i redukcja stresu"],
+        "focus": ["Wyciszenie", "Zdrowie"]
+    },
+    {
+        "text": "Ja, {name}, odpuszczam to, na co nie mam wpływu. Wybieram spokój i łagodność wobec siebie.",
+        "topics": ["spokój umysłu i redukcja stresu", "pewność siebie i samoakceptacja"],
+        "focus": ["Wyciszenie"]
+    },
+    {
+        "text": "Ja, {name}, w pełni akceptuję siebie. Jestem wystarczający/a dokładnie taki/a, jaki/a jestem.",
+        "topics": ["pewność siebie i samoakceptacja"],
+        "focus": ["Pewność siebie"]
+    },
+    {
+        "text": "Ja, {name}, mówię swoim głosem i ufam swoim decyzjom. Moja pewność siebie rośnie z każdym dniem.",
+        "topics": ["pewność siebie i samoakceptacja", "sukces i osiąganie celów"],
+        "focus": ["Pewność siebie"]
+    },
+    {
+        "text": "Ja, {name}, dbam o swoje ciało z czułością. Każdy zdrowy wybór napełnia mnie energią i witalnością.",
+        "topics": ["zdrowie i dobre samopoczucie"],
+        "focus": ["Zdrowie"]
+    },
+    {
+        "text": "Ja, {name}, słucham potrzeb swojego ciała. Odpoczywam, gdy tego potrzebuję, i czuję się coraz lepiej.",
+        "topics": ["zdrowie i dobre samopoczucie", "spokój umysłu i redukcja stresu"],
+        "focus": ["Zdrowie", "Wyciszenie"]
+    },
+    {
+        "text": "Ja, {name}, buduję relacje oparte na szacunku i życzliwości. Otaczam się ludźmi, którzy mnie wspierają.",
+        "topics": ["relacje z innymi ludźmi"],
+        "focus": ["Relacje"]
+    },
+    {
+        "text": "Ja, {name}, słucham innych z otwartym sercem. Moja obecność daje bliskim poczucie bezpieczeństwa i ciepła.",
+        "topics": ["relacje z innymi ludźmi"],
+        "focus": ["Relacje"]
+    },
+    {
+        "text": "Ja, {name}, codziennie robię mały krok w stronę lepszej wersji siebie. Uczę się z ciekawością i cierpliwością.",
+        "topics": ["rozwój osobisty i samodoskonalenie"],
+        "focus": ["Motywacja", "Pewność siebie"]
+    },
+    {
+        "text": "Ja, {name}, traktuję każde doświadczenie jako lekcję. Rozwijam się w swoim tempie i jestem z siebie dumny/a.",
+        "topics": ["rozwój osobisty i samodoskonalenie", "siła wewnętrzna i odporność"],
+        "focus": ["Motywacja"]
+    },
+    {
+        "text": "Ja, {name}, jasno widzę swoje cele i konsekwentnie do nich zmierzam. Sukces przychodzi do mnie naturalnie.",
+        "topics": ["sukces i osiąganie celów"],
+        "focus": ["Motywacja", "Bogactwo"]
+    },
+    {
+        "text": "Ja, {name}, zasługuję na dostatek. Otwieram się na nowe możliwości i mądrze korzystam z tego, co otrzymuję.",
+        "topics": ["sukces i osiąganie celów", "wdzięczność i docenianie życia"],
+        "focus": ["Bogactwo"]
+    },
+    {
+        "text": "Ja, {name}, przyciągam obfitość dzięki swojej pracy i talentom. Pieniądze płyną do mnie w zdrowy i spokojny sposób.",
+        "topics": ["sukces i osiąganie celów"],
+        "focus": ["Bogactwo"]
+    },
+    {
+        "text": "Ja, {name}, wierzę w swoje możliwości. Każde wyzwanie traktuję jako okazję, by pokazać, na co mnie stać.",
+        "topics": ["pewność siebie i samoakceptacja", "siła wewnętrzna i odporność"],
+        "focus": ["Pewność siebie", "Motywacja"]
+    },
+]
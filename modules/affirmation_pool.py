@@ -0,0 +1,206 @@
+"""
+Pula wcześniej wygenerowanych afirmacji dla kombinacji opcji generatora.
+
+Afirmacje w puli zawierają znacznik imienia, który jest podmieniany lokalnie, i powstają
+wyłącznie z opcji wybieranych z listy (bez imienia i własnych celów), więc nie zawierają
+danych osobowych i kubełek obsługuje wszystkich użytkowników z tymi samymi opcjami.
+Pula jest uzupełniana serwisowym kluczem API (AFIRMATOR_POOL_API_KEY), a nie kluczem
+użytkownika, który akurat ją opróżnił; bez tego klucza pula jest wyłączona.
+Brakujące warianty kubełka są generowane równolegle przez asynchroniczny serwis OpenAI.
+"""
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from services.scheduler import PRIORITY_BACKGROUND
+from services.async_openai_service import AsyncOpenAIService, gather_sync
+from monitoring.metrics import record_cache
+from config.constants import (
+    AFFIRMATION_POOL_SIZE,
+    AFFIRMATION_POOL_LOW_WATERMARK,
+    AFFIRMATION_POOL_WORKERS,
+    AFFIRMATION_POOL_API_KEY,
+    CUSTOM_FOCUS_AREA,
+    NAME_PLACEHOLDER,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pola formularza wyznaczające kubełek puli (bez imienia użytkownika)
+POOL_KEY_FIELDS = (
+    "focus_area",
+    "emotion_state",
+    "preferred_style",
+    "affirmation_length",
+    "affirmation_timing",
+    "affirmation_tone",
+)
+
+def pool_key(form_data):
+    """
+    Zwraca klucz kubełka puli dla danych z formularza (wspólny dla wszystkich użytkowników).
+
+    Args:
+        form_data (dict): Dane z formularza generatora.
+
+    Returns:
+        tuple: Klucz kubełka lub None, jeśli afirmacji nie można brać z puli.
+    """
+    if form_data["focus_area"] == CUSTOM_FOCUS_AREA:
+        # Własne cele są unikalne (i osobiste) - zawsze generujemy je na żywo
+        return None
+    return tuple(form_data[field] for field in POOL_KEY_FIELDS)
+
+def fill_name(template, user_name):
+    """
+    Wstawia imię użytkownika w miejsce znacznika.
+
+    Args:
+        template (str): Afirmacja ze znacznikiem imienia.
+        user_name (str): Imię użytkownika.
+
+    Returns:
+        str: Spersonalizowana afirmacja.
+    """
+    return template.replace(NAME_PLACEHOLDER, user_name)
+
+class AffirmationPool:
+    """Pula afirmacji z uzupełnianiem w tle."""
+
+    def __init__(self, target_size=AFFIRMATION_POOL_SIZE, low_watermark=AFFIRMATION_POOL_LOW_WATERMARK,
+                 max_workers=AFFIRMATION_POOL_WORKERS, api_key=AFFIRMATION_POOL_API_KEY):
+        """
+        Inicjalizuje pustą pulę.
+
+        Args:
+            target_size (int, optional): Docelowa liczba wariantów w kubełku.
+            low_watermark (int, optional): Liczba wariantów, poniżej której kubełek jest uzupełniany.
+            max_workers (int, optional): Liczba wątków uzupełniających pulę.
+            api_key (str, optional): Serwisowy klucz API do uzupełniania puli (None wyłącza pulę).
+        """
+        self.target_size = target_size
+        self.low_watermark = low_watermark
+        self.api_key = api_key
+        self._service = None
+        self._buckets = {}
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="afirmator-pool")
+
+    @property
+    def enabled(self):
+        """Czy pula działa (skonfigurowano serwisowy klucz API)."""
+        return bool(self.api_key)
+
+    def _get_service(self):
+        """
+        Zwraca serwis OpenAI z kluczem serwisowym, tworząc go przy pierwszym uzupełnianiu.
+
+        Returns:
+            AsyncOpenAIService: Asynchroniczny serwis OpenAI puli.
+        """
+        with self._lock:
+            if self._service is None:
+                # SDK OpenAI jest importowane dopiero przy pierwszym uzupełnianiu puli
+                from services.openai_service import OpenAIService
+                self._service = AsyncOpenAIService(OpenAIService(api_key=self.api_key))
+            return self._service
+
+    def take(self, key, user_name):
+        """
+        Pobiera (i usuwa) wariant afirmacji z kubełka.
+
+        Args:
+            key (tuple): Klucz kubełka.
+            user_name (str): Imię użytkownika.
+
+        Returns:
+            str: Spersonalizowana afirmacja lub None, jeśli kubełek jest pusty.
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if not bucket:
+                record_cache("affirmation_pool", False)
+                return None
+            template = bucket.popleft()
+        record_cache("affirmation_pool", True)
+        return fill_name(template, user_name)
+
+    def size(self, key):
+        """
+        Zwraca liczbę wariantów w kubełku.
+
+        Args:
+            key (tuple): Klucz kubełka.
+
+        Returns:
+            int: Liczba dostępnych wariantów.
+        """
+        with self._lock:
+            return len(self._buckets.get(key, ()))
+
+    def refill_async(self, key, prompt):
+        """
+        Zleca uzupełnienie kubełka w tle kluczem serwisowym, jeśli jest prawie pusty.
+
+        Args:
+            key (tuple): Klucz kubełka.
+            prompt (str): Prompt ze znacznikiem imienia (bez danych użytkownika).
+
+        Returns:
+            bool: True jeśli zlecono uzupełnienie.
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            if key in self._refilling or len(self._buckets.get(key, ())) > self.low_watermark:
+                return False
+            self._refilling.add(key)
+        self._executor.submit(self._refill, key, prompt)
+        return True
+
+    def _refill(self, key, prompt):
+        """
+        Generuje brakujące warianty afirmacji dla kubełka.
+
+        Args:
+            key (tuple): Klucz kubełka.
+            prompt (str): Prompt ze znacznikiem imienia.
+        """
+        try:
+            openai_service = self._get_service()
+            missing = self.target_size - self.size(key)
+            # Warianty powstają równolegle (w granicach semafora serwisu i limitów harmonogramu)
+            results = gather_sync(
+                *(
+                    openai_service.generate_affirmation(prompt, priority=PRIORITY_BACKGROUND, use_case="batch")
+                    for _ in range(missing)
+                ),
+                return_exceptions=True
+            )
+            for template in results:
+                if isinstance(template, Exception):
+                    logger.warning("Nie udało się wygenerować wariantu do puli: %s", str(template))
+                    continue
+                # Odrzucamy warianty, w których model nie zachował znacznika imienia
+                if NAME_PLACEHOLDER not in template:
+                    continue
+                with self._lock:
+                    self._buckets.setdefault(key, deque()).append(template)
+        except Exception:
+            logger.exception("Nie udało się uzupełnić puli afirmacji")
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+# Pula współdzielona przez wszystkie sesje procesu serwera
+_affirmation_pool = AffirmationPool()
+
+def get_affirmation_pool():
+    """
+    Zwraca pulę afirmacji (jedna na proces serwera, wspólna dla użytkowników).
+
+    Returns:
+        AffirmationPool: Pula afirmacji.
+    """
+    return _affirmation_pool
@@ -3,8 +3,12 @@ Funkcje związane z obsługą audio - wersja ulepszona.
 """
 import base64
 import streamlit as st
-from config.constants import VOICE_OPTIONS
+from config.constants import VOICE_OPTIONS, DEFAULT_VOICE_INDEX
+from services.tts import synthesize_speech, local_tts, BACKEND_LOCAL
+from modules.utils import put_session_blob, get_session_blob
 from ui.components import button_with_icon
+from monitoring.metrics import record_bytes_served
+from monitoring.tracing import trace
 
 def display_audio_options(openai_service, text, audio_state_key='audio_data', horizontal=True):
     """
@@ -23,22 +27,34 @@ def display_audio_options(openai_service, text, audio_state_key='audio_data', ho
     voice_label = st.radio(
         "Wybierz głos narracji:",
         options=list(VOICE_OPTIONS.keys()),
-        index=2,
+        index=DEFAULT_VOICE_INDEX,
         key=f"{audio_state_key}_voice_selection",
         horizontal=horizontal,
         help="Wybierz głos, który najbardziej Ci odpowiada"
     )
     selected_voice = VOICE_OPTIONS[voice_label]
     
+    # Szybki podgląd lokalnym głosem (bez kosztów API), o ile silnik jest zainstalowany
+    preview = local_tts.is_available() and st.toggle(
+        "Szybki podgląd (głos lokalny)",
+        key=f"{audio_state_key}_preview",
+        help="Lokalny syntezator jest natychmiastowy i bezpłatny, ale brzmi mniej naturalnie"
+    )
+    
     # Przycisk generowania
     if button_with_icon("Odsłuchaj", "🎧", key=f"{audio_state_key}_button"):
         try:
-            with st.spinner("🎵 Generuję audio..."):
-                audio_data = openai_service.generate_affirmation_audio(
+            with st.spinner("🎵 Generuję audio..."), trace("speech.generate", preview=bool(preview)):
+                audio_data, backend = synthesize_speech(
+                    openai_service,
                     text,
-                    voice=selected_voice
+                    voice=selected_voice,
+                    preview=preview
                 )
-                st.session_state[audio_state_key] = audio_data
+                put_session_blob(audio_state_key, audio_data)
+                record_bytes_served(audio_data, "speech")
+                if backend == BACKEND_LOCAL and not preview:
+                    st.toast("Serwis AI jest chwilowo niedostępny - użyto lokalnego głosu.", icon='🔈')
                 st.success("✅ Audio gotowe!")
         except Exception as e:
             st.error(f"❌ Błąd generowania audio: {str(e)}")
@@ -50,21 +66,22 @@ def display_audio_player(audio_data_key, download_filename="afirmacja.mp3"):
     Wyświetla odtwarzacz audio i link do pobrania z ulepszonym wyglądem.
     
     Args:
-        audio_data_key (str): Klucz stanu sesji zawierający dane audio.
+        audio_data_key (str): Klucz stanu sesji z identyfikatorem nagrania w magazynie.
         download_filename (str, optional): Nazwa pliku do pobrania. Domyślnie "afirmacja.mp3".
         
     Returns:
         bool: True jeśli dane audio są dostępne i wyświetlone, False w przeciwnym razie.
     """
-    if audio_data_key in st.session_state and st.session_state[audio_data_key]:
+    audio_data = get_session_blob(audio_data_key)
+    if audio_data:
         # Odtwarzacz w ładnej karcie
         col1, col2, col3 = st.columns([1, 2, 1])
         
         with col2:
-            st.audio(st.session_state[audio_data_key], format="audio/mp3")
+            st.audio(audio_data, format="audio/mp3")
             
             # Link do pobrania
-            b64 = base64.b64encode(st.session_state[audio_data_key]).decode()
+            b64 = base64.b64encode(audio_data).decode()
             download_href = f"""
                 <div style="text-align: center; margin-top: 1rem;">
                     <a href="data:file/mp3;base64,{b64}" 
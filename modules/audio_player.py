@@ -3,9 +3,15 @@ Moduł obsługujący dedykowaną zakładkę do czytania afirmacji.
 """
 import streamlit as st
 import base64
-from config.constants import VOICE_OPTIONS
-from ui.components import affirmation_card, centered_text, spacer
+from config.constants import VOICE_OPTIONS, DEFAULT_VOICE_INDEX, DEFAULT_TTS_SPEED
+from services.tts import synthesize_speech, local_tts, BACKEND_LOCAL
+from modules.utils import put_session_blob, get_session_blob
+from monitoring.timing import timed, KIND_SECTION
+from monitoring.metrics import record_bytes_served
+from monitoring.tracing import trace
+from ui.components import affirmation_card, centered_text, spacer, section_header
 
+@timed(KIND_SECTION)
 def display_audio_player_section(openai_service):
     """
     Wyświetla sekcję odtwarzacza afirmacji z zaawansowanymi opcjami audio.
@@ -13,14 +19,7 @@ def display_audio_player_section(openai_service):
     Args:
         openai_service (OpenAIService): Instancja serwisu OpenAI.
     """
-    spacer("2.5rem")
-    st.markdown("<h2 style='text-align: center;'> Czytanie Afirmacji</h2>", unsafe_allow_html=True)
-    st.markdown("""
-        <div style="text-align: center; width: 100%;">
-            <h8> Dostosuj sposób czytania afirmacji do swoich potrzeb </h8>
-        </div>
-    """, unsafe_allow_html=True)    
-    spacer("1.5rem")
+    section_header("Czytanie Afirmacji", "Dostosuj sposób czytania afirmacji do swoich potrzeb")
     
     # Główna zawartość w kolumnach
     col1, col2, col3 = st.columns([1, 3, 1])
@@ -40,7 +39,7 @@ def display_audio_player_section(openai_service):
             if st.session_state.history:
                 selected_affirmation = st.selectbox(
                     "Wybierz afirmację:",
-                    st.session_state.history,
+                    st.session_state.history.to_list(),
                     format_func=lambda x: x[:100] + "..." if len(x) > 100 else x,
                     key="audio_player_affirmation_select"
                 )
@@ -85,39 +84,52 @@ def display_audio_player_section(openai_service):
         voice_label = st.selectbox(
             "Głos:",
             options=list(VOICE_OPTIONS.keys()),
-            index=2,
+            index=DEFAULT_VOICE_INDEX,
             help="Wybierz głos, który najbardziej Ci odpowiada",
             key="audio_player_voice_select"
         )
         selected_voice = VOICE_OPTIONS[voice_label]
         
 
-        # Prędkość mówienia - zmieniona domyślna prędkość na 0.8
+        # Prędkość mówienia - domyślną prędkością powstają też nagrania w tle
         speed = st.slider(
             "Prędkość:",
             min_value=0.5,
             max_value=1.5,
-            value=0.8,  # Domyślna prędkość 0.8
+            value=DEFAULT_TTS_SPEED,
             step=0.05,
             help="Ustaw prędkość mówienia (0.5 = wolno, 1.0 = normalnie, 1.5 = szybko)",
             key="audio_player_speed_slider"
         )
         
+        # Szybki podgląd lokalnym głosem (bez kosztów API), o ile silnik jest zainstalowany
+        preview = local_tts.is_available() and st.toggle(
+            "Szybki podgląd (głos lokalny)",
+            key="audio_player_preview",
+            help="Lokalny syntezator jest natychmiastowy i bezpłatny, ale brzmi mniej naturalnie"
+        )
+        
         # Przycisk generowania
         if st.button("🎵 Generuj Audio", use_container_width=True, key="audio_player_generate_btn"):
             try:
-                with st.spinner("Generuję audio z Twoją afirmacją..."):
-                    audio_data = openai_service.generate_affirmation_audio(
+                with st.spinner("Generuję audio z Twoją afirmacją..."), trace("speech.generate", preview=bool(preview)):
+                    audio_data, backend = synthesize_speech(
+                        openai_service,
                         selected_affirmation,
                         voice=selected_voice,
-                        speed=speed
+                        speed=speed,
+                        preview=preview
                     )
-                    st.session_state.player_audio_data = audio_data
+                    put_session_blob('player_audio_data', audio_data)
+                    record_bytes_served(audio_data, "speech")
+                    if backend == BACKEND_LOCAL and not preview:
+                        st.toast("Serwis AI jest chwilowo niedostępny - użyto lokalnego głosu.", icon='🔈')
             except Exception as e:
                 st.error(f"❌ Błąd podczas generowania audio: {str(e)}")
         
         # Wyświetlenie odtwarzacza audio jeśli wygenerowano audio
-        if 'player_audio_data' in st.session_state and st.session_state.player_audio_data:
+        player_audio_data = get_session_blob('player_audio_data')
+        if player_audio_data:
             st.markdown("---")
             st.markdown("""
                 <div style="text-align: center; width: 100%;">
@@ -125,10 +137,10 @@ def display_audio_player_section(openai_service):
                 </div>
             """, unsafe_allow_html=True)
             spacer("2rem")  # Dodanie większego odstępu
-            st.audio(st.session_state.player_audio_data, format="audio/mp3")
+            st.audio(player_audio_data, format="audio/mp3")
             
             # Link do pobrania
-            b64 = base64.b64encode(st.session_state.player_audio_data).decode()
+            b64 = base64.b64encode(player_audio_data).decode()
             filename = f"afirmacja_{voice_label.lower().replace(' ', '_')}_{speed}.mp3"
             download_href = f"""
                 <div style="text-align: center; margin-top: 1rem;">
@@ -1,32 +1,30 @@
 """
 Moduł obsługujący funkcjonalność afirmacji dnia - wersja ulepszona.
 """
-import random
+import datetime
 import streamlit as st
-from config.constants import DAILY_AFFIRMATION_TOPICS
 from services.openai_service import OpenAIService
-from ui.components import affirmation_card, spacer
-from modules.utils import save_to_history
+from services.circuit_breaker import ServiceUnavailableError
+from ui.components import affirmation_card, stream_affirmation_card, section_header
+from modules.utils import save_to_history, get_user_id
+from modules.speech_prefetch import prefetch_speech, cancel_speech_prefetch
+from modules.daily_store import get_daily_store, select_daily_topic
+from modules.fallback import fallback_corpus
+from monitoring.timing import timed, KIND_SECTION
+from monitoring.tracing import trace
 
-def generate_daily_affirmation(client, user_name):
+def _build_daily_prompt(user_name, daily_topic):
     """
-    Generuje afirmację dnia dla użytkownika.
+    Tworzy prompt dla afirmacji dnia.
     
     Args:
-        client (OpenAIService): Instancja klienta OpenAI.
         user_name (str): Imię użytkownika.
+        daily_topic (str): Temat afirmacji dnia.
         
     Returns:
-        str: Wygenerowana afirmacja dnia lub None w przypadku braku imienia.
+        str: Prompt dla modelu.
     """
-    if not user_name:
-        return None
-        
-    # Losowy wybór tematu afirmacji dnia
-    daily_topic = random.choice(DAILY_AFFIRMATION_TOPICS)
-    
-    # Tworzenie promptu dla afirmacji dnia
-    prompt = f"""
+    return f"""
     Stwórz krótką, inspirującą afirmację dnia dla {user_name} w języku polskim, która:
     1. Będzie skupiona na temacie: {daily_topic}
     2. Zaczyna się od "Ja, {user_name},"
@@ -36,12 +34,79 @@ def generate_daily_affirmation(client, user_name):
     6. Jest sformułowana w pierwszej osobie
     7. Zawiera element, który można zastosować w codziennym życiu
     """
+
+def stream_daily_affirmation(client, user_name, daily_topic=None):
+    """
+    Generuje afirmację dnia dla użytkownika, zwracając kolejne fragmenty tekstu.
+    
+    Args:
+        client (OpenAIService): Instancja klienta OpenAI.
+        user_name (str): Imię użytkownika.
+        daily_topic (str, optional): Temat afirmacji. Domyślnie temat dnia użytkownika.
+        
+    Returns:
+        iterator: Strumień fragmentów afirmacji dnia.
+    """
+    daily_topic = daily_topic or select_daily_topic(user_name)
+    prompt = _build_daily_prompt(user_name, daily_topic)
+    return client.generate_affirmation_stream(prompt, max_tokens=120, use_case="daily")
+
+def _show_daily_affirmation(openai_service, user_name, use_store=True, placeholder=None):
+    """
+    Zwraca afirmację dnia z magazynu lub generuje ją strumieniowo.
+    
+    Args:
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+        user_name (str): Imię użytkownika.
+        use_store (bool, optional): Czy odczytać afirmację z magazynu. Domyślnie True.
+        placeholder (DeltaGenerator, optional): Miejsce na kartę podczas strumieniowania.
+        
+    Returns:
+        str: Afirmacja dnia.
+    """
+    store = get_daily_store()
+    user_id = get_user_id()
+    today = datetime.date.today()
+    daily_topic = select_daily_topic(user_name, today)
+    
+    if use_store:
+        stored_affirmation = store.get(user_id, user_name, today, daily_topic)
+        if stored_affirmation:
+            return stored_affirmation
     
     try:
-        return client.generate_affirmation(prompt, max_tokens=120)
-    except Exception as e:
-        return f"Błąd podczas generowania afirmacji dnia: {str(e)}"
+        # Afirmacja pojawia się w karcie token po tokenie
+        _, daily_affirmation = stream_affirmation_card(
+            stream_daily_affirmation(openai_service, user_name, daily_topic),
+            placeholder=placeholder
+        )
+    except ServiceUnavailableError:
+        # Usługa niedostępna - afirmacja z lokalnej biblioteki (nie trafia do magazynu)
+        st.toast("Serwis AI jest chwilowo niedostępny - wybrano afirmację z biblioteki.", icon='📚')
+        return fallback_corpus.for_topic(daily_topic, user_name)
+    
+    store.put(user_id, user_name, today, daily_topic, daily_affirmation)
+    return daily_affirmation
 
+def _commit_daily_affirmation(daily_affirmation, openai_service, user_name=None):
+    """
+    Zapisuje afirmację dnia w stanie sesji i w historii.
+    
+    Args:
+        daily_affirmation (str): Afirmacja dnia.
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+        user_name (str, optional): Imię użytkownika, jeśli ma zostać zapisane.
+    """
+    if user_name is not None:
+        st.session_state.daily_affirmation_name = user_name
+    st.session_state.daily_affirmation = daily_affirmation
+    st.session_state.edited_affirmation = daily_affirmation
+    # Zapisywanie afirmacji dnia do historii
+    save_to_history(daily_affirmation)
+    # Nagranie domyślnym głosem powstaje w tle, zanim użytkownik kliknie "Odsłuchaj"
+    prefetch_speech(openai_service, daily_affirmation)
+
+@timed(KIND_SECTION)
 def display_daily_affirmation_section(openai_service):
     """
     Wyświetla sekcję afirmacji dnia z ulepszonym UI.
@@ -49,14 +114,7 @@ def display_daily_affirmation_section(openai_service):
     Args:
         openai_service (OpenAIService): Instancja serwisu OpenAI.
     """
-    spacer("2.5rem")
-    st.markdown("<h2 style='text-align: center;'>Afirmacja Dnia</h2>", unsafe_allow_html=True)
-    st.markdown("""
-        <div style="text-align: center; width: 100%;">
-            <h8> Rozpocznij swój dzień z pozytywną afirmacją </h8>
-        </div>
-    """, unsafe_allow_html=True)
-    spacer("1.5rem")
+    section_header("Afirmacja Dnia", "Rozpocznij swój dzień z pozytywną afirmacją")
     
     # Inicjalizacja zmiennych stanu dla edycji
     if 'editing' not in st.session_state:
@@ -105,14 +163,14 @@ def _display_daily_affirmation_input(openai_service):
         
         if st.button("Pokaż afirmację dnia", key="show_daily_affirmation", use_container_width=True):
             if name_input:
-                with st.spinner("🌟 Tworzę Twoją afirmację dnia..."):
-                    daily_affirmation = generate_daily_affirmation(openai_service, name_input)
-                    st.session_state.daily_affirmation_name = name_input
-                    st.session_state.daily_affirmation = daily_affirmation
-                    st.session_state.edited_affirmation = daily_affirmation
-                    # Zapisywanie afirmacji dnia do historii
-                    save_to_history(daily_affirmation)
+                try:
+                    with trace("daily.generate"):
+                        # Powracający użytkownik dostaje dzisiejszą afirmację od razu z magazynu
+                        daily_affirmation = _show_daily_affirmation(openai_service, name_input)
+                        _commit_daily_affirmation(daily_affirmation, openai_service, name_input)
                     st.rerun()
+                except Exception as e:
+                    st.error(f"Błąd podczas generowania afirmacji dnia: {str(e)}")
             else:
                 st.warning("Proszę wprowadzić swoje imię!")
 
@@ -139,10 +197,13 @@ def _display_daily_affirmation_content(openai_service):
                 st.session_state.daily_affirmation = st.session_state.edited_affirmation
                 # Dodanie edytowanej afirmacji do historii
                 save_to_history(st.session_state.edited_affirmation)
+                prefetch_speech(openai_service, st.session_state.edited_affirmation)
                 st.rerun()
         else:
-            # Wyświetlenie afirmacji w eleganckiej karcie
-            affirmation_card(st.session_state.edited_affirmation)
+            # Wyświetlenie afirmacji w eleganckiej karcie (miejsce na nową afirmację)
+            card_placeholder = st.empty()
+            with card_placeholder.container():
+                affirmation_card(st.session_state.edited_affirmation)
             
             # Przyciski akcji
             col_a, col_b, col_c = st.columns([1, 1, 1])
@@ -150,18 +211,26 @@ def _display_daily_affirmation_content(openai_service):
             with col_a:
                 if st.button("Edytuj", use_container_width=True, key="edit_daily_affirmation"):
                     st.session_state.editing = True
+                    # Nagranie tekstu, który zaraz się zmieni, jest zbędne
+                    cancel_speech_prefetch()
                     st.rerun()
             
             with col_b:
                 if st.button("Nowa afirmacja", key="new_daily_affirmation", use_container_width=True):
-                    with st.spinner("🌟 Generuję nową afirmację dnia..."):
-                        daily_affirmation = generate_daily_affirmation(openai_service, st.session_state.daily_affirmation_name)
-                        st.session_state.daily_affirmation = daily_affirmation
-                        st.session_state.edited_affirmation = daily_affirmation
-                        # Zapisywanie nowej afirmacji dnia do historii
-                        save_to_history(daily_affirmation)
+                    try:
+                        # Nowa afirmacja omija magazyn i pojawia się w miejscu poprzedniej karty
+                        daily_affirmation = _show_daily_affirmation(
+                            openai_service,
+                            st.session_state.daily_affirmation_name,
+                            use_store=False,
+                            placeholder=card_placeholder
+                        )
+                        _commit_daily_affirmation(daily_affirmation, openai_service)
                         st.rerun()
+                    except Exception as e:
+                        st.error(f"Błąd podczas generowania afirmacji dnia: {str(e)}")
             
             with col_c:
                 if st.button("Skopiuj", key="copy_affirmation", use_container_width=True):
-                    st.toast("✅ Skopiowano do schowka!", icon='✨')
\ No newline at end of file
+                    st.toast("✅ Skopiowano do schowka!", icon='✨')
+
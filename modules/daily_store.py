@@ -0,0 +1,108 @@
+"""
+Magazyn afirmacji dnia - jedna afirmacja na użytkownika, dzień i temat.
+
+Użytkownika wyznacza klucz API (jego skrót) i imię - to samo imię wpisane
+z innym kluczem API nie odczyta cudzej, opłaconej przez kogoś innego afirmacji.
+"""
+import datetime
+import hashlib
+import threading
+from config.constants import DAILY_AFFIRMATION_TOPICS
+from modules.history import normalize_text
+
+def normalize_name(user_name):
+    """
+    Normalizuje imię użytkownika do postaci używanej w kluczach magazynu.
+
+    Args:
+        user_name (str): Imię użytkownika.
+
+    Returns:
+        str: Imię po normalizacji Unicode, bez nadmiarowych spacji i wielkości liter.
+    """
+    return normalize_text(user_name)
+
+def select_daily_topic(user_name, day=None):
+    """
+    Deterministycznie wybiera temat afirmacji dnia dla użytkownika.
+
+    Ten sam użytkownik otrzymuje ten sam temat przez cały dzień,
+    a kolejnego dnia temat się zmienia.
+
+    Args:
+        user_name (str): Imię użytkownika.
+        day (datetime.date, optional): Dzień. Domyślnie dzisiejszy.
+
+    Returns:
+        str: Temat z DAILY_AFFIRMATION_TOPICS.
+    """
+    day = day or datetime.date.today()
+    seed = f"{normalize_name(user_name)}|{day.isoformat()}".encode("utf-8")
+    index = int.from_bytes(hashlib.sha256(seed).digest()[:8], "big") % len(DAILY_AFFIRMATION_TOPICS)
+    return DAILY_AFFIRMATION_TOPICS[index]
+
+class DailyAffirmationStore:
+    """Współdzielony między sesjami magazyn afirmacji dnia."""
+
+    def __init__(self):
+        """
+        Inicjalizuje pusty magazyn.
+        """
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(user_id, user_name, day, topic):
+        """Zwraca klucz wpisu: (identyfikator użytkownika, znormalizowane imię, data, temat)."""
+        return user_id, normalize_name(user_name), day.isoformat(), topic
+
+    def get(self, user_id, user_name, day, topic):
+        """
+        Zwraca zapisaną afirmację dnia.
+
+        Args:
+            user_id (str): Identyfikator użytkownika (skrót klucza API).
+            user_name (str): Imię użytkownika.
+            day (datetime.date): Dzień.
+            topic (str): Temat afirmacji.
+
+        Returns:
+            str: Afirmacja lub None, jeśli nie została jeszcze zapisana.
+        """
+        with self._lock:
+            return self._entries.get(self._key(user_id, user_name, day, topic))
+
+    def put(self, user_id, user_name, day, topic, affirmation):
+        """
+        Zapisuje afirmację dnia i usuwa wpisy z poprzednich dni.
+
+        Args:
+            user_id (str): Identyfikator użytkownika (skrót klucza API).
+            user_name (str): Imię użytkownika.
+            day (datetime.date): Dzień.
+            topic (str): Temat afirmacji.
+            affirmation (str): Afirmacja do zapisania.
+        """
+        with self._lock:
+            day_key = day.isoformat()
+            # Afirmacje z minionych dni nie będą już odczytywane
+            stale_keys = [key for key in self._entries if key[2] < day_key]
+            for key in stale_keys:
+                del self._entries[key]
+            self._entries[self._key(user_id, user_name, day, topic)] = affirmation
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+# Magazyn współdzielony przez cały proces serwera
+_daily_store = DailyAffirmationStore()
+
+def get_daily_store():
+    """
+    Zwraca współdzielony magazyn afirmacji dnia (jeden na proces serwera).
+
+    Returns:
+        DailyAffirmationStore: Magazyn afirmacji dnia.
+    """
+    return _daily_store
@@ -0,0 +1,58 @@
+"""
+Lokalna biblioteka afirmacji używana, gdy OpenAI API jest niedostępne.
+"""
+import random
+from config.fallback_affirmations import FALLBACK_AFFIRMATIONS
+
+class FallbackCorpus:
+    """Indeks wyselekcjonowanych afirmacji według tematów i obszarów."""
+
+    def __init__(self, affirmations=FALLBACK_AFFIRMATIONS):
+        """
+        Buduje indeksy tematów i obszarów.
+
+        Args:
+            affirmations (list, optional): Afirmacje z przypisanymi tematami i obszarami.
+        """
+        self._all = [entry["text"] for entry in affirmations]
+        self._by_topic = {}
+        self._by_focus = {}
+        for entry in affirmations:
+            for topic in entry["topics"]:
+                self._by_topic.setdefault(topic, []).append(entry["text"])
+            for focus in entry["focus"]:
+                self._by_focus.setdefault(focus, []).append(entry["text"])
+
+    @staticmethod
+    def _pick(candidates, user_name):
+        """Losuje afirmację z kandydatów i wstawia imię użytkownika."""
+        return random.choice(candidates).format(name=user_name)
+
+    def for_topic(self, topic, user_name):
+        """
+        Zwraca afirmację dla tematu afirmacji dnia.
+
+        Args:
+            topic (str): Temat z DAILY_AFFIRMATION_TOPICS.
+            user_name (str): Imię użytkownika.
+
+        Returns:
+            str: Spersonalizowana afirmacja.
+        """
+        return self._pick(self._by_topic.get(topic) or self._all, user_name)
+
+    def for_focus(self, focus_area, user_name):
+        """
+        Zwraca afirmację dla obszaru z formularza generatora.
+
+        Args:
+            focus_area (str): Obszar z FOCUS_AREAS (dla własnych celów losowany z całości).
+            user_name (str): Imię użytkownika.
+
+        Returns:
+            str: Spersonalizowana afirmacja.
+        """
+        return self._pick(self._by_focus.get(focus_area) or self._all, user_name)
+
+# Biblioteka jest niezmienna, więc jedna instancja wystarcza dla całego procesu
+fallback_corpus = FallbackCorpus()
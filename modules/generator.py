@@ -2,6 +2,7 @@
 Moduł obsługujący funkcjonalność generatora afirmacji.
 """
 import streamlit as st
+from collections import OrderedDict
 from config.constants import (
     AFFIRMATION_LENGTH_OPTIONS, 
     FOCUS_AREAS, 
@@ -9,11 +10,38 @@ from config.constants import (
     AFFIRMATION_STYLES, 
     AFFIRMATION_TIMING, 
     AFFIRMATION_TONES, 
+    CUSTOM_FOCUS_AREA,
+    NAME_PLACEHOLDER,
+    VARIANT_CACHE_SIZE,
 )
 from services.openai_service import OpenAIService
-from modules.utils import save_to_history
-from ui.components import spacer
+from services.single_flight import make_key
+from services.circuit_breaker import ServiceUnavailableError, get_breaker
+from modules.utils import save_to_history, clear_session_blob
+from modules.speech_prefetch import prefetch_speech, cancel_speech_prefetch
+from modules.affirmation_pool import get_affirmation_pool, pool_key
+from modules.fallback import fallback_corpus
+from monitoring.timing import timed, KIND_SECTION
+from monitoring.tracing import traced
+from ui.components import stream_affirmation_card, affirmation_card, section_header
 
+@timed(KIND_SECTION)
+def display_generator_section(openai_service):
+    """
+    Wyświetla zakładkę generatora afirmacji (formularz i wynik).
+    
+    Args:
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+    """
+    form_data = display_generator_interface()
+    
+    if form_data:
+        generate_affirmation(form_data, openai_service)
+        
+    # Wyświetlenie wyniku
+    display_affirmation_result(openai_service)
+
+@timed(KIND_SECTION)
 def display_generator_interface():
     """
     Wyświetla interfejs generatora afirmacji bez formularza.
@@ -21,14 +49,7 @@ def display_generator_interface():
     Returns:
         dict: Dane wprowadzone przez użytkownika.
     """
-    spacer("2.5rem")
-    st.markdown("<h2 style='text-align: center;'>Generator Afirmacji</h2>", unsafe_allow_html=True)
-    st.markdown("""
-        <div style="text-align: center; width: 100%;">
-            <h8> Wypełnij poniższe pola, a AI stworzy dla Ciebie unikalną afirmację </h8>
-        </div>
-    """, unsafe_allow_html=True)
-    spacer("1.5rem")
+    section_header("Generator Afirmacji", "Wypełnij poniższe pola, a AI stworzy dla Ciebie unikalną afirmację")
     # Pola bez formularza
     col1, col2, col3 = st.columns([1, 3, 1])
     with col2:
@@ -37,7 +58,7 @@ def display_generator_interface():
         
         # Pokazuj pole "Wprowadź swój cel" tylko jeśli wybrano "Własne cele"
         specific_goal = ""
-        if focus_area == "✨ Własne cele ✨":
+        if focus_area == CUSTOM_FOCUS_AREA:
             specific_goal = st.text_area("Wprowadź swój cel:", key="generator_specific_goal", max_chars=250, 
                                         placeholder="Np. Chcę nauczyć się medytować codziennie przez 10 minut i być bardziej świadomym swoich myśli.")
         
@@ -46,6 +67,11 @@ def display_generator_interface():
         affirmation_length = st.selectbox("Jak długą afirmację preferujesz?", AFFIRMATION_LENGTH_OPTIONS, key="generator_affirmation_length")
         affirmation_timing = st.selectbox("Kiedy chcesz stosować afirmację?", AFFIRMATION_TIMING, key="generator_affirmation_timing")
         affirmation_tone = st.selectbox("Jaki ton powinna mieć afirmacja?", AFFIRMATION_TONES, key="generator_affirmation_tone")
+        variant_mode = st.toggle(
+            "Pokaż kilka wariantów",
+            key="generator_variant_mode",
+            help="Kilka propozycji w jednym zapytaniu - \"Nowa afirmacja\" przełącza między nimi bez czekania"
+        )
     
         # Przycisk generowania
         if st.button("Stwórz afirmację", use_container_width=True, key="generator_submit"):
@@ -53,7 +79,7 @@ def display_generator_interface():
                 st.warning("Proszę wprowadzić swoje imię!")
                 return None
             
-            if focus_area == "Własne cele" and not specific_goal:
+            if focus_area == CUSTOM_FOCUS_AREA and not specific_goal:
                 st.warning("Proszę wprowadzić swój cel!")
                 return None
                 
@@ -65,28 +91,29 @@ def display_generator_interface():
                 "preferred_style": preferred_style,
                 "affirmation_length": affirmation_length,
                 "affirmation_timing": affirmation_timing,
-                "affirmation_tone": affirmation_tone
+                "affirmation_tone": affirmation_tone,
+                "variant_mode": variant_mode
             }
         
         return None
 
-def generate_affirmation(form_data, openai_service):
+def _build_prompt(form_data, user_name):
     """
-    Generuje afirmację na podstawie danych z formularza.
+    Tworzy prompt dla generatora afirmacji.
     
     Args:
         form_data (dict): Dane z formularza.
-        openai_service (OpenAIService): Instancja serwisu OpenAI.
+        user_name (str): Imię (lub znacznik imienia) wstawiane do promptu.
         
     Returns:
-        str: Wygenerowana afirmacja lub None w przypadku błędu.
+        str: Prompt dla modelu.
     """
-    target_focus = form_data["specific_goal"] if form_data["focus_area"] == "Własne cele" else form_data["focus_area"]
+    target_focus = form_data["specific_goal"] if form_data["focus_area"] == CUSTOM_FOCUS_AREA else form_data["focus_area"]
     
-    prompt = f"""
-    Stwórz spersonalizowaną afirmację dla {form_data["user_name"]} w języku polskim, która:
+    return f"""
+    Stwórz spersonalizowaną afirmację dla {user_name} w języku polskim, która:
     1. Skoncentruje się na: {target_focus}
-    2. Zaczyna się od \"Ja, {form_data["user_name"]}\"
+    2. Zaczyna się od \"Ja, {user_name}\"
     3. Uwzględni obecny stan emocjonalny: {form_data["emotion_state"]}
     4. Odniesie się do konkretnego celu: {form_data["specific_goal"]}
     5. Będzie w stylu: {form_data["preferred_style"]}
@@ -96,22 +123,244 @@ def generate_affirmation(form_data, openai_service):
     9. Powinna mieć ton: {form_data["affirmation_tone"]}
     10. Zawiera elementy wizualizacji i emocji
     """
+
+def _build_pool_prompt(form_data):
+    """
+    Tworzy prompt dla puli afirmacji, ze znacznikiem zamiast imienia.
     
-    try:
-        with st.spinner("🧠 AI tworzy Twoją unikalną afirmację..."):
-            affirmation = openai_service.generate_affirmation(prompt)
-            st.session_state.update({
-                'affirmation': affirmation,
-                'edited_affirmation': affirmation,
-                'audio_data': None,
-                'user_name': form_data["user_name"]  # Store user name in session state
-            })
-            save_to_history(affirmation)
+    Args:
+        form_data (dict): Dane z formularza.
+        
+    Returns:
+        str: Prompt dla modelu.
+    """
+    return _build_prompt(form_data, NAME_PLACEHOLDER) + f"""
+    Użyj dosłownie znacznika {NAME_PLACEHOLDER} wszędzie tam, gdzie powinno pojawić się imię.
+    """
+
+def _commit_affirmation(affirmation, form_data, openai_service):
+    """
+    Zapisuje wygenerowaną afirmację w stanie sesji i w historii.
+    
+    Args:
+        affirmation (str): Afirmacja.
+        form_data (dict): Dane z formularza.
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+    """
+    st.session_state.update({
+        'affirmation': affirmation,
+        'edited_affirmation': affirmation,
+        'user_name': form_data["user_name"]  # Store user name in session state
+    })
+    clear_session_blob('audio_data')
+    save_to_history(affirmation)
+    # Nagranie domyślnym głosem powstaje w tle, zanim użytkownik kliknie "Odsłuchaj"
+    prefetch_speech(openai_service, affirmation)
+
+@traced("generator.generate", root=True)
+def generate_affirmation(form_data, openai_service):
+    """
+    Generuje afirmację na podstawie danych z formularza.
+    
+    Najpierw próbuje pobrać gotowy wariant ze wspólnej puli dla wybranych opcji
+    (jeśli pula jest włączona), a w razie jej braku generuje afirmację na żywo.
+    
+    Args:
+        form_data (dict): Dane z formularza.
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+        
+    Returns:
+        str: Wygenerowana afirmacja lub None w przypadku błędu.
+    """
+    if form_data.get("variant_mode"):
+        return generate_affirmation_variants(form_data, openai_service)
+    st.session_state.active_variants = None
+    
+    key = pool_key(form_data)
+    pool = get_affirmation_pool()
+    if key is not None and pool.enabled:
+        affirmation = pool.take(key, form_data["user_name"])
+        # Uzupełnianie puli w tle kluczem serwisowym, gdy kończą się w niej warianty (o ile usługa działa)
+        if not get_breaker("chat").is_open:
+            pool.refill_async(key, _build_pool_prompt(form_data))
+        if affirmation:
+            _commit_affirmation(affirmation, form_data, openai_service)
             return affirmation
+    
+    prompt = _build_prompt(form_data, form_data["user_name"])
+    
+    try:
+        col1, col2, col3 = st.columns([1, 3, 1])
+        with col2:
+            # Afirmacja pojawia się w karcie token po tokenie
+            placeholder, affirmation = stream_affirmation_card(
+                openai_service.generate_affirmation_stream(prompt)
+            )
+        _commit_affirmation(affirmation, form_data, openai_service)
+        # Gotowa afirmacja wyświetli się w sekcji wyniku
+        placeholder.empty()
+        return affirmation
+    except ServiceUnavailableError:
+        # Usługa niedostępna - afirmacja z lokalnej biblioteki
+        st.toast("Serwis AI jest chwilowo niedostępny - wybrano afirmację z biblioteki.", icon='📚')
+        affirmation = fallback_corpus.for_focus(form_data["focus_area"], form_data["user_name"])
+        _commit_affirmation(affirmation, form_data, openai_service)
+        return affirmation
+    except Exception as e:
+        st.error(f"Błąd podczas generowania afirmacji: {str(e)}")
+        return None
+
+def _variants_key(form_data):
+    """
+    Tworzy klucz zestawu wariantów dla danych z formularza.
+    
+    Args:
+        form_data (dict): Dane z formularza.
+        
+    Returns:
+        str: Klucz zestawu wariantów.
+    """
+    return make_key("variants", *(f"{field}={form_data[field]}" for field in sorted(form_data)))
+
+def _get_variant_cache():
+    """
+    Zwraca zestawy wariantów zapamiętane w sesji.
+    
+    Returns:
+        OrderedDict: Zestawy wariantów według klucza danych formularza.
+    """
+    if "affirmation_variants" not in st.session_state:
+        st.session_state.affirmation_variants = OrderedDict()
+    return st.session_state.affirmation_variants
+
+def _fetch_variants(form_data, openai_service):
+    """
+    Pobiera nowy zestaw wariantów jednym zapytaniem i zapamiętuje go w sesji.
+    
+    Args:
+        form_data (dict): Dane z formularza.
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+        
+    Returns:
+        dict: Zestaw wariantów z indeksem bieżącego wariantu.
+    """
+    prompt = _build_prompt(form_data, form_data["user_name"])
+    with st.spinner("Tworzę warianty afirmacji..."):
+        variants = openai_service.generate_affirmation_variants(prompt)
+    if not variants:
+        raise Exception("Model nie zwrócił żadnego wariantu")
+    
+    entry = {"variants": variants, "index": 0, "form_data": form_data}
+    cache = _get_variant_cache()
+    key = _variants_key(form_data)
+    cache[key] = entry
+    cache.move_to_end(key)
+    while len(cache) > VARIANT_CACHE_SIZE:
+        cache.popitem(last=False)
+    st.session_state.active_variants = key
+    return entry
+
+def generate_affirmation_variants(form_data, openai_service):
+    """
+    Zwraca bieżący wariant afirmacji dla danych z formularza.
+    
+    Zestaw wariantów jest zapamiętany dla danych formularza, więc ponowne
+    wysłanie tych samych danych nie wymaga zapytania do API.
+    
+    Args:
+        form_data (dict): Dane z formularza.
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+        
+    Returns:
+        str: Wybrany wariant afirmacji lub None w przypadku błędu.
+    """
+    cache = _get_variant_cache()
+    key = _variants_key(form_data)
+    entry = cache.get(key)
+    
+    try:
+        if entry is None:
+            entry = _fetch_variants(form_data, openai_service)
+        else:
+            cache.move_to_end(key)
+            st.session_state.active_variants = key
+    except ServiceUnavailableError:
+        st.session_state.active_variants = None
+        st.toast("Serwis AI jest chwilowo niedostępny - wybrano afirmację z biblioteki.", icon='📚')
+        affirmation = fallback_corpus.for_focus(form_data["focus_area"], form_data["user_name"])
+        _commit_affirmation(affirmation, form_data, openai_service)
+        return affirmation
     except Exception as e:
         st.error(f"Błąd podczas generowania afirmacji: {str(e)}")
         return None
+    
+    affirmation = entry["variants"][entry["index"]]
+    _commit_affirmation(affirmation, form_data, openai_service)
+    return affirmation
+
+def _get_active_variants():
+    """
+    Zwraca aktywny zestaw wariantów sesji.
+    
+    Returns:
+        dict: Zestaw wariantów lub None, jeśli tryb wariantów nie jest aktywny.
+    """
+    key = st.session_state.get("active_variants")
+    if not key:
+        return None
+    return _get_variant_cache().get(key)
 
+def _select_variant(entry, index, openai_service):
+    """
+    Ustawia wskazany wariant jako bieżącą afirmację.
+    
+    Args:
+        entry (dict): Zestaw wariantów.
+        index (int): Indeks wariantu.
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+    """
+    entry["index"] = index
+    st.session_state.editing = False
+    _commit_affirmation(entry["variants"][index], entry["form_data"], openai_service)
+
+def _next_variant(entry, openai_service):
+    """
+    Przechodzi do kolejnego wariantu, a po wyczerpaniu zestawu pobiera nowy.
+    
+    Args:
+        entry (dict): Aktywny zestaw wariantów.
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+    """
+    if entry["index"] + 1 < len(entry["variants"]):
+        # Kolejny wariant jest już w sesji - bez zapytania do API
+        _select_variant(entry, entry["index"] + 1, openai_service)
+        return
+    
+    entry = _fetch_variants(entry["form_data"], openai_service)
+    _select_variant(entry, 0, openai_service)
+
+def _display_variant_cards(entry, openai_service):
+    """
+    Wyświetla pozostałe warianty afirmacji jako karty do wyboru.
+    
+    Args:
+        entry (dict): Aktywny zestaw wariantów.
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+    """
+    st.markdown("""
+        <div style="text-align: center; width: 100%; margin-top: 1rem;">
+            <h8> Inne warianty:</h8>
+        </div>
+    """, unsafe_allow_html=True)
+    for index, variant in enumerate(entry["variants"]):
+        if index == entry["index"]:
+            continue
+        affirmation_card(variant)
+        if st.button(f"Wybierz wariant {index + 1}", use_container_width=True, key=f"select_variant_{index}"):
+            _select_variant(entry, index, openai_service)
+            st.rerun()
+
+@timed(KIND_SECTION)
 def display_affirmation_result(openai_service):
     """
     Wyświetla wynik wygenerowanej afirmacji i opcje edycji.
@@ -133,17 +382,22 @@ def display_affirmation_result(openai_service):
         
         # Obsługa trybu edycji
         if st.session_state.editing:
-            _display_affirmation_edit_mode()
+            _display_affirmation_edit_mode(openai_service)
         else:
-            _display_affirmation_view_mode()
+            _display_affirmation_view_mode(openai_service)
     
     st.markdown("---")
 
     # Wskazówki
     _display_affirmation_tips()
 
-def _display_affirmation_edit_mode():
-    """Wyświetla interfejs edycji afirmacji."""
+def _display_affirmation_edit_mode(openai_service):
+    """
+    Wyświetla interfejs edycji afirmacji.
+    
+    Args:
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+    """
     st.session_state.edited_affirmation = st.text_area(
         "Edytuj afirmację:",
         value=st.session_state.edited_affirmation,
@@ -152,13 +406,19 @@ def _display_affirmation_edit_mode():
     )
     if st.button("Zapisz zmiany", use_container_width=True, key="save_affirmation_changes"):
         st.session_state.editing = False
-        st.session_state.audio_data = None
+        clear_session_blob('audio_data')
         # Dodanie edytowanej afirmacji do historii
         save_to_history(st.session_state.edited_affirmation)
+        prefetch_speech(openai_service, st.session_state.edited_affirmation)
         st.rerun()
 
-def _display_affirmation_view_mode():
-    """Wyświetla afirmację w trybie podglądu."""
+def _display_affirmation_view_mode(openai_service):
+    """
+    Wyświetla afirmację w trybie podglądu.
+    
+    Args:
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+    """
     st.markdown(
         f"""
         <div class="affirmation-card" style="
@@ -177,19 +437,38 @@ def _display_affirmation_view_mode():
     with col_a:
         if st.button("Edytuj", use_container_width=True, key="edit_affirmation_button"):
             st.session_state.editing = True
+            # Nagranie tekstu, który zaraz się zmieni, jest zbędne
+            cancel_speech_prefetch()
             st.rerun()
     
     with col_b:
         if st.button("Nowa afirmacja", use_container_width=True, key="new_generator_affirmation"):
-            # Resetujemy stan edycji, ale zachowujemy dane użytkownika aby pokazać ponownie formularz
-            st.session_state.affirmation = None
-            st.session_state.edited_affirmation = None
-            st.session_state.editing = False
-            st.rerun()
+            variants = _get_active_variants()
+            if variants:
+                # W trybie wariantów przełączamy się na kolejny wariant
+                try:
+                    _next_variant(variants, openai_service)
+                except ServiceUnavailableError:
+                    st.toast("Serwis AI jest chwilowo niedostępny - spróbuj ponownie za chwilę.", icon='📚')
+                except Exception as e:
+                    st.error(f"Błąd podczas generowania afirmacji: {str(e)}")
+                else:
+                    st.rerun()
+            else:
+                # Resetujemy stan edycji, ale zachowujemy dane użytkownika aby pokazać ponownie formularz
+                st.session_state.affirmation = None
+                st.session_state.edited_affirmation = None
+                st.session_state.editing = False
+                st.rerun()
     
     with col_c:
         if st.button("Skopiuj", use_container_width=True, key="copy_generator_affirmation"):
             st.toast("✅ Skopiowano do schowka!", icon='✨')
+    
+    # Pozostałe warianty z trybu wariantów
+    variants = _get_active_variants()
+    if variants and len(variants["variants"]) > 1:
+        _display_variant_cards(variants, openai_service)
 
 def _display_affirmation_tips():
     """Wyświetla wskazówki dotyczące stosowania afirmacji."""
@@ -0,0 +1,138 @@
+"""
+Historia afirmacji bieżącej sesji.
+"""
+import unicodedata
+from collections import OrderedDict
+from modules.near_duplicates import MinHashIndex
+from config.constants import (
+    SESSION_HISTORY_LIMIT,
+    NEAR_DUPLICATE_THRESHOLD,
+    SIMILAR_AFFIRMATION_THRESHOLD,
+)
+
+def normalize_text(text):
+    """
+    Normalizuje tekst do porównań (Unicode NFC, pojedyncze spacje, bez wielkości liter).
+
+    Args:
+        text (str): Tekst.
+
+    Returns:
+        str: Tekst po normalizacji.
+    """
+    normalized = unicodedata.normalize('NFC', text or "")
+    return " ".join(normalized.split()).casefold()
+
+class AffirmationHistory:
+    """
+    Ostatnie afirmacje sesji, od najnowszej.
+
+    Afirmacje są indeksowane tekstem po normalizacji, więc sprawdzenie obecności,
+    przeniesienie na początek i usunięcie najstarszej mają stały koszt.
+    Prawie identyczne afirmacje (różniące się kilkoma słowami) są scalane
+    za pomocą indeksu MinHash.
+    """
+
+    def __init__(self, max_items=SESSION_HISTORY_LIMIT, similarity_threshold=NEAR_DUPLICATE_THRESHOLD):
+        """
+        Inicjalizuje pustą historię.
+
+        Args:
+            max_items (int, optional): Maksymalna liczba afirmacji.
+            similarity_threshold (float, optional): Podobieństwo, od którego afirmacje są scalane.
+        """
+        self.max_items = max_items
+        self.similarity_threshold = similarity_threshold
+        # Najnowsza afirmacja jest na końcu słownika
+        self._items = OrderedDict()
+        self._index = MinHashIndex()
+
+    def _find_duplicate(self, key, affirmation):
+        """Zwraca klucz identycznej lub prawie identycznej afirmacji albo None."""
+        if key in self._items:
+            return key
+        matches = self._index.query(affirmation, self.similarity_threshold)
+        return matches[0][0] if matches else None
+
+    def _remove(self, key):
+        """Usuwa afirmację z historii i z indeksu."""
+        del self._items[key]
+        self._index.remove(key)
+
+    def add(self, affirmation):
+        """
+        Dodaje afirmację na początek historii.
+
+        Powtórzona lub prawie identyczna afirmacja zastępuje wcześniejszą
+        i trafia na początek w najnowszym brzmieniu.
+
+        Args:
+            affirmation (str): Afirmacja.
+
+        Returns:
+            bool: True, jeśli w historii nie było takiej ani podobnej afirmacji.
+        """
+        key = normalize_text(affirmation)
+        duplicate = self._find_duplicate(key, affirmation)
+        if duplicate is not None:
+            self._remove(duplicate)
+
+        self._items[key] = affirmation
+        self._index.add(key, affirmation)
+        if len(self._items) > self.max_items:
+            self._remove(next(iter(self._items)))
+        return duplicate is None
+
+    def add_older(self, affirmations):
+        """
+        Dopisuje afirmacje na koniec historii (np. wczytane z trwałej historii).
+
+        Args:
+            affirmations (iterable): Afirmacje od najnowszej do najstarszej.
+        """
+        for affirmation in affirmations:
+            if len(self._items) >= self.max_items:
+                break
+            key = normalize_text(affirmation)
+            if self._find_duplicate(key, affirmation) is not None:
+                continue
+            self._items[key] = affirmation
+            self._items.move_to_end(key, last=False)
+            self._index.add(key, affirmation)
+
+    def similar_to(self, affirmation, threshold=SIMILAR_AFFIRMATION_THRESHOLD, limit=5):
+        """
+        Zwraca afirmacje z historii podobne do podanej.
+
+        Args:
+            affirmation (str): Afirmacja.
+            threshold (float, optional): Minimalne szacowane podobieństwo Jaccarda.
+            limit (int, optional): Maksymalna liczba wyników.
+
+        Returns:
+            list: Pary (afirmacja, podobieństwo), od najbardziej podobnych.
+        """
+        key = normalize_text(affirmation)
+        matches = self._index.query(affirmation, threshold)
+        return [
+            (self._items[match], similarity)
+            for match, similarity in matches if match != key
+        ][:limit]
+
+    def __contains__(self, affirmation):
+        return normalize_text(affirmation) in self._items
+
+    def __iter__(self):
+        return reversed(self._items.values())
+
+    def __len__(self):
+        return len(self._items)
+
+    def to_list(self):
+        """
+        Zwraca afirmacje jako listę, od najnowszej.
+
+        Returns:
+            list: Afirmacje.
+        """
+        return list(self)
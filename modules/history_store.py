@@ -0,0 +1,198 @@
+"""
+Trwała historia afirmacji z indeksem pełnotekstowym (SQLite FTS5).
+
+Historia jest przechowywana bez limitu dla każdego użytkownika (identyfikowanego
+skrótem klucza API). Wyszukiwanie obsługuje prefiksy słów i ignoruje polskie
+znaki diakrytyczne, a dzięki indeksowi jego czas nie rośnie z długością historii.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from config.constants import HISTORY_DB_PATH, HISTORY_PAGE_SIZE
+
+# Litery bez rozkładu kanonicznego, których unicode61 nie sprowadza do liter bazowych
+_EXTRA_FOLDING = str.maketrans({"ł": "l", "Ł": "L"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS affirmations (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (user_id, text)
+);
+CREATE INDEX IF NOT EXISTS idx_affirmations_user_created
+    ON affirmations (user_id, created_at DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS affirmations_fts USING fts5(
+    user_key,
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+def user_id_from_api_key(api_key):
+    """
+    Wyznacza identyfikator użytkownika na podstawie klucza API.
+
+    Args:
+        api_key (str): Klucz API OpenAI.
+
+    Returns:
+        str: Skrót SHA-256 klucza (klucz nie jest nigdzie zapisywany).
+    """
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+def fold_text(text):
+    """
+    Sprowadza tekst do postaci porównywalnej bez znaków diakrytycznych.
+
+    Args:
+        text (str): Tekst.
+
+    Returns:
+        str: Tekst małymi literami, bez znaków diakrytycznych.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.translate(_EXTRA_FOLDING))
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+def _match_expression(user_id, query):
+    """
+    Buduje wyrażenie MATCH dla FTS5: wszystkie słowa zapytania jako prefiksy.
+
+    Args:
+        user_id (str): Identyfikator użytkownika.
+        query (str): Zapytanie użytkownika.
+
+    Returns:
+        str: Wyrażenie MATCH lub None, jeśli zapytanie nie zawiera słów.
+    """
+    terms = re.findall(r"\w+", fold_text(query))
+    if not terms:
+        return None
+    # Słowa w cudzysłowach nie są interpretowane jako operatory FTS5
+    body = " ".join(f'"{term}"*' for term in terms)
+    return f'user_key:"{user_id}" AND body:({body})'
+
+class HistoryStore:
+    """Historia afirmacji wszystkich użytkowników w jednej bazie SQLite."""
+
+    def __init__(self, path=HISTORY_DB_PATH):
+        """
+        Otwiera (lub tworzy) bazę historii.
+
+        Args:
+            path (str, optional): Ścieżka pliku bazy lub ":memory:".
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Jedno połączenie współdzielone przez wątki sesji, chronione blokadą
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+
+    def add(self, user_id, text):
+        """
+        Zapisuje afirmację; ponowny zapis przenosi ją na początek historii.
+
+        Args:
+            user_id (str): Identyfikator użytkownika.
+            text (str): Treść afirmacji.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT id FROM affirmations WHERE user_id = ? AND text = ?", (user_id, text)
+            ).fetchone()
+            if row:
+                self._connection.execute("UPDATE affirmations SET created_at = ? WHERE id = ?", (now, row[0]))
+                return
+            cursor = self._connection.execute(
+                "INSERT INTO affirmations (user_id, text, created_at) VALUES (?, ?, ?)", (user_id, text, now)
+            )
+            self._connection.execute(
+                "INSERT INTO affirmations_fts (rowid, user_key, body) VALUES (?, ?, ?)",
+                (cursor.lastrowid, user_id, fold_text(text))
+            )
+
+    def recent(self, user_id, page=0, page_size=HISTORY_PAGE_SIZE):
+        """
+        Zwraca stronę historii użytkownika, od najnowszych.
+
+        Args:
+            user_id (str): Identyfikator użytkownika.
+            page (int, optional): Numer strony (od 0).
+            page_size (int, optional): Liczba afirmacji na stronie.
+
+        Returns:
+            tuple: (lista afirmacji, czy istnieje kolejna strona)
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT text FROM affirmations WHERE user_id = ? "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (user_id, page_size + 1, page * page_size)
+            ).fetchall()
+        return [row[0] for row in rows[:page_size]], len(rows) > page_size
+
+    def search(self, user_id, query, page=0, page_size=HISTORY_PAGE_SIZE):
+        """
+        Wyszukuje afirmacje użytkownika (prefiksy słów, bez znaków diakrytycznych).
+
+        Args:
+            user_id (str): Identyfikator użytkownika.
+            query (str): Zapytanie, np. "pewn sieb".
+            page (int, optional): Numer strony (od 0).
+            page_size (int, optional): Liczba afirmacji na stronie.
+
+        Returns:
+            tuple: (lista afirmacji, czy istnieje kolejna strona)
+        """
+        expression = _match_expression(user_id, query)
+        if expression is None:
+            return self.recent(user_id, page, page_size)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT a.text FROM affirmations_fts f JOIN affirmations a ON a.id = f.rowid "
+                "WHERE affirmations_fts MATCH ? ORDER BY a.created_at DESC LIMIT ? OFFSET ?",
+                (expression, page_size + 1, page * page_size)
+            ).fetchall()
+        return [row[0] for row in rows[:page_size]], len(rows) > page_size
+
+    def count(self, user_id):
+        """
+        Zwraca liczbę afirmacji w historii użytkownika.
+
+        Args:
+            user_id (str): Identyfikator użytkownika.
+
+        Returns:
+            int: Liczba afirmacji.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM affirmations WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+
+# Baza historii współdzielona przez cały proces serwera (otwierana przy pierwszym użyciu)
+_history_store = None
+_history_store_lock = threading.Lock()
+
+def get_history_store():
+    """
+    Zwraca współdzieloną bazę historii (jedna na proces serwera).
+
+    Returns:
+        HistoryStore: Baza historii.
+    """
+    global _history_store
+    with _history_store_lock:
+        if _history_store is None:
+            _history_store = HistoryStore(HISTORY_DB_PATH)
+        return _history_store
@@ -0,0 +1,158 @@
+"""
+Wykrywanie prawie identycznych afirmacji (MinHash + LSH).
+
+Tekst jest dzielony na nakładające się fragmenty znakowe, z których powstaje
+sygnatura MinHash przybliżająca podobieństwo Jaccarda. Sygnatury są rozkładane
+na pasma (LSH), więc zapytanie porównuje tylko kandydatów z tych samych kubełków
+zamiast całej historii.
+"""
+import hashlib
+import random
+import re
+import struct
+import unicodedata
+from config.constants import (
+    MINHASH_PERMUTATIONS,
+    MINHASH_BANDS,
+    MINHASH_SHINGLE_SIZE,
+    NEAR_DUPLICATE_THRESHOLD,
+)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def shingles(text, size=MINHASH_SHINGLE_SIZE):
+    """
+    Dzieli tekst na nakładające się fragmenty znakowe.
+
+    Fragmenty znakowe są odporne na polską odmianę wyrazów lepiej niż całe słowa.
+
+    Args:
+        text (str): Tekst.
+        size (int, optional): Długość fragmentu w znakach.
+
+    Returns:
+        set: Zbiór fragmentów.
+    """
+    words = re.findall(r"\w+", unicodedata.normalize("NFC", text or "").casefold())
+    joined = " ".join(words)
+    if len(joined) <= size:
+        return {joined} if joined else set()
+    return {joined[i:i + size] for i in range(len(joined) - size + 1)}
+
+def _hash_shingle(shingle):
+    """Zwraca stabilny (niezależny od procesu) 32-bitowy skrót fragmentu."""
+    digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest()
+    return struct.unpack("<I", digest)[0]
+
+class MinHashIndex:
+    """Indeks LSH sygnatur MinHash z dodawaniem i usuwaniem wpisów."""
+
+    def __init__(self, num_perm=MINHASH_PERMUTATIONS, bands=MINHASH_BANDS, seed=1):
+        """
+        Inicjalizuje pusty indeks.
+
+        Args:
+            num_perm (int, optional): Liczba funkcji skrótu w sygnaturze.
+            bands (int, optional): Liczba pasm LSH (musi dzielić num_perm).
+            seed (int, optional): Ziarno funkcji skrótu.
+
+        Raises:
+            ValueError: Gdy liczba pasm nie dzieli długości sygnatury.
+        """
+        if num_perm % bands:
+            raise ValueError("Liczba pasm musi dzielić liczbę funkcji skrótu")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        generator = random.Random(seed)
+        self._permutations = [
+            (generator.randrange(1, _MERSENNE_PRIME), generator.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self._signatures = {}
+        self._buckets = {}
+
+    def signature(self, text):
+        """
+        Oblicza sygnaturę MinHash tekstu.
+
+        Args:
+            text (str): Tekst.
+
+        Returns:
+            tuple: Sygnatura długości num_perm.
+        """
+        hashes = [_hash_shingle(shingle) for shingle in shingles(text)]
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        return tuple(
+            min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashes)
+            for a, b in self._permutations
+        )
+
+    def _bands(self, signature):
+        """Zwraca klucze kubełków dla kolejnych pasm sygnatury."""
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def add(self, key, text):
+        """
+        Dodaje (lub zastępuje) wpis w indeksie.
+
+        Args:
+            key (hashable): Klucz wpisu.
+            text (str): Tekst wpisu.
+        """
+        self.remove(key)
+        signature = self.signature(text)
+        self._signatures[key] = signature
+        for bucket in self._bands(signature):
+            self._buckets.setdefault(bucket, set()).add(key)
+
+    def remove(self, key):
+        """
+        Usuwa wpis z indeksu (brak wpisu jest ignorowany).
+
+        Args:
+            key (hashable): Klucz wpisu.
+        """
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket in self._bands(signature):
+            keys = self._buckets.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[bucket]
+
+    def query(self, text, threshold=NEAR_DUPLICATE_THRESHOLD):
+        """
+        Znajduje wpisy podobne do tekstu.
+
+        Args:
+            text (str): Tekst zapytania.
+            threshold (float, optional): Minimalne szacowane podobieństwo Jaccarda.
+
+        Returns:
+            list: Pary (klucz, podobieństwo), od najbardziej podobnych.
+        """
+        signature = self.signature(text)
+        candidates = set()
+        for bucket in self._bands(signature):
+            candidates |= self._buckets.get(bucket, set())
+
+        results = []
+        for key in candidates:
+            other = self._signatures[key]
+            similarity = sum(1 for a, b in zip(signature, other) if a == b) / self.num_perm
+            if similarity >= threshold:
+                results.append((key, similarity))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results
+
+    def __len__(self):
+        return len(self._signatures)
@@ -0,0 +1,180 @@
+"""
+Spekulatywne przygotowywanie nagrań afirmacji.
+
+Po zapisaniu afirmacji użytkownik niemal zawsze klika "Odsłuchaj", dlatego nagranie
+głosem i prędkością z ustawień czytania (domyślnymi albo wybranymi wcześniej w sesji)
+powstaje od razu w tle i trafia do pamięci podręcznej TTS.
+Każda sesja ma własny budżet takich nagrań. Anulowanie (np. przy edycji tekstu)
+zmienia pokolenie zleceń - nagrania, które już czekają w harmonogramie, są
+porzucane przed płatnym wywołaniem API, a wyniki tych, które kończą się już
+po anulowaniu, nie trafiają do pamięci podręcznej.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from services.scheduler import PRIORITY_BACKGROUND
+from services.circuit_breaker import get_breaker
+from services.tts_cache import tts_cache, tts_cache_key
+from services.openai_service import RequestCancelledError
+from config.constants import (
+    VOICE_OPTIONS,
+    DEFAULT_VOICE_INDEX,
+    DEFAULT_TTS_SPEED,
+    TTS_PREFETCH_BUDGET,
+    TTS_PREFETCH_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Wspólne wątki dla wszystkich sesji - liczba równoczesnych nagrań w tle jest ograniczona
+_executor = ThreadPoolExecutor(max_workers=TTS_PREFETCH_WORKERS, thread_name_prefix="afirmator-prefetch")
+
+class SpeechPrefetcher:
+    """Nagrania przygotowywane w tle dla jednej sesji."""
+
+    def __init__(self, budget=TTS_PREFETCH_BUDGET, voice=None, speed=DEFAULT_TTS_SPEED, model="tts-1"):
+        """
+        Inicjalizuje obiekt z pełnym budżetem.
+
+        Args:
+            budget (int, optional): Maksymalna liczba nagrań w tle dla sesji.
+            voice (str, optional): Głos nagrań. Domyślnie głos zaznaczony w wyborze głosu.
+            speed (float, optional): Prędkość mówienia.
+            model (str, optional): Model TTS.
+        """
+        self.budget = budget
+        self.voice = voice or list(VOICE_OPTIONS.values())[DEFAULT_VOICE_INDEX]
+        self.speed = speed
+        self.model = model
+        self._pending = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def prefetch(self, openai_service, text, voice=None, speed=None):
+        """
+        Zleca przygotowanie nagrania tekstu w tle.
+
+        Args:
+            openai_service (OpenAIService): Instancja serwisu OpenAI.
+            text (str): Tekst afirmacji.
+            voice (str, optional): Głos nagrania. Domyślnie głos obiektu.
+            speed (float, optional): Prędkość mówienia. Domyślnie prędkość obiektu.
+
+        Returns:
+            bool: True jeśli zlecono nagranie.
+        """
+        voice = voice or self.voice
+        speed = speed or self.speed
+        if not text or get_breaker("tts").is_open:
+            return False
+        key = tts_cache_key(self.model, voice, speed, text)
+        if key in tts_cache:
+            return False
+
+        with self._lock:
+            if key in self._pending or self.budget <= 0:
+                return False
+            self.budget -= 1
+            future = _executor.submit(self._synthesize, openai_service, text, voice, speed, self._generation)
+            self._pending[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return True
+
+    def is_stale(self, generation):
+        """
+        Sprawdza, czy zlecenie z danego pokolenia zostało anulowane.
+
+        Args:
+            generation (int): Pokolenie zlecenia.
+
+        Returns:
+            bool: True, jeśli po zleceniu wywołano cancel().
+        """
+        return generation != self._generation
+
+    def _synthesize(self, openai_service, text, voice, speed, generation):
+        """Generuje nagranie; wynik trafia do pamięci podręcznej w serwisie."""
+        if self.is_stale(generation):
+            self._refund()
+            return
+        try:
+            openai_service.generate_affirmation_audio(
+                text, voice=voice, model=self.model, speed=speed, priority=PRIORITY_BACKGROUND,
+                cancelled=lambda: self.is_stale(generation)
+            )
+        except RequestCancelledError:
+            # Nagranie porzucone przed wywołaniem API - nic nie kosztowało
+            self._refund()
+        except Exception as e:
+            logger.info("Nie udało się przygotować nagrania w tle: %s", str(e))
+
+    def _refund(self):
+        """Zwraca budżet nagrania, które nie zostało wykonane."""
+        with self._lock:
+            self.budget += 1
+
+    def _forget(self, key, future):
+        """Usuwa zakończone zadanie z listy oczekujących."""
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def cancel(self):
+        """
+        Anuluje oczekujące i trwające nagrania oraz zwraca budżet niewykonanych.
+
+        Nagrania, które jeszcze się nie rozpoczęły, są usuwane z kolejki wątków.
+        Trwające kończą się przed wywołaniem API (jeśli jeszcze do niego nie doszło),
+        a ich wyniki nie trafiają do pamięci podręcznej.
+
+        Returns:
+            int: Liczba anulowanych nagrań.
+        """
+        with self._lock:
+            self._generation += 1
+            futures = list(self._pending.values())
+        cancelled = sum(1 for future in futures if future.cancel())
+        with self._lock:
+            self.budget += cancelled
+        return len(futures)
+
+def reader_speech_settings(session_state):
+    """
+    Zwraca głos i prędkość z ustawień czytania, tak jak zobaczy je użytkownik.
+
+    Args:
+        session_state (Mapping): Stan sesji (wartości widżetów zakładki czytania).
+
+    Returns:
+        tuple: (głos OpenAI, prędkość mówienia)
+    """
+    voice_label = session_state.get("audio_player_voice_select", list(VOICE_OPTIONS)[DEFAULT_VOICE_INDEX])
+    speed = session_state.get("audio_player_speed_slider", DEFAULT_TTS_SPEED)
+    return VOICE_OPTIONS[voice_label], speed
+
+def get_speech_prefetcher():
+    """
+    Zwraca obiekt nagrań w tle dla bieżącej sesji.
+
+    Returns:
+        SpeechPrefetcher: Obiekt sesji.
+    """
+    if "speech_prefetcher" not in st.session_state:
+        st.session_state.speech_prefetcher = SpeechPrefetcher()
+    return st.session_state.speech_prefetcher
+
+def prefetch_speech(openai_service, text):
+    """
+    Zleca w tle nagranie afirmacji głosem i prędkością z ustawień czytania.
+
+    Args:
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+        text (str): Tekst afirmacji.
+    """
+    voice, speed = reader_speech_settings(st.session_state)
+    get_speech_prefetcher().prefetch(openai_service, text, voice, speed)
+
+def cancel_speech_prefetch():
+    """Anuluje oczekujące nagrania w tle bieżącej sesji (np. przy edycji tekstu)."""
+    get_speech_prefetcher().cancel()
@@ -1,11 +1,18 @@
 """
 Funkcje pomocnicze używane w różnych modułach aplikacji - wersja ulepszona.
 """
+import logging
 import streamlit as st
 import base64
-from config.constants import DEFAULT_SESSION_STATE
+import uuid
+from config.constants import DEFAULT_SESSION_STATE, SESSION_HISTORY_LIMIT
+from modules.history import AffirmationHistory
+from modules.history_store import get_history_store, user_id_from_api_key
+from services.blob_store import blob_store
 from ui.components import warning_message, api_key_input
 
+logger = logging.getLogger(__name__)
+
 def init_session_state():
     """
     Inicjalizuje stan sesji z domyślnymi wartościami.
@@ -13,6 +20,9 @@ def init_session_state():
     for key, value in DEFAULT_SESSION_STATE.items():
         if key not in st.session_state:
             st.session_state[key] = value
+    # Historia jest obiektem zmiennym, więc każda sesja dostaje własną instancję
+    if 'history' not in st.session_state:
+        st.session_state.history = AffirmationHistory()
 
 def get_text_download_link(text, filename="afirmacja.txt"):
     """
@@ -35,19 +45,112 @@ def get_text_download_link(text, filename="afirmacja.txt"):
         </a>
     """
 
+def get_user_id():
+    """
+    Zwraca identyfikator bieżącego użytkownika (skrót klucza API).
+    
+    Returns:
+        str: Identyfikator użytkownika lub None, jeśli klucz API nie jest ustawiony.
+    """
+    api_key = st.session_state.get("api_key")
+    return user_id_from_api_key(api_key) if api_key else None
+
+def load_persisted_history():
+    """
+    Wczytuje do sesji ostatnie afirmacje użytkownika z trwałej historii.
+    
+    Historia jest wczytywana raz na sesję i ponownie po zmianie klucza API.
+    """
+    user_id = get_user_id()
+    if user_id is None or st.session_state.get("history_user_id") == user_id:
+        return
+    try:
+        recent, _ = get_history_store().recent(user_id, page_size=SESSION_HISTORY_LIMIT)
+    except Exception:
+        logger.exception("Nie udało się wczytać historii afirmacji")
+        return
+    # Afirmacje z bieżącej sesji zostają na początku historii
+    st.session_state.history.add_older(recent)
+    st.session_state.history_user_id = user_id
+
 def save_to_history(affirmation):
     """
-    Zapisuje afirmację do historii, jeśli jeszcze nie istnieje.
+    Zapisuje afirmację na początku historii (powtórzoną przenosi na początek).
     
     Args:
         affirmation (str): Afirmacja do zapisania.
     """
-    if affirmation and affirmation not in st.session_state.history:
-        # Dodajemy nową afirmację na początek listy
-        st.session_state.history.insert(0, affirmation)
-        # Utrzymujemy maksymalnie 50 afirmacji w historii
-        if len(st.session_state.history) > 50:
-            st.session_state.history.pop()
+    if not affirmation:
+        return
+    
+    # Powtórzona afirmacja wraca na początek; w sesji zostają tylko ostatnie,
+    # pełna historia jest w bazie
+    st.session_state.history.add(affirmation)
+    
+    user_id = get_user_id()
+    if user_id is not None:
+        try:
+            get_history_store().add(user_id, affirmation)
+        except Exception:
+            # Błąd bazy nie może przerwać generowania afirmacji
+            logger.exception("Nie udało się zapisać afirmacji w historii")
+
+def get_session_id():
+    """
+    Zwraca identyfikator bieżącej sesji (nadawany przy pierwszym użyciu).
+    
+    Służy jako sesja w magazynie nagrań i w licznikach metryk.
+    
+    Returns:
+        str: Identyfikator sesji.
+    """
+    if "blob_session_id" not in st.session_state:
+        st.session_state.blob_session_id = uuid.uuid4().hex
+    return st.session_state.blob_session_id
+
+def put_session_blob(key, data):
+    """
+    Zapisuje dane (np. nagranie) w magazynie, a w stanie sesji tylko ich identyfikator.
+    
+    Poprzednie dane pod tym kluczem są zwalniane.
+    
+    Args:
+        key (str): Klucz stanu sesji.
+        data (bytes): Dane lub None, aby tylko zwolnić poprzednie.
+    """
+    session_id = get_session_id()
+    previous_id = st.session_state.get(key)
+    # Najpierw nowe odwołanie - te same dane nie są usuwane i zapisywane ponownie
+    st.session_state[key] = blob_store.put(session_id, data) if data else None
+    if previous_id:
+        blob_store.release(session_id, previous_id)
+
+def get_session_blob(key):
+    """
+    Zwraca dane zapisane przez put_session_blob.
+    
+    Args:
+        key (str): Klucz stanu sesji.
+        
+    Returns:
+        bytes: Dane lub None, jeśli ich nie ma (albo wygasły).
+    """
+    blob_id = st.session_state.get(key)
+    if not blob_id:
+        return None
+    data = blob_store.get(get_session_id(), blob_id)
+    if data is None:
+        st.session_state[key] = None
+    return data
+
+def clear_session_blob(key):
+    """
+    Zwalnia dane zapisane pod kluczem stanu sesji.
+    
+    Args:
+        key (str): Klucz stanu sesji.
+    """
+    put_session_blob(key, None)
 
 def check_api_key():
     """
@@ -5,35 +5,60 @@ import streamlit as st
 from PIL import Image, ImageDraw, ImageFont
 import io
 import base64
+import functools
+import logging
 import os
-from ui.components import spacer, centered_text, affirmation_card
+from services.single_flight import single_flight, make_key
+from monitoring.timing import timed, KIND_SECTION, KIND_SERVICE
+from monitoring.metrics import GRADIENT_RENDERS, PNG_ENCODES, record_bytes_served
+from monitoring.tracing import trace, span, traced
+from monitoring.profiling import profiled
+from ui.components import spacer, centered_text, affirmation_card, section_header
 # Importowanie stałych z modułu constants
 from config.constants import (
     IMAGE_SIZES, GRADIENT_PRESETS, FONT_STYLES, 
-    TEXT_COLORS, DPI_OPTIONS, FONT_DIR
+    TEXT_COLORS, DPI_OPTIONS, FONT_DIR,
+    FONT_CACHE_SIZE, GRADIENT_CACHE_SIZE, GRADIENT_CACHE_MAX_PIXELS
 )
 
-# Sprawdź czy folder z czcionkami istnieje
-if not os.path.exists(FONT_DIR):
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=None)
+def init_fonts():
+    """
+    Wyszukuje czcionki w folderze FONT_DIR (raz na proces serwera).
+    
+    Funkcja jest wywoływana również z wątku rozgrzewki (modules/warmup.py),
+    dlatego wynik jest zapamiętywany w procesie, a nie w pamięci podręcznej Streamlit.
+    
+    Style, których plik czcionki nie istnieje, dostają pierwszą dostępną czcionkę.
+    Stała FONT_STYLES nie jest modyfikowana.
+    
+    Returns:
+        tuple: (style czcionek jak w FONT_STYLES, lista dostępnych plików czcionek)
+    """
+    available_fonts = []
     try:
-        os.makedirs(FONT_DIR)
-        st.warning(f"Utworzono folder na czcionki: {FONT_DIR}")
-    except Exception as e:
-        st.error(f"Nie można utworzyć folderu czcionek: {str(e)}")
-
-# Sprawdź dostępne czcionki
-available_fonts = []
-if os.path.exists(FONT_DIR):
-    available_fonts = [f for f in os.listdir(FONT_DIR) if f.endswith(('.ttf', '.otf'))]
-
-if not available_fonts:
-    st.warning("Brak czcionek w folderze fonts. Niektóre funkcje mogą nie działać poprawnie.")
-else:
-    # Aktualizacja ścieżek czcionek w FONT_STYLES
-    for style, info in FONT_STYLES.items():
-        font_file = info.get("font", "").split("/")[-1]
+        os.makedirs(FONT_DIR, exist_ok=True)
+        available_fonts = sorted(f for f in os.listdir(FONT_DIR) if f.endswith(('.ttf', '.otf')))
+    except OSError as e:
+        logger.error("Nie można odczytać folderu czcionek %s: %s", FONT_DIR, str(e))
+    
+    font_styles = {style: dict(info) for style, info in FONT_STYLES.items()}
+    for info in font_styles.values():
+        font_file = os.path.basename(info.get("font", ""))
         if font_file not in available_fonts and available_fonts:
-            FONT_STYLES[style]["font"] = os.path.join(FONT_DIR, available_fonts[0])
+            info["font"] = os.path.join(FONT_DIR, available_fonts[0])
+    return font_styles, available_fonts
+
+def get_font_styles():
+    """
+    Zwraca style czcionek ze ścieżkami do dostępnych plików.
+    
+    Returns:
+        dict: Style czcionek (klucze jak w FONT_STYLES).
+    """
+    return init_fonts()[0]
 
 def get_size_in_cm(width_px, height_px, dpi=300):
     """
@@ -51,6 +76,7 @@ def get_size_in_cm(width_px, height_px, dpi=300):
     height_cm = (height_px / dpi) * 2.54
     return width_cm, height_cm
 
+@traced()
 def create_gradient_background(width, height, color1, color2, direction="vertical"):
     """
     Tworzy tło gradientowe.
@@ -65,6 +91,11 @@ def create_gradient_background(width, height, color1, color2, direction="vertica
     Returns:
         Image: Obraz z gradientem
     """
+    with GRADIENT_RENDERS.time(direction=direction):
+        return _render_gradient(width, height, color1, color2, direction)
+
+def _render_gradient(width, height, color1, color2, direction):
+    """Rysuje gradient piksel po pikselu (zob. create_gradient_background)."""
     base = Image.new('RGB', (width, height), color1)
     top = Image.new('RGB', (width, height), color2)
     mask = Image.new('L', (width, height))
@@ -94,6 +125,34 @@ def create_gradient_background(width, height, color1, color2, direction="vertica
     base.paste(top, (0, 0), mask)
     return base
 
+@functools.lru_cache(maxsize=GRADIENT_CACHE_SIZE)
+def _cached_gradient(width, height, color1, color2, direction):
+    """Tworzy tło gradientowe i zapamiętuje je (wspólne dla wszystkich sesji)."""
+    return create_gradient_background(width, height, color1, color2, direction)
+
+def gradient_background(width, height, color1, color2, direction="vertical"):
+    """
+    Zwraca tło gradientowe, dla typowych rozmiarów z pamięci podręcznej.
+    
+    Args:
+        width (int): Szerokość obrazu
+        height (int): Wysokość obrazu
+        color1 (tuple): Pierwszy kolor RGB
+        color2 (tuple): Drugi kolor RGB
+        direction (str): Kierunek gradientu (jak w create_gradient_background)
+    
+    Returns:
+        Image: Obraz z gradientem (kopia, którą można modyfikować)
+    """
+    if width * height > GRADIENT_CACHE_MAX_PIXELS:
+        return create_gradient_background(width, height, color1, color2, direction)
+    return _cached_gradient(width, height, tuple(color1), tuple(color2), direction).copy()
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def _truetype(font_path, size):
+    """Ładuje czcionkę z pliku i zapamiętuje ją (wspólne dla wszystkich sesji)."""
+    return ImageFont.truetype(font_path, size)
+
 def load_system_font(font_info, size):
     """
     Funkcja do ładowania czcionek ze stylów zdefiniowanych w FONT_STYLES.
@@ -108,7 +167,7 @@ def load_system_font(font_info, size):
     try:
         # Pobierz ścieżkę do czcionki z informacji o stylu
         font_path = font_info.get("font", "")
-        return ImageFont.truetype(font_path, size)
+        return _truetype(font_path, size)
     except Exception:
         # Fallback do domyślnej czcionki
         return ImageFont.load_default()
@@ -166,9 +225,12 @@ def auto_adjust_font_size(text, font_style, max_font_size, max_width, max_height
     # Podziel tekst na słowa
     words = text.split()
     
+    font_styles = get_font_styles()
+    font_info = font_styles.get(font_style, font_styles["Klasyczny"])
+    
     while font_size >= min_font_size:
         # Załaduj czcionkę z aktualnym rozmiarem
-        font = load_system_font(FONT_STYLES.get(font_style, FONT_STYLES["Klasyczny"]), font_size)
+        font = load_system_font(font_info, font_size)
         
         # Linie tekstu
         lines = []
@@ -212,7 +274,7 @@ def auto_adjust_font_size(text, font_style, max_font_size, max_width, max_height
     
     # Jeśli doszliśmy tutaj, oznacza to, że nawet z minimalnym rozmiarem czcionki
     # tekst nie mieści się. Zwracamy minimalny rozmiar i dzielimy tekst najlepiej jak się da.
-    font = load_system_font(FONT_STYLES.get(font_style, FONT_STYLES["Klasyczny"]), min_font_size)
+    font = load_system_font(font_info, min_font_size)
     
     # Próba ostatecznego podziału tekstu na linie
     lines = []
@@ -247,6 +309,7 @@ def auto_adjust_font_size(text, font_style, max_font_size, max_width, max_height
     
     return font, min_font_size, lines
 
+@traced()
 def add_text_to_image(image, text, font_size=60, text_color=(255, 255, 255), position="center", 
                    padding=50, font_style="Klasyczny", custom_x_percent=50, custom_y_percent=50, 
                    shadow_color=(0, 0, 0, 200)):
@@ -340,6 +403,9 @@ def add_text_to_image(image, text, font_size=60, text_color=(255, 255, 255), pos
         st.warning(f"Błąd dodawania tekstu: {str(e)}")
         return image.convert('RGB')
 
+@timed(KIND_SERVICE)
+@traced()
+@profiled()
 def create_visual_quote(text, background_type="gradient", gradient_colors=None, 
                        uploaded_image=None, text_color=(255, 255, 255), 
                        font_size=60, width=1080, height=1080, direction="vertical",
@@ -384,11 +450,11 @@ def create_visual_quote(text, background_type="gradient", gradient_colors=None,
                     # Użyj domyślnych kolorów gradientu
                     gradient_colors = [(74, 144, 226), (255, 107, 156)]
                 
-                image = create_gradient_background(width, height, gradient_colors[0], gradient_colors[1], direction)
+                image = gradient_background(width, height, gradient_colors[0], gradient_colors[1], direction)
             except Exception as e:
                 st.error(f"Błąd tworzenia gradientu: {str(e)}")
                 # Fallback do domyślnego gradientu
-                image = create_gradient_background(width, height, (74, 144, 226), (255, 107, 156), "vertical")
+                image = gradient_background(width, height, (74, 144, 226), (255, 107, 156), "vertical")
         elif background_type == "image" and uploaded_image:
             try:
                 # Dostosuj obraz do wymaganego rozmiaru
@@ -400,10 +466,10 @@ def create_visual_quote(text, background_type="gradient", gradient_colors=None,
             except Exception as e:
                 st.error(f"Błąd przetwarzania obrazu: {str(e)}")
                 # Fallback do domyślnego gradientu
-                image = create_gradient_background(width, height, (74, 144, 226), (255, 107, 156), "vertical")
+                image = gradient_background(width, height, (74, 144, 226), (255, 107, 156), "vertical")
         else:
             # Domyślne tło
-            image = create_gradient_background(width, height, (74, 144, 226), (255, 107, 156), "vertical")
+            image = gradient_background(width, height, (74, 144, 226), (255, 107, 156), "vertical")
         
         # Dodaj tekst do obrazu
         final_image = add_text_to_image(
@@ -421,18 +487,35 @@ def create_visual_quote(text, background_type="gradient", gradient_colors=None,
         draw.text((width//2, height//2), "Błąd tworzenia obrazu", fill=(255, 255, 255))
         return image
 
-def display_visual_quote_section():
+def _render_key(render_params, background_bytes=b""):
+    """
+    Tworzy klucz zadania renderowania wizualnego cytatu.
+    
+    Args:
+        render_params (dict): Parametry create_visual_quote.
+        background_bytes (bytes, optional): Zawartość wgranego obrazu tła.
+        
+    Returns:
+        str: Klucz zadania dla single_flight.
+    """
+    params = tuple(sorted(
+        (name, value) for name, value in render_params.items() if name != "uploaded_image"
+    ))
+    return make_key("render", params, background_bytes)
+
+@timed(KIND_SECTION)
+def display_visual_quote_section(openai_service=None):
     """
     Wyświetla sekcję generowania wizualnych cytatów.
+    
+    Args:
+        openai_service (OpenAIService, optional): Nieużywany - wspólna sygnatura sekcji zakładek.
     """
-    spacer("2.5rem")
-    st.markdown("<h2 style='text-align: center;'>Wizualny Cytat</h2>", unsafe_allow_html=True)
-    st.markdown("""
-        <div style="text-align: center; width: 100%;">
-            <h8>Stwórz piękny obrazek ze swoją afirmacją</h8>
-        </div>
-    """, unsafe_allow_html=True)
-    spacer("1.5rem")
+    section_header("Wizualny Cytat", "Stwórz piękny obrazek ze swoją afirmacją")
+
+    _, available_fonts = init_fonts()
+    if not available_fonts:
+        st.warning("Brak czcionek w folderze fonts. Niektóre funkcje mogą nie działać poprawnie.")
 
     # Inicjalizacja zmiennych stanu
     if 'visual_quote_generated' not in st.session_state:
@@ -464,7 +547,7 @@ def display_visual_quote_section():
             if st.session_state.history:
                 selected_affirmation = st.selectbox(
                     "Wybierz afirmację:",
-                    st.session_state.history,
+                    st.session_state.history.to_list(),
                     format_func=lambda x: x[:100] + "..." if len(x) > 100 else x,
                     key="history_selection"
                 )
@@ -498,334 +581,379 @@ def display_visual_quote_section():
             
         # Sprawdź czy jest afirmacja do pracy
         if selected_affirmation:
-            # Opcje tworzenia obrazu
-            spacer("1rem")
-            centered_text("Tło obrazka")
-            background_type = st.radio(
-                "Typ tła:",
-                ["Gradient", "Własny obraz"],
-                horizontal=True
+            _display_quote_options(selected_affirmation)
+    
+    # Wskazówki użycia - wyświetlane tylko po wygenerowaniu obrazu
+    if st.session_state.visual_quote_generated:
+        _display_usage_tips()
+
+def _display_usage_tips():
+    """Wyświetla wskazówki korzystania z wizualnych cytatów."""
+    spacer("1.5rem")
+    st.markdown("---")
+    st.markdown("""
+    <div style="padding: 15px; border-radius: 10px; margin-top: 20px;">
+        <h5 style="margin-top: 0;">💡 Jak korzystać z wizualnych cytatów</h5>
+        <ul style="text-align: left; margin-top: 0.2rem;">
+            <li>Umieść obrazek z afirmacją w miejscu, które często widzisz (np. tapeta telefonu, ekran komputera)</li>
+            <li>Używaj różnych formatów - mniejsze do social media, większe do wydruku</li>
+            <li>Dopasuj kolory i czcionkę do swoich preferencji</li>
+            <li>Wydrukuj afirmację i umieść ją w widocznym miejscu (np. lodówka, lustro, biurko)</li>
+            <li>Zmień wizualny cytat co tydzień, aby utrzymać świeżość przekazu</li>
+        </ul>
+    </div>
+    """, unsafe_allow_html=True)
+
+@st.fragment
+def _display_quote_options(selected_affirmation):
+    """
+    Wyświetla opcje obrazka i generuje wizualny cytat.
+    
+    Panel jest fragmentem - zmiana suwaka lub opcji odświeża tylko jego,
+    bez ponownego wykonywania całej aplikacji (CSS, panel boczny, historia).
+    
+    Args:
+        selected_affirmation (str): Tekst afirmacji.
+    """
+    # Opcje tworzenia obrazu
+    spacer("1rem")
+    centered_text("Tło obrazka")
+    background_type = st.radio(
+        "Typ tła:",
+        ["Gradient", "Własny obraz"],
+        horizontal=True,
+        key="visual_background_type"
+    )
+
+    if background_type == "Gradient":
+        col_a, col_b = st.columns(2)
+        with col_a:
+            gradient_preset = st.selectbox(
+                "Wybierz preset gradientu:",
+                list(GRADIENT_PRESETS.keys()),
+                key="visual_gradient_preset"
             )
-            
-            if background_type == "Gradient":
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    gradient_preset = st.selectbox(
-                        "Wybierz preset gradientu:",
-                        list(GRADIENT_PRESETS.keys())
-                    )
-                with col_b:
-                    gradient_direction = st.selectbox(
-                        "Kierunek gradientu:",
-                        ["Pionowy", "Poziomy", "Ukośny ↘", "Ukośny ↙", "Promienisty"]
-                    )
-                    
-                    # Mapowanie polskich nazw kierunków na wartości techniczne
-                    direction_map = {
-                        "Pionowy": "vertical",
-                        "Poziomy": "horizontal",
-                        "Ukośny ↘": "diagonal_tl_br",  # Z lewego górnego do prawego dolnego
-                        "Ukośny ↙": "diagonal_tr_bl",  # Z prawego górnego do lewego dolnego
-                        "Promienisty": "radial"
-                    }
-                    direction = direction_map[gradient_direction]
-                
-                # Sprawdź, czy wybrano własny gradient
-                if gradient_preset == "Własny":
-                    # Pokaż dwa color pickery w dwóch kolumnach
-                    custom_col1, custom_col2, custom_col3, custom_col4 = st.columns(4)
-                    with custom_col1:
-                        custom_gradient_start = st.color_picker(
-                            "Kolor początkowy:",
-                            "#4A90E2",  # Domyślny niebieski
-                            key="gradient_start_color"
-                        )
-                        # Konwersja hex koloru na RGB
-                        gradient_start_rgb = tuple(int(custom_gradient_start.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-                    
-                    with custom_col2:
-                        custom_gradient_end = st.color_picker(
-                            "Kolor końcowy:",
-                            "#FF6B9C",  # Domyślny różowy
-                            key="gradient_end_color"
-                        )
-                        # Konwersja hex koloru na RGB
-                        gradient_end_rgb = tuple(int(custom_gradient_end.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-                    
-                    # Ustaw kolory gradientu
-                    gradient_colors = [gradient_start_rgb, gradient_end_rgb]
-                else:
-                    gradient_colors = GRADIENT_PRESETS[gradient_preset]
-                
-                uploaded_image = None
-            else:
-                uploaded_file = st.file_uploader(
-                    "Wgraj własne tło",
-                    type=['png', 'jpg', 'jpeg'],
-                    help="Zalecany rozmiar: 1080x1080px"
-                )
-                
-                if uploaded_file:
-                    uploaded_image = Image.open(uploaded_file)
-                else:
-                    uploaded_image = None
-                    gradient_colors = GRADIENT_PRESETS["Zachód słońca"]
-            
-            # Opcje rozmiaru
-            centered_text("Rozmiar obrazka")
-            col_a, col_b = st.columns(2)
-            
-            with col_a:
-                size_preset = st.selectbox(
-                    "Wybierz format:",
-                    list(IMAGE_SIZES.keys()),
-                    help="Rozmiary dostosowane do różnych zastosowań"
+        with col_b:
+            gradient_direction = st.selectbox(
+                "Kierunek gradientu:",
+                ["Pionowy", "Poziomy", "Ukośny ↘", "Ukośny ↙", "Promienisty"],
+                key="visual_gradient_direction"
+            )
+
+            # Mapowanie polskich nazw kierunków na wartości techniczne
+            direction_map = {
+                "Pionowy": "vertical",
+                "Poziomy": "horizontal",
+                "Ukośny ↘": "diagonal_tl_br",  # Z lewego górnego do prawego dolnego
+                "Ukośny ↙": "diagonal_tr_bl",  # Z prawego górnego do lewego dolnego
+                "Promienisty": "radial"
+            }
+            direction = direction_map[gradient_direction]
+
+        # Sprawdź, czy wybrano własny gradient
+        if gradient_preset == "Własny":
+            # Pokaż dwa color pickery w dwóch kolumnach
+            custom_col1, custom_col2, custom_col3, custom_col4 = st.columns(4)
+            with custom_col1:
+                custom_gradient_start = st.color_picker(
+                    "Kolor początkowy:",
+                    "#4A90E2",  # Domyślny niebieski
+                    key="gradient_start_color"
                 )
-            
-            with col_b:
-                # Opcja wyboru rozdzielczości
-                selected_dpi_label = st.selectbox(
-                    "Zastosowanie:",
-                    list(DPI_OPTIONS.keys()),
-                    help="Wybierz przeznaczenie obrazka"
+                # Konwersja hex koloru na RGB
+                gradient_start_rgb = tuple(int(custom_gradient_start.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+
+            with custom_col2:
+                custom_gradient_end = st.color_picker(
+                    "Kolor końcowy:",
+                    "#FF6B9C",  # Domyślny różowy
+                    key="gradient_end_color"
                 )
-                selected_dpi = DPI_OPTIONS[selected_dpi_label]
-            
-            # Jeśli wybrano własny rozmiar
-            if size_preset == "Własny rozmiar":
-                with col_b:
-                    custom_width = st.number_input("Szerokość (px):", min_value=300, max_value=5000, value=1080, step=10)
-                with col_a:
-                    custom_height = st.number_input("Wysokość (px):", min_value=300, max_value=5000, value=1080, step=10)
-                
-                image_width, image_height = custom_width, custom_height
-                
-                # Wyświetl rozmiar w cm dla własnego rozmiaru
-                width_cm, height_cm = get_size_in_cm(image_width, image_height)
+                # Konwersja hex koloru na RGB
+                gradient_end_rgb = tuple(int(custom_gradient_end.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+
+            # Ustaw kolory gradientu
+            gradient_colors = [gradient_start_rgb, gradient_end_rgb]
+        else:
+            gradient_colors = GRADIENT_PRESETS[gradient_preset]
+
+        uploaded_image = None
+    else:
+        uploaded_file = st.file_uploader(
+            "Wgraj własne tło",
+            type=['png', 'jpg', 'jpeg'],
+            help="Zalecany rozmiar: 1080x1080px"
+        )
+
+        if uploaded_file:
+            uploaded_image = Image.open(uploaded_file)
+        else:
+            uploaded_image = None
+            gradient_colors = GRADIENT_PRESETS["Zachód słońca"]
+
+    # Opcje rozmiaru
+    centered_text("Rozmiar obrazka")
+    col_a, col_b = st.columns(2)
+
+    with col_a:
+        size_preset = st.selectbox(
+            "Wybierz format:",
+            list(IMAGE_SIZES.keys()),
+            help="Rozmiary dostosowane do różnych zastosowań",
+            key="visual_size_preset"
+        )
+
+    with col_b:
+        # Opcja wyboru rozdzielczości
+        selected_dpi_label = st.selectbox(
+            "Zastosowanie:",
+            list(DPI_OPTIONS.keys()),
+            help="Wybierz przeznaczenie obrazka",
+            key="visual_dpi"
+        )
+        selected_dpi = DPI_OPTIONS[selected_dpi_label]
+
+    # Jeśli wybrano własny rozmiar
+    if size_preset == "Własny rozmiar":
+        with col_b:
+            custom_width = st.number_input("Szerokość (px):", min_value=300, max_value=5000, value=1080, step=10,
+                                           key="visual_custom_width")
+        with col_a:
+            custom_height = st.number_input("Wysokość (px):", min_value=300, max_value=5000, value=1080, step=10,
+                                            key="visual_custom_height")
+
+        image_width, image_height = custom_width, custom_height
+
+        # Wyświetl rozmiar w cm dla własnego rozmiaru
+        width_cm, height_cm = get_size_in_cm(image_width, image_height)
+    else:
+        image_width, image_height = IMAGE_SIZES[size_preset]
+
+        # Wyświetl rozmiar w pikselach i centymetrach
+        width_cm, height_cm = get_size_in_cm(image_width, image_height)
+
+    # Przelicz rozmiary dla wybranego DPI
+    width_cm_for_dpi, height_cm_for_dpi = get_size_in_cm(image_width, image_height, selected_dpi)
+    st.info(f"📏Rozmiar do druku przy {selected_dpi} DPI: {width_cm_for_dpi:.1f} x {height_cm_for_dpi:.1f} cm")
+
+    # Opcje tekstu
+    centered_text("Opcje tekstu")
+    col_a, col_b, col_c = st.columns(3)
+
+    with col_a:
+        text_color_option = st.selectbox(
+            "Kolor tekstu:",
+            list(TEXT_COLORS.keys()),
+            key="visual_text_color"
+        )
+
+        # Obsługa własnego koloru tekstu
+        if text_color_option == "Własny":
+
+            custom_text_color = st.color_picker(
+                "Wybierz kolor tekstu:",
+                "#FFFFFF",  # Domyślny kolor - biały
+                key="custom_text_color_picker"
+            )
+            # Konwersja hex koloru na RGB
+            text_color = tuple(int(custom_text_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+
+            # Dodaj wybór koloru obramowania/cienia
+            custom_shadow_color_hex = st.color_picker(
+                "Wybierz kolor obramowania:",
+                "#000000",  # Domyślny kolor cienia - czarny
+                key="custom_shadow_color_picker"
+            )
+            # Sprawdź, czy custom_shadow_color_hex jest stringiem (wartością z color_picker)
+            if isinstance(custom_shadow_color_hex, str):
+                # Konwersja hex koloru na RGB z dodaniem kanału alpha
+                shadow_color_rgb = tuple(int(custom_shadow_color_hex.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+                # Dodajemy kanał alpha (przezroczystość)
+                shadow_color = shadow_color_rgb + (200,)  # Alpha 200 (częściowo przezroczysty)
             else:
-                image_width, image_height = IMAGE_SIZES[size_preset]
-                
-                # Wyświetl rozmiar w pikselach i centymetrach
-                width_cm, height_cm = get_size_in_cm(image_width, image_height)
-            
-            # Przelicz rozmiary dla wybranego DPI
-            width_cm_for_dpi, height_cm_for_dpi = get_size_in_cm(image_width, image_height, selected_dpi)
-            st.info(f"📏Rozmiar do druku przy {selected_dpi} DPI: {width_cm_for_dpi:.1f} x {height_cm_for_dpi:.1f} cm")
-            
-            # Opcje tekstu
-            centered_text("Opcje tekstu")
-            col_a, col_b, col_c = st.columns(3)
-            
-            with col_a:
-                text_color_option = st.selectbox(
-                    "Kolor tekstu:",
-                    list(TEXT_COLORS.keys())
-                )
-                
-                # Obsługa własnego koloru tekstu
-                if text_color_option == "Własny":
-                    
-                    custom_text_color = st.color_picker(
-                        "Wybierz kolor tekstu:",
-                        "#FFFFFF",  # Domyślny kolor - biały
-                        key="custom_text_color_picker"
+                # Jeśli to już tuple, użyj go bezpośrednio
+                shadow_color = custom_shadow_color_hex
+
+            # Zapisujemy kolor cienia w zmiennej sesji do późniejszego wykorzystania
+            st.session_state['shadow_color_value'] = shadow_color
+        else:
+            text_color = TEXT_COLORS[text_color_option]
+            # Przywracamy domyślny kolor cienia (czarny z przezroczystością)
+            st.session_state['shadow_color_value'] = (0, 0, 0, 200)
+    with col_b:            
+        font_style_selection = st.selectbox(
+            "Styl czcionki:",
+            list(FONT_STYLES.keys()),
+            key="font_style_selector"
+        )
+
+    with col_c:
+        text_position = st.selectbox(
+            "Pozycja tekstu:",
+            ["Środek", "Góra", "Dół", "Niestandardowa"],
+            key="visual_text_position"
+        )
+        position_map = {"Środek": "center", "Góra": "top", "Dół": "bottom", "Niestandardowa": "custom"}
+        position = position_map[text_position]
+
+    # Dodatkowe opcje dla niestandardowej pozycji tekstu
+    if text_position == "Niestandardowa":
+        col_custom_x, col_custom_y = st.columns(2)
+        with col_custom_x:
+            custom_x_percent = st.slider(
+                "Pozycja pozioma (%):",
+                min_value=0,
+                max_value=100,
+                value=50,
+                help="0% = lewa krawędź, 100% = prawa krawędź",
+                key="visual_custom_x"
+            )
+        with col_custom_y:
+            custom_y_percent = st.slider(
+                "Pozycja pionowa (%):",
+                min_value=0,
+                max_value=100,
+                value=50,
+                help="0% = góra, 100% = dół",
+                key="visual_custom_y"
+            )
+    else:
+        custom_x_percent = 50
+        custom_y_percent = 50
+
+    # Maksymalny rozmiar czcionki
+    font_size = st.slider(
+        "Preferowany rozmiar czcionki (maksymalny):",
+        min_value=30,
+        max_value=100,
+        value=60,
+        step=5,
+        help="Jeśli tekst nie zmieści się, rozmiar zostanie automatycznie zmniejszony",
+        key="visual_font_size"
+    )
+
+    # Generowanie obrazu
+    if st.button("Wygeneruj wizualny cytat", use_container_width=True):
+        with st.spinner("Generuję obrazek..."), trace("visual.render", width=image_width, height=image_height):
+            try:
+                if background_type == "Gradient":
+                    # Używamy zmapowanego kierunku gradientu
+
+                    # Zabezpieczamy tekst przed problemami z kodowaniem
+                    # Wstępna normalizacja tekstu do zastosowania w obrazie
+                    norm_text = selected_affirmation
+                    if isinstance(norm_text, bytes):
+                        norm_text = norm_text.decode('utf-8', errors='replace')
+
+                    # Pobierz kolor cienia z sesji
+                    shadow_color = st.session_state.get('shadow_color_value', (0, 0, 0, 200))
+
+                    # Upewnij się, że kolor cienia jest tuplem o 4 elementach (RGBA)
+                    if not isinstance(shadow_color, tuple) or len(shadow_color) != 4:
+                        shadow_color = (0, 0, 0, 200)  # Domyślny kolor cienia
+
+                    render_params = dict(
+                        text=norm_text,
+                        background_type="gradient",
+                        gradient_colors=gradient_colors,
+                        uploaded_image=None,
+                        text_color=text_color,
+                        font_size=font_size,
+                        width=image_width,
+                        height=image_height,
+                        direction=direction,
+                        position=position,
+                        font_style=font_style_selection,
+                        custom_x_percent=custom_x_percent,
+                        custom_y_percent=custom_y_percent,
+                        shadow_color=shadow_color
                     )
-                    # Konwersja hex koloru na RGB
-                    text_color = tuple(int(custom_text_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-                    
-                    # Dodaj wybór koloru obramowania/cienia
-                    custom_shadow_color_hex = st.color_picker(
-                        "Wybierz kolor obramowania:",
-                        "#000000",  # Domyślny kolor cienia - czarny
-                        key="custom_shadow_color_picker"
+                    # Identyczne renderowania w locie są wykonywane tylko raz
+                    image = single_flight.do(
+                        _render_key(render_params), create_visual_quote, **render_params
                     )
-                    # Sprawdź, czy custom_shadow_color_hex jest stringiem (wartością z color_picker)
-                    if isinstance(custom_shadow_color_hex, str):
-                        # Konwersja hex koloru na RGB z dodaniem kanału alpha
-                        shadow_color_rgb = tuple(int(custom_shadow_color_hex.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-                        # Dodajemy kanał alpha (przezroczystość)
-                        shadow_color = shadow_color_rgb + (200,)  # Alpha 200 (częściowo przezroczysty)
-                    else:
-                        # Jeśli to już tuple, użyj go bezpośrednio
-                        shadow_color = custom_shadow_color_hex
-                    
-                    # Zapisujemy kolor cienia w zmiennej sesji do późniejszego wykorzystania
-                    st.session_state['shadow_color_value'] = shadow_color
-                else:
-                    text_color = TEXT_COLORS[text_color_option]
-                    # Przywracamy domyślny kolor cienia (czarny z przezroczystością)
-                    st.session_state['shadow_color_value'] = (0, 0, 0, 200)
-            with col_b:            
-                font_style_selection = st.selectbox(
-                    "Styl czcionki:",
-                    list(FONT_STYLES.keys()),
-                    key="font_style_selector"
-                )
-            
-            with col_c:
-                text_position = st.selectbox(
-                    "Pozycja tekstu:",
-                    ["Środek", "Góra", "Dół", "Niestandardowa"]
-                )
-                position_map = {"Środek": "center", "Góra": "top", "Dół": "bottom", "Niestandardowa": "custom"}
-                position = position_map[text_position]
-                
-            # Dodatkowe opcje dla niestandardowej pozycji tekstu
-            if text_position == "Niestandardowa":
-                col_custom_x, col_custom_y = st.columns(2)
-                with col_custom_x:
-                    custom_x_percent = st.slider(
-                        "Pozycja pozioma (%):",
-                        min_value=0,
-                        max_value=100,
-                        value=50,
-                        help="0% = lewa krawędź, 100% = prawa krawędź"
+                else:  # Własny obraz
+                    if uploaded_image is None:
+                        st.warning("Proszę wgrać obraz tła!")
+                        return
+
+                    # Zabezpieczamy tekst przed problemami z kodowaniem
+                    norm_text = selected_affirmation
+                    if isinstance(norm_text, bytes):
+                        norm_text = norm_text.decode('utf-8', errors='replace')
+
+                    # Pobierz kolor cienia z sesji
+                    shadow_color = st.session_state.get('shadow_color_value', (0, 0, 0, 200))
+
+                    # Upewnij się, że kolor cienia jest tuplem o 4 elementach (RGBA)
+                    if not isinstance(shadow_color, tuple) or len(shadow_color) != 4:
+                        shadow_color = (0, 0, 0, 200)  # Domyślny kolor cienia
+
+                    render_params = dict(
+                        text=norm_text,
+                        background_type="image",
+                        gradient_colors=None,
+                        uploaded_image=uploaded_image,
+                        text_color=text_color,
+                        font_size=font_size,
+                        width=image_width,
+                        height=image_height,
+                        position=position,
+                        font_style=font_style_selection,
+                        custom_x_percent=custom_x_percent,
+                        custom_y_percent=custom_y_percent,
+                        shadow_color=shadow_color
                     )
-                with col_custom_y:
-                    custom_y_percent = st.slider(
-                        "Pozycja pionowa (%):",
-                        min_value=0,
-                        max_value=100,
-                        value=50,
-                        help="0% = góra, 100% = dół"
+                    # Identyczne renderowania w locie są wykonywane tylko raz
+                    image = single_flight.do(
+                        _render_key(render_params, uploaded_file.getvalue()),
+                        create_visual_quote,
+                        **render_params
                     )
-            else:
-                custom_x_percent = 50
-                custom_y_percent = 50
-                      
-            # Maksymalny rozmiar czcionki
-            font_size = st.slider(
-                "Preferowany rozmiar czcionki (maksymalny):",
-                min_value=30,
-                max_value=100,
-                value=60,
-                step=5,
-                help="Jeśli tekst nie zmieści się, rozmiar zostanie automatycznie zmniejszony"
-            )
-            
-            # Generowanie obrazu
-            if st.button("Wygeneruj wizualny cytat", use_container_width=True):
-                with st.spinner("Generuję obrazek..."):
-                    try:
-                        if background_type == "Gradient":
-                            # Używamy zmapowanego kierunku gradientu
-                            
-                            # Zabezpieczamy tekst przed problemami z kodowaniem
-                            # Wstępna normalizacja tekstu do zastosowania w obrazie
-                            norm_text = selected_affirmation
-                            if isinstance(norm_text, bytes):
-                                norm_text = norm_text.decode('utf-8', errors='replace')
-                            
-                            # Pobierz kolor cienia z sesji
-                            shadow_color = st.session_state.get('shadow_color_value', (0, 0, 0, 200))
-                            
-                            # Upewnij się, że kolor cienia jest tuplem o 4 elementach (RGBA)
-                            if not isinstance(shadow_color, tuple) or len(shadow_color) != 4:
-                                shadow_color = (0, 0, 0, 200)  # Domyślny kolor cienia
-                            
-                            image = create_visual_quote(
-                                text=norm_text,
-                                background_type="gradient",
-                                gradient_colors=gradient_colors,
-                                uploaded_image=None,
-                                text_color=text_color,
-                                font_size=font_size,
-                                width=image_width,
-                                height=image_height,
-                                direction=direction,
-                                position=position,
-                                font_style=font_style_selection,
-                                custom_x_percent=custom_x_percent,
-                                custom_y_percent=custom_y_percent,
-                                shadow_color=shadow_color
-                            )
-                        else:  # Własny obraz
-                            if uploaded_image is None:
-                                st.warning("Proszę wgrać obraz tła!")
-                                return
-                                
-                            # Zabezpieczamy tekst przed problemami z kodowaniem
-                            norm_text = selected_affirmation
-                            if isinstance(norm_text, bytes):
-                                norm_text = norm_text.decode('utf-8', errors='replace')
-                                
-                            # Pobierz kolor cienia z sesji
-                            shadow_color = st.session_state.get('shadow_color_value', (0, 0, 0, 200))
-                            
-                            # Upewnij się, że kolor cienia jest tuplem o 4 elementach (RGBA)
-                            if not isinstance(shadow_color, tuple) or len(shadow_color) != 4:
-                                shadow_color = (0, 0, 0, 200)  # Domyślny kolor cienia
-                            
-                            image = create_visual_quote(
-                                text=norm_text,
-                                background_type="image",
-                                gradient_colors=None,
-                                uploaded_image=uploaded_image,
-                                text_color=text_color,
-                                font_size=font_size,
-                                width=image_width,
-                                height=image_height,
-                                position=position,
-                                font_style=font_style_selection,
-                                custom_x_percent=custom_x_percent,
-                                custom_y_percent=custom_y_percent,
-                                shadow_color=shadow_color
-                            )
-                        
-                        # Ustawienie flagi wygenerowanego obrazu
-                        st.session_state.visual_quote_generated = True
-                        st.markdown("---")
-
-                        st.markdown("""
-                            <div style="text-align: center; width: 100%;">
-                                <h8> Twój wizualny cytat:</h8>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        spacer("2rem")  # Dodanie większego odstępu
-                        # Wyświetl podgląd
-                        st.image(image, use_container_width=True)
-
-                        # Przycisk pobierania
-                        buf = io.BytesIO()
-                        
-                        # Zapisujemy obraz bezpośrednio bez żadnych dodatkowych metadanych
-                        # To powinno uniknąć problemów z kodowaniem znaków
-                        image = image.convert('RGB')  # Upewnij się, że obraz jest w formacie RGB
-                        image.save(buf, format='PNG', optimize=True)
-                        byte_im = buf.getvalue()
-                        
-                        b64 = base64.b64encode(byte_im).decode()
-                        
-                        # Używamy prostej nazwy pliku bez znaków specjalnych
-                        filename = f"afirmacja_{image_width}x{image_height}.png"
-                        
-                        href = f"""
-                            <div style="text-align: center; margin-top: 1rem;">
-                                <a href="data:image/png;base64,{b64}" 
-                                   download="{filename}" 
-                                   class="download-button">
-                                    💾 Pobierz obrazek
-                                </a>
-                            </div>
-                        """
-                        st.markdown(href, unsafe_allow_html=True)
-                        
-                    except Exception as e:
-                        st.error(f"Błąd podczas generowania obrazka: {str(e)}")
-    
-    # Wskazówki użycia - wyświetlane tylko po wygenerowaniu obrazu
-    if st.session_state.visual_quote_generated:
-        spacer("1.5rem")
-        st.markdown("---")
-        st.markdown("""
-        <div style="padding: 15px; border-radius: 10px; margin-top: 20px;">
-            <h5 style="margin-top: 0;">💡 Jak korzystać z wizualnych cytatów</h5>
-            <ul style="text-align: left; margin-top: 0.2rem;">
-                <li>Umieść obrazek z afirmacją w miejscu, które często widzisz (np. tapeta telefonu, ekran komputera)</li>
-                <li>Używaj różnych formatów - mniejsze do social media, większe do wydruku</li>
-                <li>Dopasuj kolory i czcionkę do swoich preferencji</li>
-                <li>Wydrukuj afirmację i umieść ją w widocznym miejscu (np. lodówka, lustro, biurko)</li>
-                <li>Zmień wizualny cytat co tydzień, aby utrzymać świeżość przekazu</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
\ No newline at end of file
+
+                # Ustawienie flagi wygenerowanego obrazu (wskazówki poza fragmentem
+                # pojawią się dopiero przy pełnym odświeżeniu, więc za pierwszym razem są tutaj)
+                show_tips = not st.session_state.visual_quote_generated
+                st.session_state.visual_quote_generated = True
+                st.markdown("---")
+
+                st.markdown("""
+                    <div style="text-align: center; width: 100%;">
+                        <h8> Twój wizualny cytat:</h8>
+                    </div>
+                """, unsafe_allow_html=True)
+                spacer("2rem")  # Dodanie większego odstępu
+                # Wyświetl podgląd
+                st.image(image, use_container_width=True)
+
+                # Przycisk pobierania
+                buf = io.BytesIO()
+
+                # Zapisujemy obraz bezpośrednio bez żadnych dodatkowych metadanych
+                # To powinno uniknąć problemów z kodowaniem znaków
+                image = image.convert('RGB')  # Upewnij się, że obraz jest w formacie RGB
+                with PNG_ENCODES.time(), span("png.encode"):
+                    image.save(buf, format='PNG', optimize=True)
+                byte_im = buf.getvalue()
+
+                b64 = base64.b64encode(byte_im).decode()
+                record_bytes_served(byte_im, "image")
+
+                # Używamy prostej nazwy pliku bez znaków specjalnych
+                filename = f"afirmacja_{image_width}x{image_height}.png"
+
+                href = f"""
+                    <div style="text-align: center; margin-top: 1rem;">
+                        <a href="data:image/png;base64,{b64}" 
+                           download="{filename}" 
+                           class="download-button">
+                            💾 Pobierz obrazek
+                        </a>
+                    </div>
+                """
+                st.markdown(href, unsafe_allow_html=True)
+                if show_tips:
+                    _display_usage_tips()
+
+            except Exception as e:
+                st.error(f"Błąd podczas generowania obrazka: {str(e)}")
@@ -0,0 +1,117 @@
+"""
+Rozgrzewka procesu serwera.
+
+Pierwszy użytkownik po wdrożeniu nie powinien czekać na import bibliotek, ładowanie
+czcionek, dekodowanie podkładów muzycznych (ffmpeg) ani rysowanie gradientów.
+Rozgrzewka uruchamia się raz na proces, w tle, i wypełnia wspólne pamięci podręczne.
+Skrypt serve.py rusza z nią przed startem serwera; przy "streamlit run app.py"
+zaczyna się w pierwszym przebiegu skryptu.
+"""
+import logging
+import os
+import threading
+import time
+from config.constants import (
+    BACKGROUND_SOUNDS,
+    GRADIENT_PRESETS,
+    IMAGE_SIZES,
+    WARMUP_IMAGE_SIZES,
+    WARMUP_FONT_SIZES,
+)
+
+logger = logging.getLogger(__name__)
+
+_started = False
+_lock = threading.Lock()
+_timings = {}
+
+def _warm_openai():
+    """Importuje SDK OpenAI i tworzy wspólnego klienta HTTP."""
+    from services.openai_service import get_http_client
+    get_http_client()
+
+def _warm_fonts():
+    """Wyszukuje czcionki i ładuje je w rozmiarach używanych przy domyślnych ustawieniach."""
+    from modules.visual_quote import get_font_styles, load_system_font
+    for font_info in get_font_styles().values():
+        for size in WARMUP_FONT_SIZES:
+            load_system_font(font_info, size)
+
+def _warm_backgrounds():
+    """Dekoduje predefiniowane podkłady muzyczne."""
+    from modules.musical_affirmation import load_background
+    for name, path in BACKGROUND_SOUNDS.items():
+        if not os.path.exists(path):
+            logger.warning("Brak pliku podkładu %s: %s", name, path)
+            continue
+        load_background(path)
+
+def _warm_gradients():
+    """Rysuje gradienty z presetów w najpopularniejszych rozmiarach (kierunek domyślny)."""
+    from modules.visual_quote import gradient_background
+    for size_name in WARMUP_IMAGE_SIZES:
+        width, height = IMAGE_SIZES[size_name]
+        for colors in GRADIENT_PRESETS.values():
+            if colors == "custom":
+                continue
+            gradient_background(width, height, colors[0], colors[1], "vertical")
+
+# Kolejność ma znaczenie: najpierw to, czego potrzebuje pierwsza interakcja
+WARMUP_STEPS = [
+    ("openai", _warm_openai),
+    ("fonts", _warm_fonts),
+    ("backgrounds", _warm_backgrounds),
+    ("gradients", _warm_gradients),
+]
+
+def run_warmup():
+    """
+    Wykonuje wszystkie etapy rozgrzewki i zapisuje ich czasy.
+
+    Błąd jednego etapu jest logowany i nie przerywa pozostałych.
+    """
+    total_started = time.perf_counter()
+    try:
+        for name, step in WARMUP_STEPS:
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception:
+                logger.exception("Rozgrzewka: etap %s nie powiódł się", name)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _timings[name] = elapsed_ms
+            logger.info("Rozgrzewka: %s - %.1f ms", name, elapsed_ms)
+    finally:
+        _timings["total"] = (time.perf_counter() - total_started) * 1000
+        logger.info("Rozgrzewka zakończona w %.1f ms", _timings["total"])
+
+def start_warmup(background=True):
+    """
+    Uruchamia rozgrzewkę (tylko przy pierwszym wywołaniu w procesie).
+
+    Args:
+        background (bool, optional): Czy wykonać ją w wątku tła. False czeka na jej
+                                     zakończenie (np. przed pomiarami czasu odświeżeń).
+
+    Returns:
+        bool: True, jeśli rozgrzewka została właśnie uruchomiona.
+    """
+    global _started
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    if not background:
+        run_warmup()
+        return True
+    threading.Thread(target=run_warmup, name="afirmator-warmup", daemon=True).start()
+    return True
+
+def warmup_timings():
+    """
+    Zwraca czasy etapów rozgrzewki.
+
+    Returns:
+        dict: Nazwa etapu -> czas w milisekundach (oraz "total" po zakończeniu).
+    """
+    return dict(_timings)
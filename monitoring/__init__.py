@@ -0,0 +1,3 @@
+"""
+Inicjalizacja pakietu monitoring (pomiary czasu, metryki i diagnostyka wydajności).
+"""
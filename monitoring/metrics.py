@@ -0,0 +1,416 @@
+"""
+Liczniki i histogramy opóźnień w formacie Prometheus.
+
+Rejestr jest wspólny dla całego procesu serwera (sumy ze wszystkich sesji). Wartości są
+udostępniane przez lokalny punkt końcowy HTTP (`/metrics`, port AFIRMATOR_METRICS_PORT).
+Liczniki pamiętają też przyrosty każdej sesji (set_metrics_session na początku odświeżenia),
+z których panel boczny pokazuje statystyki bieżącej sesji. Wartości sesji nie trafiają
+do /metrics, więc liczba serii w Prometheusie nie rośnie z liczbą użytkowników.
+"""
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.constants import METRICS_HOST, METRICS_PORT, METRICS_LATENCY_BUCKETS, METRICS_MAX_SESSIONS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_current_session = contextvars.ContextVar("afirmator_metrics_session", default=None)
+
+def set_metrics_session(session_id):
+    """
+    Przypisuje kolejne przyrosty liczników w bieżącym kontekście do sesji.
+
+    Wątki i zadania z kopią kontekstu (np. asyncio.to_thread) dziedziczą sesję; zadania
+    w tle bez kontekstu (uzupełnianie puli, nagrania w tle) liczą się tylko do sum serwera.
+
+    Args:
+        session_id (str): Identyfikator sesji lub None.
+    """
+    _current_session.set(session_id)
+
+def _escape(value):
+    """Zamienia znaki specjalne w wartości etykiety."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    """Formatuje etykiety próbki, np. {operation="chat",outcome="ok"}."""
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    """Formatuje wartość próbki (liczby całkowite bez części ułamkowej)."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    """Wspólna część liczników i histogramów."""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        """
+        Inicjalizuje metrykę.
+
+        Args:
+            name (str): Nazwa metryki (np. "afirmator_chat_requests_total").
+            help_text (str): Opis metryki.
+            labels (tuple, optional): Nazwy etykiet.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        """Zwraca krotkę wartości etykiet w kolejności deklaracji."""
+        if set(labels) != set(self.labels):
+            raise ValueError(f"Metryka {self.name} wymaga etykiet {self.labels}, podano {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _matches(self, key, labels):
+        """Sprawdza, czy seria pasuje do podanych (być może niepełnych) etykiet."""
+        return all(key[self.labels.index(name)] == str(wanted) for name, wanted in labels.items())
+
+    def render(self):
+        """
+        Zwraca metrykę w formacie tekstowym Prometheus.
+
+        Returns:
+            list: Linie tekstu.
+        """
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Licznik, który może tylko rosnąć."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=(), max_sessions=METRICS_MAX_SESSIONS):
+        """
+        Inicjalizuje licznik.
+
+        Args:
+            name (str): Nazwa metryki (np. "afirmator_chat_requests_total").
+            help_text (str): Opis metryki.
+            labels (tuple, optional): Nazwy etykiet.
+            max_sessions (int, optional): Liczba sesji z zapamiętanymi wartościami
+                                          (najdawniej aktywne są usuwane).
+        """
+        super().__init__(name, help_text, labels)
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+
+    def inc(self, amount=1, **labels):
+        """
+        Zwiększa licznik (i wartość bieżącej sesji, jeśli jest ustawiona).
+
+        Args:
+            amount (float, optional): Przyrost (nieujemny). Domyślnie 1.
+            **labels: Wartości etykiet.
+        """
+        if amount < 0:
+            raise ValueError("Licznik nie może maleć")
+        key = self._key(labels)
+        session_id = _current_session.get()
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            if session_id is None:
+                return
+            session_values = self._sessions.get(session_id)
+            if session_values is None:
+                session_values = self._sessions[session_id] = {}
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            session_values[key] = session_values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """
+        Zwraca wartość licznika.
+
+        Args:
+            **labels: Wartości etykiet; pominięte etykiety są sumowane.
+
+        Returns:
+            float: Wartość (suma pasujących serii).
+        """
+        with self._lock:
+            return sum(value for key, value in self._values.items() if self._matches(key, labels))
+
+    def session_value(self, session_id, **labels):
+        """
+        Zwraca wartość licznika dla jednej sesji.
+
+        Args:
+            session_id (str): Identyfikator sesji.
+            **labels: Wartości etykiet; pominięte etykiety są sumowane.
+
+        Returns:
+            float: Wartość (0 dla sesji bez przyrostów lub usuniętej z pamięci).
+        """
+        with self._lock:
+            session_values = self._sessions.get(session_id, {})
+            return sum(value for key, value in session_values.items() if self._matches(key, labels))
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    """Histogram wartości (np. opóźnień w sekundach) ze stałymi przedziałami."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=METRICS_LATENCY_BUCKETS):
+        """
+        Inicjalizuje histogram.
+
+        Args:
+            name (str): Nazwa metryki (np. "afirmator_chat_latency_seconds").
+            help_text (str): Opis metryki.
+            labels (tuple, optional): Nazwy etykiet.
+            buckets (tuple, optional): Rosnące górne granice przedziałów.
+        """
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """
+        Zapisuje obserwację.
+
+        Args:
+            value (float): Obserwowana wartość.
+            **labels: Wartości etykiet.
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+            series["count"] += 1
+            series["sum"] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Mierzy czas bloku kodu w sekundach.
+
+        Args:
+            **labels: Wartości etykiet.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        """
+        Zwraca liczbę obserwacji.
+
+        Args:
+            **labels: Wartości etykiet; pominięte etykiety są sumowane.
+
+        Returns:
+            int: Liczba obserwacji.
+        """
+        with self._lock:
+            return sum(series["count"] for key, series in self._values.items() if self._matches(key, labels))
+
+    def _render_samples(self, items):
+        lines = []
+        for key, series in items:
+            # Przedziały w formacie Prometheus są skumulowane (obserwacje są już zliczone narastająco)
+            for bound, count in zip(self.buckets, series["buckets"]):
+                labels = _format_labels(self.labels, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels, key, [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{labels} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series['count']}")
+        return lines
+
+class MetricsRegistry:
+    """Zbiór metryk procesu."""
+
+    def __init__(self):
+        """Inicjalizuje pusty rejestr."""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        """Dodaje metrykę (nazwy muszą być unikalne)."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metryka {metric.name} jest już zarejestrowana")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        """
+        Tworzy i rejestruje licznik.
+
+        Returns:
+            Counter: Nowy licznik.
+        """
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=METRICS_LATENCY_BUCKETS):
+        """
+        Tworzy i rejestruje histogram.
+
+        Returns:
+            Histogram: Nowy histogram.
+        """
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        """
+        Zwraca wszystkie metryki w formacie tekstowym Prometheus.
+
+        Returns:
+            str: Treść odpowiedzi dla /metrics.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Wspólny rejestr dla wszystkich sesji
+registry = MetricsRegistry()
+
+# Wyniki wywołań: "ok", "error" lub "unavailable" (bezpiecznik otwarty)
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_UNAVAILABLE = "unavailable"
+
+CHAT_REQUESTS = registry.counter(
+    "afirmator_chat_requests_total", "Zapytania do modelu czatu", ("operation", "outcome")
+)
+CHAT_LATENCY = registry.histogram(
+    "afirmator_chat_latency_seconds", "Czas zapytania do modelu czatu", ("operation",)
+)
+TTS_REQUESTS = registry.counter(
+    "afirmator_tts_requests_total", "Syntezy mowy", ("backend", "outcome")
+)
+TTS_LATENCY = registry.histogram(
+    "afirmator_tts_latency_seconds", "Czas syntezy mowy", ("backend",)
+)
+CACHE_REQUESTS = registry.counter(
+    "afirmator_cache_requests_total", "Odczyty pamięci podręcznych", ("cache", "result")
+)
+GRADIENT_RENDERS = registry.histogram(
+    "afirmator_gradient_render_seconds", "Czas rysowania tła gradientowego", ("direction",)
+)
+PNG_ENCODES = registry.histogram(
+    "afirmator_png_encode_seconds", "Czas kodowania obrazów PNG"
+)
+MIX_STAGES = registry.histogram(
+    "afirmator_mix_stage_seconds", "Czas etapów miksowania muzycznej afirmacji", ("stage",)
+)
+BYTES_SERVED = registry.counter(
+    "afirmator_bytes_served_total", "Bajty nowych nagrań i obrazów wysłane do przeglądarki", ("kind",)
+)
+CONTENT_SERVED = registry.counter(
+    "afirmator_content_served_total", "Nowe nagrania i obrazy wysłane do przeglądarki", ("kind",)
+)
+
+def record_cache(cache, hit):
+    """
+    Zapisuje trafienie lub chybienie pamięci podręcznej.
+
+    Args:
+        cache (str): Nazwa pamięci podręcznej (np. "tts").
+        hit (bool): Czy wartość była w pamięci.
+    """
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+def record_bytes_served(data, kind):
+    """
+    Zapisuje rozmiar nowego nagrania lub obrazu wysłanego do przeglądarki.
+
+    Dane trafiają do odtwarzacza i do linku pobierania (base64). Wywoływane raz,
+    gdy powstaje nowa zawartość - ponowne odświeżenia tej samej nie są liczone.
+
+    Args:
+        data (bytes): Dane nagrania lub obrazu.
+        kind (str): Rodzaj danych ("speech", "music", "image").
+    """
+    BYTES_SERVED.inc(len(data) + 4 * math.ceil(len(data) / 3), kind=kind)
+    CONTENT_SERVED.inc(kind=kind)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Obsługa żądań GET /metrics."""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Odpytywanie co kilka sekund zaśmiecałoby log serwera
+        pass
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """
+    Uruchamia punkt końcowy /metrics w tle (tylko przy pierwszym wywołaniu w procesie).
+
+    Zajęty port jest logowany i nie przerywa aplikacji.
+
+    Args:
+        host (str, optional): Adres nasłuchiwania. Domyślnie tylko lokalny.
+        port (int, optional): Port. 0 wyłącza punkt końcowy.
+
+    Returns:
+        ThreadingHTTPServer: Serwer lub None, jeśli punkt końcowy nie działa.
+    """
+    global _server, _server_started
+    with _server_lock:
+        if _server_started or not port:
+            return _server
+        # Kolejne odświeżenia nie próbują ponownie, również po błędzie
+        _server_started = True
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Nie udało się uruchomić punktu końcowego metryk na %s:%s: %s", host, port, e)
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="afirmator-metrics", daemon=True).start()
+        logger.info("Metryki Prometheus: http://%s:%s/metrics", host, port)
+        return _server
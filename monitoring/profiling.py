@@ -0,0 +1,173 @@
+"""
+Profilowanie wybranych operacji (cProfile i tracemalloc) na żądanie.
+
+Profil jest zbierany dla każdego wywołania (AFIRMATOR_PROFILE=1) albo dla losowej
+części wywołań (AFIRMATOR_PROFILE_SAMPLE=0.05). Każdy pomiar zapisuje do katalogu
+profili plik pstats oraz zestawienie miejsc, które zaalokowały najwięcej pamięci.
+Katalog przechowuje tylko najnowsze pomiary; raport tworzy tools/profile_report.py.
+
+W procesie działa najwyżej jeden profiler naraz - wywołania w trakcie innego pomiaru
+(także zagnieżdżone) wykonują się bez profilowania.
+"""
+import cProfile
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from monitoring.tracing import current_span
+from config.constants import (
+    PROFILE_ENABLED,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_DIR,
+    PROFILE_MAX_CAPTURES,
+    PROFILE_TOP_ALLOCATIONS,
+    PROFILE_TRACEMALLOC_FRAMES,
+)
+
+logger = logging.getLogger(__name__)
+
+PSTATS_SUFFIX = ".pstats"
+ALLOC_SUFFIX = ".alloc.json"
+
+_capture_lock = threading.Lock()
+
+def should_profile(enabled=PROFILE_ENABLED, sample_rate=PROFILE_SAMPLE_RATE):
+    """
+    Decyduje, czy profilować bieżące wywołanie.
+
+    Args:
+        enabled (bool, optional): Profilowanie każdego wywołania.
+        sample_rate (float, optional): Odsetek losowo profilowanych wywołań (0.0-1.0).
+
+    Returns:
+        bool: True, jeśli wywołanie ma być profilowane.
+    """
+    return enabled or (sample_rate > 0 and random.random() < sample_rate)
+
+# Alokacje samego pomiaru nie są interesujące
+_ALLOCATION_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+)
+
+def _top_allocations(before, after, limit):
+    """
+    Zwraca miejsca, w których między zrzutami przybyło najwięcej pamięci.
+
+    Uwzględniana jest pamięć wciąż zajęta na końcu wywołania; chwilowe maksimum
+    całej operacji opisuje peak_bytes.
+    """
+    before = before.filter_traces(_ALLOCATION_FILTERS)
+    after = after.filter_traces(_ALLOCATION_FILTERS)
+    allocations = []
+    for stat in after.compare_to(before, "traceback")[:limit]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[-1]
+        allocations.append({
+            "file": frame.filename,
+            "line": frame.lineno,
+            "size_diff": stat.size_diff,
+            "count_diff": stat.count_diff,
+            "traceback": [f"{entry.filename}:{entry.lineno}" for entry in stat.traceback],
+        })
+    return allocations
+
+def _rotate(directory, keep):
+    """Usuwa najstarsze pomiary, gdy jest ich więcej niż keep."""
+    captures = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(PSTATS_SUFFIX)),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in captures[:max(0, len(captures) - keep)]:
+        base = entry.path[:-len(PSTATS_SUFFIX)]
+        for path in (entry.path, base + ALLOC_SUFFIX):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+def _save(name, profiler, allocations, meta, directory=PROFILE_DIR, keep=PROFILE_MAX_CAPTURES):
+    """Zapisuje pomiar (pstats i alokacje) i usuwa najstarsze."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(directory, f"{stamp}_{name}_{uuid.uuid4().hex[:6]}")
+    profiler.dump_stats(base + PSTATS_SUFFIX)
+    with open(base + ALLOC_SUFFIX, "w", encoding="utf-8") as alloc_file:
+        json.dump({**meta, "allocations": allocations}, alloc_file, ensure_ascii=False, indent=1)
+    _rotate(directory, keep)
+    logger.info("Profil %s zapisany: %s", name, base)
+
+def _run_profiled(name, func, args, kwargs):
+    """Wykonuje funkcję pod cProfile i tracemalloc (wymaga _capture_lock)."""
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Proces jest już profilowany innym narzędziem (np. python -m cProfile)
+        if started_tracemalloc:
+            tracemalloc.stop()
+        return func(*args, **kwargs)
+    started = time.perf_counter()
+    ok = False
+    try:
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            profiler.disable()
+        ok = True
+        return result
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        after = tracemalloc.take_snapshot()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        if started_tracemalloc:
+            tracemalloc.stop()
+        active_span = current_span()
+        meta = {
+            "name": name,
+            "timestamp": time.time(),
+            "duration_ms": round(duration_ms, 3),
+            "ok": ok,
+            "peak_bytes": peak_bytes,
+            "trace_id": active_span.trace_id if active_span else None,
+        }
+        try:
+            _save(name, profiler, _top_allocations(before, after, PROFILE_TOP_ALLOCATIONS), meta)
+        except OSError:
+            # Błąd zapisu profilu nie może przerwać operacji
+            logger.exception("Nie udało się zapisać profilu %s", name)
+
+def profiled(name=None):
+    """
+    Dekorator zbierający profil wywołania, gdy profilowanie jest włączone lub wylosowane.
+
+    Args:
+        name (str, optional): Nazwa pomiaru (część nazwy pliku). Domyślnie kwalifikowana nazwa funkcji.
+
+    Returns:
+        callable: Dekorator.
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not should_profile() or not _capture_lock.acquire(blocking=False):
+                return func(*args, **kwargs)
+            try:
+                return _run_profiled(label, func, args, kwargs)
+            finally:
+                _capture_lock.release()
+        return wrapper
+    return decorator
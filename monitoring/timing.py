@@ -0,0 +1,251 @@
+"""
+Pomiary czasu sekcji interfejsu i wywołań usług.
+
+Każdy pomiar trafia do wspólnego rejestru z oknem kroczącym, z którego liczone są
+histogramy i percentyle (panel deweloperski), a opcjonalnie również do pliku
+JSON Lines (zmienna AFIRMATOR_TIMING_LOG). Pomiary wykonane w wątku skryptu są
+oznaczane identyfikatorem odświeżenia, więc można je zestawić dla jednego przebiegu.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from services.stats import percentile
+from config.constants import (
+    TIMING_LOG_PATH,
+    TIMING_WINDOW_SECONDS,
+    TIMING_MAX_SAMPLES,
+    TIMING_BUCKETS_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rodzaje pomiarów
+KIND_RERUN = "rerun"
+KIND_SECTION = "section"
+KIND_SERVICE = "service"
+
+_current_rerun = contextvars.ContextVar("afirmator_rerun", default=None)
+
+# Wyjątki sterujące Streamlit (st.rerun, st.stop) przerywają skrypt, ale nie są błędami
+_CONTROL_FLOW_EXCEPTIONS = ("RerunException", "StopException")
+
+def is_control_flow(error):
+    """
+    Sprawdza, czy wyjątek tylko steruje przebiegiem skryptu (st.rerun, st.stop).
+
+    Args:
+        error (BaseException): Zgłoszony wyjątek.
+
+    Returns:
+        bool: True dla wyjątków sterujących Streamlit.
+    """
+    return type(error).__name__ in _CONTROL_FLOW_EXCEPTIONS
+
+def histogram(samples, buckets=TIMING_BUCKETS_MS):
+    """
+    Zlicza próbki w przedziałach histogramu.
+
+    Args:
+        samples (list): Czasy w milisekundach.
+        buckets (tuple, optional): Rosnące górne granice przedziałów (ms).
+
+    Returns:
+        list: Pary (górna granica lub None dla przedziału otwartego, liczba próbek).
+    """
+    counts = [0] * (len(buckets) + 1)
+    for value in samples:
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+    return list(zip(list(buckets) + [None], counts))
+
+class TimingRegistry:
+    """Pomiary czasu z oknem kroczącym (bezpieczny dla wątków)."""
+
+    def __init__(self, window_seconds=TIMING_WINDOW_SECONDS, max_samples=TIMING_MAX_SAMPLES,
+                 log_path=TIMING_LOG_PATH):
+        """
+        Inicjalizuje pusty rejestr.
+
+        Args:
+            window_seconds (float, optional): Długość okna kroczącego w sekundach.
+            max_samples (int, optional): Maksymalna liczba pomiarów jednej nazwy.
+            log_path (str, optional): Plik JSON Lines, do którego dopisywany jest każdy pomiar.
+        """
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        self.log_path = log_path
+        self._records = {}
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+    def record(self, name, kind, duration_ms, ok=True):
+        """
+        Zapisuje pomiar.
+
+        Args:
+            name (str): Nazwa sekcji lub wywołania.
+            kind (str): Rodzaj pomiaru (KIND_RERUN, KIND_SECTION, KIND_SERVICE).
+            duration_ms (float): Czas w milisekundach.
+            ok (bool, optional): Czy operacja zakończyła się bez wyjątku.
+        """
+        entry = {
+            "timestamp": time.time(),
+            "name": name,
+            "kind": kind,
+            "duration_ms": round(duration_ms, 3),
+            "ok": ok,
+            "rerun": _current_rerun.get(),
+        }
+        with self._lock:
+            samples = self._records.setdefault(name, deque(maxlen=self.max_samples))
+            samples.append(entry)
+        if self.log_path:
+            self._append_to_log(entry)
+
+    def _append_to_log(self, entry):
+        """Dopisuje pomiar do pliku JSON Lines (błąd zapisu nie przerywa aplikacji)."""
+        try:
+            with self._log_lock, open(self.log_path, "a", encoding="utf-8") as log_file:
+                log_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError:
+            logger.exception("Nie udało się zapisać pomiaru do %s", self.log_path)
+
+    def records(self, name=None, rerun=None):
+        """
+        Zwraca pomiary z okna kroczącego, od najstarszego.
+
+        Args:
+            name (str, optional): Tylko pomiary o tej nazwie.
+            rerun (str, optional): Tylko pomiary z tego odświeżenia.
+
+        Returns:
+            list: Słowniki pomiarów.
+        """
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            groups = [self._records.get(name, ())] if name else list(self._records.values())
+            entries = [entry for group in groups for entry in group if entry["timestamp"] >= cutoff]
+        if rerun is not None:
+            entries = [entry for entry in entries if entry["rerun"] == rerun]
+        return sorted(entries, key=lambda entry: entry["timestamp"])
+
+    def summary(self):
+        """
+        Zwraca statystyki wszystkich nazw z okna kroczącego.
+
+        Returns:
+            list: Słowniki z nazwą, rodzajem, liczbą pomiarów, p50/p95/max (ms),
+                  liczbą błędów i histogramem, od najwolniejszego p95.
+        """
+        grouped = {}
+        for entry in self.records():
+            grouped.setdefault(entry["name"], []).append(entry)
+        rows = []
+        for name, entries in grouped.items():
+            durations = [entry["duration_ms"] for entry in entries]
+            rows.append({
+                "name": name,
+                "kind": entries[-1]["kind"],
+                "count": len(durations),
+                "p50_ms": percentile(durations, 50),
+                "p95_ms": percentile(durations, 95),
+                "max_ms": max(durations),
+                "errors": sum(1 for entry in entries if not entry["ok"]),
+                "histogram": histogram(durations),
+            })
+        rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return rows
+
+    def to_jsonl(self):
+        """
+        Eksportuje pomiary z okna kroczącego w formacie JSON Lines.
+
+        Returns:
+            str: Jeden pomiar (obiekt JSON) w każdej linii.
+        """
+        return "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self.records())
+
+    def clear(self):
+        """Usuwa wszystkie pomiary."""
+        with self._lock:
+            self._records.clear()
+
+# Wspólny rejestr dla wszystkich sesji
+timings = TimingRegistry()
+
+def begin_rerun():
+    """
+    Oznacza początek odświeżenia skryptu w bieżącym wątku.
+
+    Returns:
+        str: Identyfikator odświeżenia (dołączany do kolejnych pomiarów w tym wątku).
+    """
+    rerun_id = uuid.uuid4().hex[:12]
+    _current_rerun.set(rerun_id)
+    return rerun_id
+
+@contextmanager
+def timer(name, kind=KIND_SECTION):
+    """
+    Mierzy czas bloku kodu.
+
+    Args:
+        name (str): Nazwa pomiaru.
+        kind (str, optional): Rodzaj pomiaru.
+    """
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    except GeneratorExit:
+        # Porzucony generator (np. przerwany strumień) nie jest błędem
+        ok = True
+        raise
+    except BaseException as e:
+        # RerunException i StopException dziedziczą po BaseException, nie po Exception
+        ok = is_control_flow(e)
+        raise
+    finally:
+        timings.record(name, kind, (time.perf_counter() - started) * 1000, ok)
+
+def timed(kind=KIND_SECTION, name=None):
+    """
+    Dekorator mierzący czas wywołań funkcji.
+
+    Dla generatorów mierzony jest czas do wyczerpania (lub zamknięcia) generatora.
+
+    Args:
+        kind (str, optional): Rodzaj pomiaru.
+        name (str, optional): Nazwa pomiaru. Domyślnie kwalifikowana nazwa funkcji.
+
+    Returns:
+        callable: Dekorator.
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                with timer(label, kind):
+                    yield from func(*args, **kwargs)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(label, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
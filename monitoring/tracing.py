@@ -0,0 +1,245 @@
+"""
+Śledzenie akcji użytkownika (spany).
+
+Każda akcja (generowanie afirmacji, nagranie, obraz, miks) otwiera span główny,
+a wywołania usług, renderowanie i etapy audio - spany podrzędne. Bieżący span jest
+przechowywany w zmiennej kontekstowej, więc zagnieżdżenie wynika z wywołań.
+Po zakończeniu spanu głównego cały ślad jest dopisywany do pliku JSON Lines
+(AFIRMATOR_TRACE_LOG), który można przejrzeć narzędziem tools/trace_viewer.py.
+
+Spany podrzędne poza akcją użytkownika (rozgrzewka, nagrania przygotowywane w tle)
+nie są zapisywane.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from monitoring.timing import is_control_flow
+from config.constants import TRACE_LOG_PATH, TRACE_LOG_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+_current_span = contextvars.ContextVar("afirmator_span", default=None)
+
+class Span:
+    """Pojedynczy, mierzony fragment akcji użytkownika."""
+
+    def __init__(self, name, parent=None, attributes=None):
+        """
+        Tworzy span.
+
+        Args:
+            name (str): Nazwa spanu (np. "music.generate", "OpenAIService.generate_affirmation").
+            parent (Span, optional): Span nadrzędny. None dla spanu głównego.
+            attributes (dict, optional): Dodatkowe informacje (np. rozmiar obrazu).
+        """
+        self.name = name
+        self.parent = parent
+        self.root = parent.root if parent else self
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_OK
+        self.error = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        # Zakończone spany całego śladu (tylko w spanie głównym)
+        self.finished = [] if parent is None else None
+        self._lock = threading.Lock() if parent is None else None
+
+    def set_attribute(self, key, value):
+        """Dodaje informację do spanu."""
+        self.attributes[key] = value
+
+    def finish(self, error=None):
+        """
+        Kończy span i przekazuje go do spanu głównego.
+
+        Args:
+            error (BaseException, optional): Wyjątek, który przerwał span.
+        """
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if error is not None and not is_control_flow(error):
+            self.status = STATUS_ERROR
+            self.error = str(error) or type(error).__name__
+        with self.root._lock:
+            self.root.finished.append(self.to_dict())
+
+    def to_dict(self):
+        """
+        Zwraca span jako słownik (jedna linia pliku JSON Lines).
+
+        Returns:
+            dict: Identyfikatory, nazwa, czas rozpoczęcia (epoch), czas trwania (ms) i status.
+        """
+        entry = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "thread": threading.current_thread().name,
+        }
+        if self.error:
+            entry["error"] = self.error
+        if self.attributes:
+            entry["attributes"] = self.attributes
+        return entry
+
+class JsonlExporter:
+    """Zapisuje zakończone ślady do pliku JSON Lines (z prostą rotacją)."""
+
+    def __init__(self, path=TRACE_LOG_PATH, max_bytes=TRACE_LOG_MAX_BYTES):
+        """
+        Inicjalizuje eksporter.
+
+        Args:
+            path (str, optional): Plik śladów. Pusta wartość wyłącza zapis.
+            max_bytes (int, optional): Rozmiar, po którym plik jest przenoszony do "<plik>.1".
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        """
+        Dopisuje spany jednego śladu (błąd zapisu nie przerywa aplikacji).
+
+        Args:
+            spans (list): Słowniki spanów (Span.to_dict).
+        """
+        if not self.path or not spans:
+            return
+        lines = "".join(json.dumps(span, ensure_ascii=False) + "\n" for span in spans)
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as trace_file:
+                    trace_file.write(lines)
+        except OSError:
+            logger.exception("Nie udało się zapisać śladu do %s", self.path)
+
+# Wspólny eksporter dla wszystkich sesji
+exporter = JsonlExporter()
+
+def current_span():
+    """
+    Zwraca bieżący span.
+
+    Returns:
+        Span: Bieżący span lub None poza akcją użytkownika.
+    """
+    return _current_span.get()
+
+def set_attribute(key, value):
+    """
+    Dodaje informację do bieżącego spanu (poza akcją użytkownika nic nie robi).
+
+    Args:
+        key (str): Nazwa informacji.
+        value: Wartość (serializowalna do JSON).
+    """
+    active = _current_span.get()
+    if active is not None:
+        active.set_attribute(key, value)
+
+@contextmanager
+def _activate(new_span):
+    """Ustawia span jako bieżący na czas bloku i kończy go po wyjściu."""
+    token = _current_span.set(new_span)
+    error = None
+    try:
+        yield new_span
+    except GeneratorExit:
+        raise
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Generator zamknięty w innym kontekście - bieżący span i tak już nie obowiązuje
+            pass
+        new_span.finish(error)
+        if new_span.parent is None:
+            exporter.export(new_span.finished)
+
+@contextmanager
+def trace(name, **attributes):
+    """
+    Otwiera span główny akcji użytkownika (wewnątrz innej akcji - span podrzędny).
+
+    Args:
+        name (str): Nazwa akcji, np. "music.generate".
+        **attributes: Dodatkowe informacje o akcji.
+
+    Yields:
+        Span: Otwarty span.
+    """
+    with _activate(Span(name, _current_span.get(), attributes)) as new_span:
+        yield new_span
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Otwiera span podrzędny bieżącej akcji. Poza akcją użytkownika nic nie mierzy.
+
+    Args:
+        name (str): Nazwa spanu, np. "mix.overlay".
+        **attributes: Dodatkowe informacje.
+
+    Yields:
+        Span: Otwarty span lub None poza akcją użytkownika.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    with _activate(Span(name, parent, attributes)) as new_span:
+        yield new_span
+
+def traced(name=None, root=False):
+    """
+    Dekorator otwierający span na czas wywołania funkcji.
+
+    Dla generatorów span trwa do wyczerpania (lub zamknięcia) generatora.
+
+    Args:
+        name (str, optional): Nazwa spanu. Domyślnie kwalifikowana nazwa funkcji.
+        root (bool, optional): Czy funkcja jest akcją użytkownika (span główny).
+
+    Returns:
+        callable: Dekorator.
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+        open_span = trace if root else span
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                with open_span(label):
+                    yield from func(*args, **kwargs)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with open_span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,23 @@
+"""
+Uruchomienie serwera Afirmatora z rozgrzewką od startu procesu.
+
+Przy "streamlit run app.py" rozgrzewka i punkt końcowy /metrics ruszają dopiero
+w pierwszym przebiegu skryptu, czyli gdy czeka już pierwszy użytkownik. Ten skrypt
+uruchamia je przed startem serwera Streamlit w tym samym procesie:
+    python serve.py
+    python serve.py --server.port 8080 --server.headless true
+"""
+import os
+import sys
+from streamlit.web import cli as streamlit_cli
+from modules.warmup import start_warmup
+from monitoring.metrics import start_metrics_server
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+if __name__ == "__main__":
+    start_warmup()
+    start_metrics_server()
+    # Pozostałe argumenty trafiają do "streamlit run" (np. opcje serwera)
+    sys.argv = ["streamlit", "run", APP_PATH, *sys.argv[1:]]
+    sys.exit(streamlit_cli.main())
@@ -0,0 +1,214 @@
+"""
+Asynchroniczna nakładka na serwis OpenAI.
+
+Metody korutynowe wykonują metody OpenAIService w wątkach roboczych, więc każde
+wywołanie przechodzi przez ten sam bezpiecznik, harmonogram zapytań, router modeli,
+pamięć podręczną TTS, metryki i śledzenie (kontekst bieżącego spanu jest przenoszony
+do wątku). Semafor ogranicza liczbę równoczesnych zapytań, a run_sync i gather_sync
+pozwalają uruchamiać korutyny z synchronicznego kodu Streamlit i wątków tła,
+dzięki czemu oczekiwania na sieć w przepływach z kilkoma wywołaniami nakładają się.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from config.constants import ASYNC_MAX_CONCURRENCY
+from services.scheduler import PRIORITY_INTERACTIVE
+
+# Wspólna pętla zdarzeń działająca w wątku tła (most dla kodu synchronicznego)
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+def _get_background_loop():
+    """
+    Zwraca pętlę zdarzeń działającą w wątku tła, tworząc ją przy pierwszym użyciu.
+
+    Returns:
+        asyncio.AbstractEventLoop: Pętla zdarzeń wątku tła.
+    """
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None or _background_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="afirmator-async-loop", daemon=True)
+            thread.start()
+            _background_loop = loop
+        return _background_loop
+
+def _copy_outcome(task, result):
+    """Przenosi wynik zadania asyncio do future oczekującego wątku."""
+    if result.done():
+        return
+    if task.cancelled():
+        result.cancel()
+    elif task.exception() is not None:
+        result.set_exception(task.exception())
+    else:
+        result.set_result(task.result())
+
+def run_sync(coro, timeout=None):
+    """
+    Uruchamia korutynę we wspólnej pętli tła i czeka na jej wynik.
+
+    Korutyna działa w kopii kontekstu wywołującego wątku, więc jej wywołania
+    są spanami podrzędnymi bieżącej akcji użytkownika.
+
+    Args:
+        coro (coroutine): Korutyna do wykonania.
+        timeout (float, optional): Maksymalny czas oczekiwania w sekundach.
+
+    Returns:
+        Any: Wynik korutyny.
+
+    Raises:
+        concurrent.futures.TimeoutError: Gdy korutyna nie zakończyła się w czasie (zostaje anulowana).
+    """
+    loop = _get_background_loop()
+    context = contextvars.copy_context()
+    result = concurrent.futures.Future()
+    tasks = []
+
+    def _start():
+        task = context.run(loop.create_task, coro)
+        task.add_done_callback(lambda done: _copy_outcome(done, result))
+        tasks.append(task)
+
+    loop.call_soon_threadsafe(_start)
+    try:
+        return result.result(timeout)
+    except concurrent.futures.TimeoutError:
+        loop.call_soon_threadsafe(lambda: [task.cancel() for task in tasks])
+        raise
+
+def gather_sync(*coros, timeout=None, return_exceptions=False):
+    """
+    Uruchamia kilka korutyn równolegle i zwraca listę ich wyników.
+
+    Args:
+        *coros (coroutine): Korutyny do wykonania.
+        timeout (float, optional): Maksymalny czas oczekiwania w sekundach.
+        return_exceptions (bool, optional): Czy zwracać wyjątki jako wyniki zamiast je zgłaszać.
+
+    Returns:
+        list: Wyniki w kolejności przekazanych korutyn.
+    """
+    async def _gather():
+        return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+    return run_sync(_gather(), timeout)
+
+class AsyncOpenAIService:
+    """Klasa obsługująca asynchroniczne interakcje z OpenAI API."""
+
+    def __init__(self, openai_service=None, max_concurrency=ASYNC_MAX_CONCURRENCY):
+        """
+        Inicjalizuje asynchroniczny serwis OpenAI.
+
+        Args:
+            openai_service (OpenAIService, optional): Serwis synchroniczny wykonujący zapytania.
+                                                      Jeśli None, tworzony jest nowy (klucz API
+                                                      z st.session_state).
+            max_concurrency (int, optional): Maksymalna liczba równoczesnych zapytań.
+        """
+        if openai_service is None:
+            from services.openai_service import OpenAIService
+            openai_service = OpenAIService()
+        self.openai_service = openai_service
+        self.max_concurrency = max_concurrency
+        # Semafor jest powiązany z pętlą zdarzeń, więc tworzymy go dopiero w niej
+        self._semaphores = {}
+
+    def _get_semaphore(self):
+        """
+        Zwraca semafor ograniczający współbieżność dla bieżącej pętli zdarzeń.
+
+        Returns:
+            asyncio.Semaphore: Semafor dla bieżącej pętli.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _call(self, method, *args, **kwargs):
+        """
+        Wykonuje metodę serwisu synchronicznego w wątku roboczym w granicach semafora.
+
+        Args:
+            method (callable): Metoda OpenAIService.
+            *args: Argumenty pozycyjne metody.
+            **kwargs: Argumenty nazwane metody.
+
+        Returns:
+            Any: Wynik metody.
+        """
+        async with self._get_semaphore():
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+    async def generate_affirmation(self, prompt, model=None, temperature=0.7, max_tokens=250,
+                                   priority=PRIORITY_INTERACTIVE, use_case="generator"):
+        """
+        Generuje afirmację za pomocą API OpenAI.
+
+        Args:
+            prompt (str): Prompt dla modelu.
+            model (str, optional): Model do użycia. Domyślnie wybierany przez router dla use_case.
+            temperature (float, optional): Wartość temperature. Domyślnie 0.7.
+            max_tokens (int, optional): Maksymalna ilość tokenów. Domyślnie 250.
+            priority (int, optional): Priorytet w harmonogramie zapytań.
+            use_case (str, optional): Przypadek użycia dla routera modeli. Domyślnie "generator".
+
+        Returns:
+            str: Wygenerowana afirmacja.
+
+        Raises:
+            ServiceUnavailableError: Gdy usługa jest niedostępna (bezpiecznik otwarty).
+            Exception: W przypadku innego błędu API.
+        """
+        return await self._call(
+            self.openai_service.generate_affirmation, prompt, model=model, temperature=temperature,
+            max_tokens=max_tokens, priority=priority, use_case=use_case
+        )
+
+    async def generate_affirmation_audio(self, text, voice="fable", model="tts-1", speed=0.9,
+                                         priority=PRIORITY_INTERACTIVE):
+        """
+        Generuje audio dla afirmacji za pomocą OpenAI API z kontrolą prędkości.
+
+        Args:
+            text (str): Tekst do zamiany na mowę.
+            voice (str, optional): Typ głosu. Domyślnie "fable".
+            model (str, optional): Model TTS. Domyślnie "tts-1".
+            speed (float, optional): Prędkość mówienia (0.5-1.5). Domyślnie 0.9.
+            priority (int, optional): Priorytet w harmonogramie zapytań.
+
+        Returns:
+            bytes: Dane audio w formacie MP3.
+
+        Raises:
+            ServiceUnavailableError: Gdy usługa jest niedostępna (bezpiecznik otwarty).
+            Exception: W przypadku innego błędu API.
+        """
+        return await self._call(
+            self.openai_service.generate_affirmation_audio, text, voice=voice, model=model,
+            speed=speed, priority=priority
+        )
+
+    def daily_affirmation_system_prompt(self):
+        """
+        Zwraca treść promptu systemowego dla afirmacji dnia.
+
+        Returns:
+            str: Prompt systemowy.
+        """
+        return self.openai_service.daily_affirmation_system_prompt()
+
+    def generator_affirmation_system_prompt(self):
+        """
+        Zwraca treść promptu systemowego dla generatora afirmacji.
+
+        Returns:
+            str: Prompt systemowy.
+        """
+        return self.openai_service.generator_affirmation_system_prompt()
@@ -0,0 +1,328 @@
+"""
+Wspólny magazyn plików (nagrań audio) adresowanych treścią.
+
+Stan sesji przechowuje tylko identyfikatory, a dane trafiają tu raz, nawet jeśli
+to samo nagranie ma wiele sesji. Magazyn zlicza odwołania, pilnuje limitu na sesję,
+zwalnia odwołania nieaktywnych sesji po czasie TTL i przenosi najdawniej używane
+dane na dysk, gdy w pamięci robi się ciasno.
+
+Każdy proces serwera zapisuje dane we własnym podkatalogu katalogu BLOB_SPILL_DIR
+(usuwanym przy zamknięciu procesu), więc procesy współdzielące katalog danych nie
+usuwają sobie nawzajem plików. Operacje na plikach są wykonywane poza blokadą.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from config.constants import (
+    BLOB_MEMORY_LIMIT,
+    BLOB_SESSION_QUOTA,
+    BLOB_TTL_SECONDS,
+    BLOB_SPILL_DIR,
+)
+
+logger = logging.getLogger(__name__)
+
+class BlobQuotaExceededError(Exception):
+    """Plik jest większy niż limit pamięci jednej sesji."""
+
+class _Blob:
+    """Dane jednego pliku i liczba odwołań do niego."""
+
+    __slots__ = ("data", "path", "size", "refcount", "spilling")
+
+    def __init__(self, data):
+        self.data = data
+        self.path = None
+        self.size = len(data)
+        self.refcount = 0
+        self.spilling = False
+
+class _Session:
+    """Odwołania jednej sesji (od najstarszego) i czas ostatniej aktywności."""
+
+    __slots__ = ("refs", "used", "last_seen")
+
+    def __init__(self):
+        self.refs = OrderedDict()
+        self.used = 0
+        self.last_seen = time.monotonic()
+
+class BlobStore:
+    """Magazyn plików ze zliczaniem odwołań, limitem na sesję, TTL i zapisem na dysk."""
+
+    def __init__(self, memory_limit=BLOB_MEMORY_LIMIT, session_quota=BLOB_SESSION_QUOTA,
+                 ttl_seconds=BLOB_TTL_SECONDS, spill_dir=BLOB_SPILL_DIR):
+        """
+        Inicjalizuje pusty magazyn.
+
+        Args:
+            memory_limit (int, optional): Maksymalny rozmiar danych w pamięci (bajty).
+            session_quota (int, optional): Maksymalny rozmiar plików jednej sesji (bajty).
+            ttl_seconds (float, optional): Czas bezczynności, po którym sesja traci odwołania.
+            spill_dir (str, optional): Katalog, w którym proces tworzy własny podkatalog
+                                       na dane przeniesione z pamięci.
+        """
+        self.memory_limit = memory_limit
+        self.session_quota = session_quota
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir
+        self._process_dir = None
+        self._blobs = OrderedDict()  # Od najdawniej używanego
+        self._sessions = {}
+        self._memory_used = 0
+        self._spilling_bytes = 0
+        self._lock = threading.Lock()
+        self._dir_lock = threading.Lock()
+
+    def _get_process_dir(self):
+        """
+        Zwraca podkatalog tego procesu, tworząc go przy pierwszym zapisie na dysk.
+
+        Returns:
+            str: Ścieżka podkatalogu.
+        """
+        with self._dir_lock:
+            if self._process_dir is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self._process_dir = tempfile.mkdtemp(prefix=f"proc-{os.getpid()}-", dir=self.spill_dir)
+                atexit.register(self.close)
+            return self._process_dir
+
+    def close(self):
+        """Usuwa podkatalog tego procesu wraz z danymi przeniesionymi na dysk."""
+        with self._dir_lock:
+            process_dir, self._process_dir = self._process_dir, None
+        if process_dir:
+            shutil.rmtree(process_dir, ignore_errors=True)
+
+    @staticmethod
+    def _remove_files(paths):
+        """Usuwa pliki nieużywanych danych (wywoływane poza blokadą)."""
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def put(self, session_id, data):
+        """
+        Zapisuje dane i dodaje do nich odwołanie sesji.
+
+        Args:
+            session_id (str): Identyfikator sesji.
+            data (bytes): Dane pliku.
+
+        Returns:
+            str: Identyfikator pliku (skrót SHA-256 treści).
+
+        Raises:
+            BlobQuotaExceededError: Gdy plik jest większy niż limit sesji.
+        """
+        if len(data) > self.session_quota:
+            raise BlobQuotaExceededError(
+                f"Plik ({len(data) // 1024} KB) przekracza limit sesji ({self.session_quota // 1024} KB)"
+            )
+        blob_id = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            unused_paths = self._expire_sessions()
+            session = self._sessions.setdefault(session_id, _Session())
+            session.last_seen = time.monotonic()
+
+            blob = self._blobs.get(blob_id)
+            if blob is None:
+                blob = _Blob(data)
+                self._blobs[blob_id] = blob
+                self._memory_used += blob.size
+            self._blobs.move_to_end(blob_id)
+
+            if blob_id not in session.refs:
+                # Najstarsze pliki sesji ustępują miejsca nowemu
+                while session.refs and session.used + blob.size > self.session_quota:
+                    oldest_id = next(iter(session.refs))
+                    unused_paths.extend(self._release_all(session, oldest_id))
+                session.used += blob.size
+            session.refs[blob_id] = session.refs.pop(blob_id, 0) + 1
+            blob.refcount += 1
+
+            to_spill = self._select_spill()
+
+        self._remove_files(unused_paths)
+        if to_spill:
+            self._spill(to_spill)
+        return blob_id
+
+    def get(self, session_id, blob_id):
+        """
+        Zwraca dane pliku.
+
+        Args:
+            session_id (str): Identyfikator sesji (odnawia jej aktywność).
+            blob_id (str): Identyfikator pliku.
+
+        Returns:
+            bytes: Dane lub None, jeśli plik został już usunięty.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_seen = time.monotonic()
+            blob = self._blobs.get(blob_id)
+            if blob is None:
+                return None
+            self._blobs.move_to_end(blob_id)
+            if blob.data is not None:
+                return blob.data
+            path = blob.path
+
+        try:
+            with open(path, "rb") as blob_file:
+                return blob_file.read()
+        except OSError:
+            logger.warning("Nie udało się odczytać pliku %s z dysku", blob_id)
+            return None
+
+    def release(self, session_id, blob_id):
+        """
+        Usuwa jedno odwołanie sesji do pliku; plik bez odwołań jest usuwany.
+
+        Args:
+            session_id (str): Identyfikator sesji.
+            blob_id (str): Identyfikator pliku.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or blob_id not in session.refs:
+                return
+            session.refs[blob_id] -= 1
+            if session.refs[blob_id] == 0:
+                del session.refs[blob_id]
+                session.used -= self._blobs[blob_id].size
+            unused_path = self._decref(blob_id)
+        if unused_path:
+            self._remove_files([unused_path])
+
+    def stats(self):
+        """
+        Zwraca statystyki magazynu.
+
+        Returns:
+            dict: Liczba plików i sesji oraz rozmiar danych w pamięci i łącznie.
+        """
+        with self._lock:
+            return {
+                "blobs": len(self._blobs),
+                "sessions": len(self._sessions),
+                "memory_bytes": self._memory_used,
+                "total_bytes": sum(blob.size for blob in self._blobs.values()),
+            }
+
+    def _release_all(self, session, blob_id):
+        """
+        Usuwa wszystkie odwołania sesji do pliku (wywoływane pod blokadą).
+
+        Returns:
+            list: Ścieżki plików na dysku do usunięcia po zwolnieniu blokady.
+        """
+        count = session.refs.pop(blob_id)
+        session.used -= self._blobs[blob_id].size
+        paths = [self._decref(blob_id) for _ in range(count)]
+        return [path for path in paths if path]
+
+    def _decref(self, blob_id):
+        """
+        Zmniejsza licznik odwołań i usuwa nieużywany plik z magazynu (wywoływane pod blokadą).
+
+        Returns:
+            str: Ścieżka pliku na dysku do usunięcia po zwolnieniu blokady lub None.
+        """
+        blob = self._blobs[blob_id]
+        blob.refcount -= 1
+        if blob.refcount > 0:
+            return None
+        del self._blobs[blob_id]
+        if blob.data is not None:
+            self._memory_used -= blob.size
+        return blob.path
+
+    def _expire_sessions(self):
+        """
+        Zwalnia odwołania sesji nieaktywnych dłużej niż TTL (wywoływane pod blokadą).
+
+        Returns:
+            list: Ścieżki plików na dysku do usunięcia po zwolnieniu blokady.
+        """
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [session_id for session_id, session in self._sessions.items() if session.last_seen < cutoff]
+        paths = []
+        for session_id in expired:
+            session = self._sessions.pop(session_id)
+            for blob_id in list(session.refs):
+                paths.extend(self._release_all(session, blob_id))
+        return paths
+
+    def _select_spill(self):
+        """
+        Wybiera najdawniej używane dane do przeniesienia na dysk (wywoływane pod blokadą).
+
+        Wybrane dane zostają w pamięci do zakończenia zapisu; rozmiar danych w trakcie
+        zapisu jest uwzględniany, żeby równoległe wywołania nie wybrały ich ponownie.
+
+        Returns:
+            list: Pary (identyfikator, plik) do zapisania na dysku.
+        """
+        selected = []
+        for blob_id, blob in self._blobs.items():
+            if self._memory_used - self._spilling_bytes <= self.memory_limit:
+                break
+            if blob.data is None or blob.spilling:
+                continue
+            blob.spilling = True
+            self._spilling_bytes += blob.size
+            selected.append((blob_id, blob))
+        return selected
+
+    def _spill(self, selected):
+        """
+        Zapisuje wybrane dane na dysk poza blokadą i zwalnia je z pamięci.
+
+        Args:
+            selected (list): Pary (identyfikator, plik) z _select_spill.
+        """
+        try:
+            process_dir = self._get_process_dir()
+        except OSError:
+            logger.exception("Nie udało się utworzyć katalogu %s", self.spill_dir)
+            process_dir = None
+
+        for blob_id, blob in selected:
+            path = None
+            if process_dir:
+                path = os.path.join(process_dir, f"{blob_id}.blob")
+                try:
+                    with open(path, "wb") as blob_file:
+                        blob_file.write(blob.data)
+                except OSError:
+                    logger.exception("Nie udało się zapisać pliku %s na dysk", blob_id)
+                    path = None
+
+            with self._lock:
+                blob.spilling = False
+                self._spilling_bytes -= blob.size
+                # Plik mógł zostać zwolniony w trakcie zapisu
+                still_stored = self._blobs.get(blob_id) is blob
+                if path and still_stored:
+                    blob.path = path
+                    blob.data = None
+                    self._memory_used -= blob.size
+            if path and not still_stored:
+                self._remove_files([path])
+
+# Wspólny magazyn dla wszystkich sesji
+blob_store = BlobStore()
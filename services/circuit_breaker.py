@@ -0,0 +1,157 @@
+"""
+Bezpiecznik (circuit breaker) dla wywołań OpenAI API.
+
+Po serii awarii (przekroczony czas, błędy połączenia, błędy 5xx) bezpiecznik
+otwiera się i kolejne wywołania od razu zgłaszają ServiceUnavailableError,
+dzięki czemu interfejs może natychmiast skorzystać z lokalnej alternatywy.
+W tle usługa jest okresowo sprawdzana, a po udanej próbie bezpiecznik się zamyka.
+"""
+import logging
+import threading
+import time
+from config.constants import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+class ServiceUnavailableError(Exception):
+    """Usługa jest niedostępna (bezpiecznik otwarty lub awaria usługi)."""
+
+class CircuitBreaker:
+    """Bezpiecznik dla jednego punktu końcowego API."""
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 recovery_timeout=CIRCUIT_RECOVERY_TIMEOUT, probe=None):
+        """
+        Inicjalizuje zamknięty bezpiecznik.
+
+        Args:
+            name (str): Nazwa punktu końcowego (np. "chat", "tts").
+            failure_threshold (int, optional): Liczba kolejnych awarii otwierająca bezpiecznik.
+            recovery_timeout (float, optional): Czas w sekundach między próbami w tle.
+            probe (callable, optional): Funkcja bez argumentów sprawdzająca dostępność usługi
+                                        w tle; zgłasza wyjątek, gdy usługa nie działa.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe = probe
+        self._probe_thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        """bool: True, jeśli wywołania są obecnie blokowane."""
+        return self.state == STATE_OPEN
+
+    def call(self, fn, is_failure):
+        """
+        Wykonuje wywołanie chronione bezpiecznikiem.
+
+        Args:
+            fn (callable): Funkcja wykonująca wywołanie.
+            is_failure (callable): Funkcja oceniająca, czy wyjątek oznacza awarię usługi.
+
+        Returns:
+            Any: Wynik funkcji fn.
+
+        Raises:
+            ServiceUnavailableError: Gdy bezpiecznik jest otwarty lub wywołanie zakończyło się awarią usługi.
+        """
+        self._before_call()
+        try:
+            result = fn()
+        except Exception as e:
+            if is_failure(e):
+                self._record_failure()
+                raise ServiceUnavailableError(f"Usługa {self.name} jest niedostępna: {str(e)}") from e
+            raise
+        self._record_success()
+        return result
+
+    def _before_call(self):
+        """Blokuje wywołanie, gdy bezpiecznik jest otwarty."""
+        with self._lock:
+            if self.state != STATE_OPEN:
+                return
+            # Bez funkcji sprawdzającej przepuszczamy pojedyncze wywołanie próbne
+            if self._probe is None and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self.state = STATE_HALF_OPEN
+                return
+        raise ServiceUnavailableError(f"Usługa {self.name} jest chwilowo niedostępna")
+
+    def _record_success(self):
+        """Zamyka bezpiecznik po udanym wywołaniu."""
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                logger.info("Bezpiecznik %s zamknięty - usługa znów działa", self.name)
+            self.state = STATE_CLOSED
+            self._failures = 0
+
+    def _record_failure(self):
+        """Zlicza awarię i otwiera bezpiecznik po przekroczeniu progu."""
+        with self._lock:
+            self._failures += 1
+            if self.state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    logger.warning("Bezpiecznik %s otwarty po %d awariach", self.name, self._failures)
+                self.state = STATE_OPEN
+                self._opened_at = time.monotonic()
+                self._start_probing()
+
+    def _start_probing(self):
+        """Uruchamia wątek sprawdzający usługę w tle (wywoływane pod blokadą)."""
+        if self._probe is None or (self._probe_thread and self._probe_thread.is_alive()):
+            return
+        self._probe_thread = threading.Thread(
+            target=self._probe_loop, name=f"afirmator-probe-{self.name}", daemon=True
+        )
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        """Okresowo sprawdza usługę, dopóki bezpiecznik jest otwarty."""
+        while self.is_open:
+            time.sleep(self.recovery_timeout)
+            try:
+                self._probe()
+            except Exception as e:
+                logger.info("Próba usługi %s nieudana: %s", self.name, str(e))
+                continue
+            self._record_success()
+
+# Bezpieczniki współdzielone przez cały proces serwera
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(endpoint, probe=None):
+    """
+    Zwraca bezpiecznik dla punktu końcowego, tworząc go przy pierwszym użyciu.
+
+    Bezpiecznik jest wspólny dla wszystkich sesji, więc funkcja sprawdzająca nie może
+    zależeć od klucza API żadnej z nich. Jest ustawiana tylko raz - przez pierwsze
+    wywołanie, które ją podaje; kolejne wywołania jej nie podmieniają.
+
+    Args:
+        endpoint (str): Nazwa punktu końcowego (np. "chat", "tts").
+        probe (callable, optional): Funkcja sprawdzająca dostępność usługi w tle.
+
+    Returns:
+        CircuitBreaker: Bezpiecznik punktu końcowego.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint, probe=probe)
+        elif breaker._probe is None and probe is not None:
+            with breaker._lock:
+                breaker._probe = probe
+                # Bezpiecznik mógł się otworzyć, zanim poznał funkcję sprawdzającą
+                if breaker.state == STATE_OPEN:
+                    breaker._start_probing()
+        return breaker
@@ -0,0 +1,227 @@
+"""
+Wybór modelu dla generowania afirmacji z uwzględnieniem budżetu opóźnień i kosztów.
+
+Każdy przypadek użycia (afirmacja dnia, generator, zadania wsadowe) ma listę
+modeli w kolejności preferencji. Router śledzi kroczące percentyle p50/p95
+opóźnień modeli i przełącza się na kolejny model, gdy podstawowy przekracza
+budżet. Do percentyli trafiają tylko udane wywołania - nieudane (często kończące
+się natychmiast albo dopiero po upływie limitu czasu) zniekształcałyby opóźnienia
+i są zliczane osobno. Model, którego wywołania często się nie udają (limity czasu,
+błędy 5xx), też przekracza budżet, nawet jeśli nie ma żadnych udanych próbek.
+
+Pojedyncze odpowiedzi, strumienie i zapytania o kilka wariantów (n=K) mają różne
+czasy trwania, więc każdy rodzaj wywołania ma osobne okno statystyk modelu.
+Każda decyzja wraz z obserwowanym opóźnieniem jest zapisywana i widoczna
+w panelu deweloperskim.
+"""
+import threading
+import time
+from collections import deque, namedtuple
+from services.stats import percentile
+from config.constants import (
+    MODEL_ROUTES,
+    MODEL_COSTS,
+    LATENCY_WINDOW_SECONDS,
+    LATENCY_MIN_SAMPLES,
+    ROUTER_MAX_FAILURE_RATE,
+)
+
+RoutingDecision = namedtuple("RoutingDecision", ["use_case", "model", "reason"])
+
+# Powody decyzji
+REASON_PRIMARY = "primary"
+REASON_LATENCY = "latency_fallback"
+REASON_COST = "cost_fallback"
+REASON_BEST_EFFORT = "best_effort"
+REASON_EXPLICIT = "explicit"
+
+# Rodzaje wywołań (osobne okna statystyk)
+CALL_COMPLETE = "complete"
+CALL_STREAM = "stream"
+CALL_VARIANTS = "variants"
+
+def estimate_cost(model, max_tokens):
+    """
+    Szacuje maksymalny koszt wywołania (w USD) na podstawie limitu tokenów.
+
+    Args:
+        model (str): Nazwa modelu.
+        max_tokens (int): Maksymalna liczba tokenów odpowiedzi.
+
+    Returns:
+        float: Szacowany koszt lub 0.0 dla modeli bez cennika.
+    """
+    return MODEL_COSTS.get(model, 0.0) * max_tokens / 1000
+
+class ModelRouter:
+    """Router modeli z kroczącymi statystykami opóźnień."""
+
+    def __init__(self, routes=None, window_seconds=LATENCY_WINDOW_SECONDS,
+                 min_samples=LATENCY_MIN_SAMPLES, max_failure_rate=ROUTER_MAX_FAILURE_RATE):
+        """
+        Inicjalizuje router.
+
+        Args:
+            routes (dict, optional): Konfiguracja przypadków użycia (patrz MODEL_ROUTES).
+            window_seconds (float, optional): Długość okna kroczącego w sekundach.
+            min_samples (int, optional): Minimalna liczba wywołań (udanych i nieudanych) do oceny modelu.
+            max_failure_rate (float, optional): Udział nieudanych wywołań, od którego model
+                                                przekracza budżet.
+        """
+        self.routes = MODEL_ROUTES if routes is None else routes
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.max_failure_rate = max_failure_rate
+        self._latencies = {}
+        self._failures = {}
+        self._decisions = deque(maxlen=500)
+        self._lock = threading.Lock()
+
+    def _prune(self, samples):
+        """Usuwa próbki starsze niż okno kroczące (wywoływane pod blokadą)."""
+        cutoff = time.monotonic() - self.window_seconds
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+
+    def _window(self, series):
+        """Zwraca próbki opóźnień serii (model, rodzaj wywołania) z okna kroczącego (pod blokadą)."""
+        samples = self._latencies.get(series, deque())
+        # Stare próbki wygasają, dzięki czemu model podstawowy po czasie dostaje kolejną szansę
+        self._prune(samples)
+        return [latency for _, latency in samples]
+
+    def _failure_count(self, series):
+        """Zwraca liczbę nieudanych wywołań serii w oknie kroczącym (wywoływane pod blokadą)."""
+        failures = self._failures.get(series, deque())
+        self._prune(failures)
+        return len(failures)
+
+    def latency_stats(self, model, call=CALL_COMPLETE):
+        """
+        Zwraca kroczące statystyki opóźnień modelu dla rodzaju wywołania.
+
+        Args:
+            model (str): Nazwa modelu.
+            call (str, optional): Rodzaj wywołania (CALL_COMPLETE, CALL_STREAM, CALL_VARIANTS).
+
+        Returns:
+            dict: Liczba udanych wywołań, p50 i p95 ich opóźnień w sekundach (None bez próbek),
+                  liczba nieudanych wywołań i ich udział (None bez wywołań).
+        """
+        with self._lock:
+            samples = self._window((model, call))
+            failures = self._failure_count((model, call))
+        total = len(samples) + failures
+        return {
+            "count": len(samples),
+            "failures": failures,
+            "failure_rate": failures / total if total else None,
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+        }
+
+    def _over_budget(self, stats, latency_budget):
+        """
+        Sprawdza, czy model przekracza budżet: zbyt wolne udane wywołania albo zbyt wiele nieudanych.
+
+        Args:
+            stats (dict): Statystyki z latency_stats.
+            latency_budget (float): Budżet opóźnienia p95 w sekundach.
+
+        Returns:
+            bool: True, jeśli model przekracza budżet.
+        """
+        if stats["count"] + stats["failures"] < self.min_samples:
+            return False
+        if stats["failure_rate"] >= self.max_failure_rate:
+            return True
+        return stats["count"] >= self.min_samples and stats["p95"] > latency_budget
+
+    def route(self, use_case, max_tokens, call=CALL_COMPLETE):
+        """
+        Wybiera model dla przypadku użycia.
+
+        Args:
+            use_case (str): Przypadek użycia ("daily", "generator", "batch").
+            max_tokens (int): Maksymalna liczba tokenów odpowiedzi.
+            call (str, optional): Rodzaj wywołania, którego statystyki są brane pod uwagę.
+
+        Returns:
+            RoutingDecision: Wybrany model i powód decyzji.
+        """
+        route = self.routes[use_case]
+        models = route["models"]
+        reason = REASON_PRIMARY
+        best_model, best_rank = None, None
+
+        for model in models:
+            if estimate_cost(model, max_tokens) > route["cost_budget"]:
+                reason = REASON_COST
+                continue
+
+            stats = self.latency_stats(model, call)
+            if self._over_budget(stats, route["latency_budget"]):
+                # Najpierw najmniej awaryjny, potem najszybszy z obserwowanych
+                rank = (stats["failure_rate"], stats["p95"] if stats["p95"] is not None else float("inf"))
+                if best_rank is None or rank < best_rank:
+                    best_model, best_rank = model, rank
+                if reason == REASON_PRIMARY:
+                    reason = REASON_LATENCY
+                continue
+
+            return RoutingDecision(use_case, model, reason)
+
+        # Żaden model nie mieści się w budżecie - wybieramy najlepszy z obserwowanych
+        return RoutingDecision(use_case, best_model or models[-1], REASON_BEST_EFFORT)
+
+    def record(self, use_case, model, reason, latency, ok, call=CALL_COMPLETE):
+        """
+        Zapisuje decyzję routingu i obserwowane opóźnienie wywołania.
+
+        Args:
+            use_case (str): Przypadek użycia.
+            model (str): Użyty model.
+            reason (str): Powód wyboru modelu.
+            latency (float): Czas wywołania w sekundach.
+            ok (bool): Czy wywołanie zakończyło się sukcesem. Opóźnienia nieudanych
+                       wywołań nie trafiają do percentyli, tylko do licznika awarii.
+            call (str, optional): Rodzaj wywołania (CALL_COMPLETE, CALL_STREAM, CALL_VARIANTS).
+        """
+        with self._lock:
+            samples = self._latencies if ok else self._failures
+            samples.setdefault((model, call), deque()).append((time.monotonic(), latency))
+            self._decisions.append({
+                "timestamp": time.time(),
+                "use_case": use_case,
+                "call": call,
+                "model": model,
+                "reason": reason,
+                "latency": latency,
+                "ok": ok,
+            })
+
+    def series(self):
+        """
+        Zwraca pary (model, rodzaj wywołania), dla których zapisano wywołania.
+
+        Returns:
+            list: Pary (model, rodzaj wywołania), posortowane.
+        """
+        with self._lock:
+            return sorted(set(self._latencies) | set(self._failures))
+
+    def recent_decisions(self, limit=50):
+        """
+        Zwraca ostatnie decyzje routingu.
+
+        Args:
+            limit (int, optional): Maksymalna liczba decyzji. Domyślnie 50.
+
+        Returns:
+            list: Słowniki z decyzjami, od najnowszej.
+        """
+        with self._lock:
+            return list(self._decisions)[-limit:][::-1]
+
+# Wspólny router dla całego procesu serwera
+model_router = ModelRouter()
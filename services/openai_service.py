@@ -1,57 +1,330 @@
 """
 Usługi związane z OpenAI API.
 """
+import functools
+import threading
+import time
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, APIConnectionError, APIStatusError, DefaultHttpxClient
+from config.constants import API_DEADLINES, AFFIRMATION_VARIANTS
+from services.single_flight import single_flight, make_key
+from services.tts_cache import tts_cache, tts_cache_key
+from services.scheduler import scheduler, PRIORITY_INTERACTIVE
+from services.circuit_breaker import get_breaker, ServiceUnavailableError
+from services.model_router import model_router, REASON_EXPLICIT, CALL_COMPLETE, CALL_STREAM, CALL_VARIANTS
+from monitoring.timing import timed, KIND_SERVICE
+from monitoring.tracing import traced, set_attribute
+from monitoring.profiling import profiled
+from monitoring.metrics import (
+    CHAT_REQUESTS,
+    CHAT_LATENCY,
+    TTS_REQUESTS,
+    TTS_LATENCY,
+    OUTCOME_OK,
+    OUTCOME_ERROR,
+    OUTCOME_UNAVAILABLE,
+    record_cache,
+)
+
+class RequestCancelledError(Exception):
+    """Zapytanie anulowano, zanim zostało wysłane do API."""
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client():
+    """
+    Zwraca wspólnego klienta HTTP dla wszystkich instancji OpenAIService.
+    
+    Instancja serwisu powstaje przy każdym odświeżeniu strony; wspólny klient
+    (z pulą połączeń) oszczędza budowanie kontekstu TLS i ponowne łączenie.
+    
+    Returns:
+        DefaultHttpxClient: Klient HTTP.
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = DefaultHttpxClient()
+        return _http_client
+
+def _is_outage(error):
+    """
+    Sprawdza, czy błąd oznacza awarię usługi (a nie np. błędny klucz API).
+    
+    Args:
+        error (Exception): Błąd zgłoszony przez klienta OpenAI.
+        
+    Returns:
+        bool: True dla przekroczenia czasu, błędów połączenia i błędów 5xx.
+    """
+    if isinstance(error, APIConnectionError):  # Obejmuje również APITimeoutError
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+def _probe_api(base_url):
+    """
+    Sprawdza dostępność API bez klucza żadnego użytkownika.
+    
+    Zapytanie bez poświadczeń kończy się odpowiedzią 401, gdy usługa działa, więc o awarii
+    świadczą tylko błędy połączenia i odpowiedzi 5xx (tak jak w _is_outage).
+    
+    Args:
+        base_url (str): Adres API (np. "https://api.openai.com/v1/").
+        
+    Raises:
+        Exception: Gdy usługa nie odpowiada lub zwraca błąd 5xx.
+    """
+    response = get_http_client().get(
+        str(base_url).rstrip("/") + "/models", timeout=API_DEADLINES["probe"]
+    )
+    if response.status_code >= 500:
+        raise Exception(f"Odpowiedź HTTP {response.status_code}")
+
+def _record_chat(operation, seconds, ok):
+    """Zapisuje metryki zapytania do modelu czatu."""
+    CHAT_REQUESTS.inc(operation=operation, outcome=OUTCOME_OK if ok else OUTCOME_ERROR)
+    CHAT_LATENCY.observe(seconds, operation=operation)
 
 class OpenAIService:
     """Klasa obsługująca interakcje z OpenAI API."""
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, base_url=None):
         """
         Inicjalizuje serwis OpenAI.
         
         Args:
             api_key (str, optional): Klucz API OpenAI. Jeśli None, 
                                      próbuje pobrać z st.session_state.
+            base_url (str, optional): Adres API (np. lokalnego serwera testowego).
+                                      Jeśli None, używana jest zmienna OPENAI_BASE_URL
+                                      lub domyślny adres OpenAI.
         """
         if api_key is None and 'api_key' in st.session_state:
             api_key = st.session_state.api_key
             
-        self.client = OpenAI(api_key=api_key)
+        # Ponawianiem po błędach 429 zajmuje się harmonogram zapytań
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0, http_client=get_http_client())
+        # Skrót poświadczeń - zapytania różnych kluczy API nie mogą współdzielić wyników ani limitów
+        self.tenant = make_key("tenant", self.client.api_key, str(self.client.base_url))
         
-    def generate_affirmation(self, prompt, model="gpt-4", temperature=0.7, max_tokens=250):
+        # Bezpieczniki są wspólne dla procesu; otwarty bezpiecznik sprawdza usługę w tle
+        probe = functools.partial(_probe_api, self.client.base_url)
+        self._chat_breaker = get_breaker("chat", probe)
+        self._tts_breaker = get_breaker("tts", probe)
+        
+    @timed(KIND_SERVICE)
+    @traced()
+    @profiled()
+    def generate_affirmation(self, prompt, model=None, temperature=0.7, max_tokens=250,
+                             priority=PRIORITY_INTERACTIVE, use_case="generator"):
         """
         Generuje afirmację za pomocą API OpenAI.
         
         Args:
             prompt (str): Prompt dla modelu.
-            model (str, optional): Model do użycia. Domyślnie "gpt-4".
+            model (str, optional): Model do użycia. Domyślnie wybierany przez router dla use_case.
             temperature (float, optional): Wartość temperature. Domyślnie 0.7.
             max_tokens (int, optional): Maksymalna ilość tokenów. Domyślnie 250.
+            priority (int, optional): Priorytet w harmonogramie zapytań.
+            use_case (str, optional): Przypadek użycia dla routera modeli
+                                      ("daily", "generator", "batch"). Domyślnie "generator".
             
         Returns:
             str: Wygenerowana afirmacja.
             
         Raises:
-            Exception: W przypadku błędu API.
+            ServiceUnavailableError: Gdy usługa jest niedostępna (bezpiecznik otwarty).
+            Exception: W przypadku innego błędu API.
         """
+        model, reason = self._route(model, use_case, max_tokens, CALL_COMPLETE)
+        
+        def _create():
+            started = time.monotonic()
+            ok = False
+            try:
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": "Jesteś doświadczonym coachem specjalizującym się w tworzeniu skutecznych afirmacji."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=API_DEADLINES["chat"]
+                )
+                ok = True
+            finally:
+                # Decyzja routera i obserwowane opóźnienie modelu
+                elapsed = time.monotonic() - started
+                model_router.record(use_case, model, reason, elapsed, ok, CALL_COMPLETE)
+                _record_chat("complete", elapsed, ok)
+            
+            return response.choices[0].message.content.strip('"')
+        
+        try:
+            # Identyczne zapytania w locie współdzielą jedno wywołanie API
+            key = make_key("chat", self.tenant, model, temperature, max_tokens, prompt)
+            return single_flight.do(
+                key, self._chat_breaker.call, lambda: scheduler.run(model, _create, priority, self.tenant), _is_outage
+            )
+        except ServiceUnavailableError:
+            CHAT_REQUESTS.inc(operation="complete", outcome=OUTCOME_UNAVAILABLE)
+            raise
+        except Exception as e:
+            raise Exception(f"Błąd podczas generowania afirmacji: {str(e)}")
+    
+    @timed(KIND_SERVICE)
+    @traced()
+    def generate_affirmation_variants(self, prompt, n=AFFIRMATION_VARIANTS, model=None, temperature=0.9,
+                                      max_tokens=250, priority=PRIORITY_INTERACTIVE, use_case="generator"):
+        """
+        Generuje kilka wariantów afirmacji w jednym zapytaniu do API OpenAI.
+        
+        Args:
+            prompt (str): Prompt dla modelu.
+            n (int, optional): Liczba wariantów. Domyślnie AFFIRMATION_VARIANTS.
+            model (str, optional): Model do użycia. Domyślnie wybierany przez router dla use_case.
+            temperature (float, optional): Wartość temperature. Domyślnie 0.9 (większa różnorodność).
+            max_tokens (int, optional): Maksymalna ilość tokenów jednego wariantu. Domyślnie 250.
+            priority (int, optional): Priorytet w harmonogramie zapytań.
+            use_case (str, optional): Przypadek użycia dla routera modeli. Domyślnie "generator".
+            
+        Returns:
+            list: Wygenerowane warianty afirmacji (bez powtórzeń).
+            
+        Raises:
+            ServiceUnavailableError: Gdy usługa jest niedostępna (bezpiecznik otwarty).
+            Exception: W przypadku innego błędu API.
+        """
+        # Koszt zapytania rośnie z liczbą wariantów
+        model, reason = self._route(model, use_case, max_tokens * n, CALL_VARIANTS)
+        
+        def _create():
+            started = time.monotonic()
+            ok = False
+            try:
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": "Jesteś doświadczonym coachem specjalizującym się w tworzeniu skutecznych afirmacji."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    n=n,
+                    timeout=API_DEADLINES["chat"]
+                )
+                ok = True
+            finally:
+                elapsed = time.monotonic() - started
+                model_router.record(use_case, model, reason, elapsed, ok, CALL_VARIANTS)
+                _record_chat("variants", elapsed, ok)
+            
+            variants = []
+            for choice in response.choices:
+                text = (choice.message.content or "").strip().strip('"')
+                if text and text not in variants:
+                    variants.append(text)
+            return variants
+        
         try:
-            response = self.client.chat.completions.create(
+            key = make_key("chat", self.tenant, model, temperature, max_tokens, n, prompt)
+            return single_flight.do(
+                key, self._chat_breaker.call, lambda: scheduler.run(model, _create, priority, self.tenant), _is_outage
+            )
+        except ServiceUnavailableError:
+            CHAT_REQUESTS.inc(operation="variants", outcome=OUTCOME_UNAVAILABLE)
+            raise
+        except Exception as e:
+            raise Exception(f"Błąd podczas generowania afirmacji: {str(e)}")
+    
+    @timed(KIND_SERVICE)
+    @traced()
+    def generate_affirmation_stream(self, prompt, model=None, temperature=0.7, max_tokens=250,
+                                    priority=PRIORITY_INTERACTIVE, use_case="generator"):
+        """
+        Generuje afirmację za pomocą API OpenAI, zwracając kolejne fragmenty tekstu.
+        
+        Args:
+            prompt (str): Prompt dla modelu.
+            model (str, optional): Model do użycia. Domyślnie wybierany przez router dla use_case.
+            temperature (float, optional): Wartość temperature. Domyślnie 0.7.
+            max_tokens (int, optional): Maksymalna ilość tokenów. Domyślnie 250.
+            priority (int, optional): Priorytet w harmonogramie zapytań.
+            use_case (str, optional): Przypadek użycia dla routera modeli
+                                      ("daily", "generator", "batch"). Domyślnie "generator".
+            
+        Yields:
+            str: Kolejne fragmenty (tokeny) generowanej afirmacji.
+            
+        Raises:
+            ServiceUnavailableError: Gdy usługa jest niedostępna (bezpiecznik otwarty).
+            Exception: W przypadku innego błędu API.
+        """
+        model, reason = self._route(model, use_case, max_tokens, CALL_STREAM)
+        started = None
+        ok = False
+        
+        def _create():
+            nonlocal started
+            started = time.monotonic()
+            return self.client.chat.completions.create(
                 model=model,
                 messages=[
                     {"role": "system", "content": "Jesteś doświadczonym coachem specjalizującym się w tworzeniu skutecznych afirmacji."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=temperature,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                stream=True,
+                timeout=API_DEADLINES["chat_stream"]
             )
+        
+        try:
+            # Błąd 429 pojawia się przy otwieraniu strumienia, więc tylko ten krok przechodzi przez harmonogram
+            stream = self._chat_breaker.call(lambda: scheduler.run(model, _create, priority, self.tenant), _is_outage)
             
-            return response.choices[0].message.content.strip('"')
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            ok = True
+        except ServiceUnavailableError:
+            if started is None:
+                CHAT_REQUESTS.inc(operation="stream", outcome=OUTCOME_UNAVAILABLE)
+            raise
         except Exception as e:
             raise Exception(f"Błąd podczas generowania afirmacji: {str(e)}")
+        finally:
+            # Opóźnienie całego strumienia, od wysłania zapytania do ostatniego fragmentu
+            if started is not None:
+                elapsed = time.monotonic() - started
+                model_router.record(use_case, model, reason, elapsed, ok, CALL_STREAM)
+                _record_chat("stream", elapsed, ok)
+    
+    def _route(self, model, use_case, max_tokens, call):
+        """
+        Wybiera model przez router, chyba że został wskazany wprost.
+        
+        Args:
+            model (str): Wskazany model lub None.
+            use_case (str): Przypadek użycia.
+            max_tokens (int): Maksymalna ilość tokenów.
+            call (str): Rodzaj wywołania (CALL_COMPLETE, CALL_STREAM, CALL_VARIANTS).
+            
+        Returns:
+            tuple: (model, powód decyzji)
+        """
+        if model is not None:
+            return model, REASON_EXPLICIT
+        decision = model_router.route(use_case, max_tokens, call)
+        return decision.model, decision.reason
     
-    def generate_affirmation_audio(self, text, voice="fable", model="tts-1", speed=0.9):
+    @timed(KIND_SERVICE)
+    @traced()
+    @profiled()
+    def generate_affirmation_audio(self, text, voice="fable", model="tts-1", speed=0.9,
+                                   priority=PRIORITY_INTERACTIVE, cancelled=None):
         """
         Generuje audio dla afirmacji za pomocą OpenAI API z kontrolą prędkości.
         
@@ -60,24 +333,72 @@ class OpenAIService:
             voice (str, optional): Typ głosu. Domyślnie "fable".
             model (str, optional): Model TTS. Domyślnie "tts-1".
             speed (float, optional): Prędkość mówienia (0.5-1.5). Domyślnie 0.9.
+            priority (int, optional): Priorytet w harmonogramie zapytań.
+            cancelled (callable, optional): Funkcja bez argumentów zwracająca True, gdy nagranie
+                                            przestało być potrzebne (np. nagranie w tle po edycji
+                                            tekstu). Sprawdzana tuż przed płatnym wywołaniem API.
             
         Returns:
             bytes: Dane audio w formacie MP3.
             
         Raises:
-            Exception: W przypadku błędu API.
+            RequestCancelledError: Gdy nagranie anulowano przed wywołaniem API.
+            ServiceUnavailableError: Gdy usługa jest niedostępna (bezpiecznik otwarty).
+            Exception: W przypadku innego błędu API.
         """
-        try:
-            # Bezpośrednie użycie tekstu bez żadnych modyfikacji
-            audio_response = self.client.audio.speech.create(
-                model=model,
-                voice=voice,
-                input=text,
-                response_format="mp3",
-                speed=speed
-            )
+        def _create():
+            # Zapytanie w tle mogło długo czekać w kolejce - tekst mógł się w tym czasie zmienić
+            if cancelled is not None and cancelled():
+                raise RequestCancelledError("Nagranie anulowano przed wysłaniem zapytania")
+            started = time.monotonic()
+            ok = False
+            try:
+                # Bezpośrednie użycie tekstu bez żadnych modyfikacji
+                audio_response = self.client.audio.speech.create(
+                    model=model,
+                    voice=voice,
+                    input=text,
+                    response_format="mp3",
+                    speed=speed,
+                    timeout=API_DEADLINES["tts"]
+                )
+                ok = True
+            finally:
+                TTS_REQUESTS.inc(backend="openai", outcome=OUTCOME_OK if ok else OUTCOME_ERROR)
+                TTS_LATENCY.observe(time.monotonic() - started, backend="openai")
             
             return audio_response.content
+        
+        key = tts_cache_key(model, voice, speed, text)
+        cached_audio = tts_cache.get(key)
+        record_cache("tts", cached_audio is not None)
+        set_attribute("cache_hit", cached_audio is not None)
+        if cached_audio is not None:
+            return cached_audio
+        
+        try:
+            while True:
+                try:
+                    # Identyczne zapytania w locie współdzielą jedno wywołanie API, ale tylko
+                    # w obrębie klucza API - błędy (401, insufficient_quota) dotyczą jednego klucza
+                    audio = single_flight.do(
+                        make_key("tts", self.tenant, key), self._tts_breaker.call,
+                        lambda: scheduler.run(model, _create, priority, self.tenant), _is_outage
+                    )
+                    break
+                except RequestCancelledError:
+                    if cancelled is not None and cancelled():
+                        raise
+                    # Anulowano cudze zadanie, do którego dołączyło to wywołanie - wysyłamy własne
+            # Nieaktualnego nagrania nie zapisujemy w pamięci podręcznej
+            if cancelled is None or not cancelled():
+                tts_cache.put(key, audio)
+            return audio
+        except ServiceUnavailableError:
+            TTS_REQUESTS.inc(backend="openai", outcome=OUTCOME_UNAVAILABLE)
+            raise
+        except RequestCancelledError:
+            raise
         except Exception as e:
             raise Exception(f"Błąd generowania audio: {str(e)}")
 
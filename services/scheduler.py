@@ -0,0 +1,348 @@
+"""
+Harmonogram zapytań do OpenAI API z limitami (token bucket) i ponawianiem po 429.
+
+Zapytania czekają w kolejce priorytetowej (interaktywne przed zadaniami w tle).
+Limity OpenAI dotyczą organizacji, więc każda para (klucz API, model) ma własny
+kubełek tokenów. Po odpowiedzi 429 para jest wstrzymywana zgodnie z nagłówkami
+Retry-After / x-ratelimit-reset-*, a zapytanie ponawiane z wykładniczym opóźnieniem
+i losowym rozrzutem (jitter). Kubełki dawno nieużywanych par są usuwane (LRU). Wyczerpany limit środków (insufficient_quota) nie
+minie po odczekaniu, więc taki błąd jest zgłaszany od razu.
+"""
+import email.utils
+import itertools
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from services.stats import percentile
+from config.constants import (
+    RATE_LIMITS,
+    DEFAULT_RATE_LIMIT,
+    SCHEDULER_MAX_RETRIES,
+    SCHEDULER_BASE_BACKOFF,
+    SCHEDULER_MAX_BACKOFF,
+    SCHEDULER_MAX_LIMIT_KEYS,
+)
+
+# Priorytety zapytań - mniejsza wartość oznacza wyższy priorytet
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Minimalny ułamek skonfigurowanego limitu po adaptacyjnym spowolnieniu
+_MIN_RATE_FACTOR = 0.1
+
+def _parse_duration(value):
+    """
+    Przelicza czas z nagłówków x-ratelimit-reset-* (np. "1s", "6m0s", "250ms") na sekundy.
+
+    Args:
+        value (str): Wartość nagłówka.
+
+    Returns:
+        float: Czas w sekundach lub None, jeśli nie udało się go odczytać.
+    """
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+def _header_delay(error):
+    """
+    Odczytuje z odpowiedzi błędu zalecany czas oczekiwania przed ponowieniem.
+
+    Args:
+        error (Exception): Błąd zgłoszony przez klienta OpenAI.
+
+    Returns:
+        float: Czas oczekiwania w sekundach lub None.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            retry_date = email.utils.parsedate_to_datetime(retry_after)
+            if retry_date is not None:
+                return max(0.0, retry_date.timestamp() - time.time())
+
+    delays = [
+        _parse_duration(headers[name])
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        if headers.get(name)
+    ]
+    delays = [delay for delay in delays if delay is not None]
+    return max(delays) if delays else None
+
+def is_quota_exhausted(error):
+    """
+    Sprawdza, czy błąd oznacza wyczerpanie środków na koncie (429 insufficient_quota).
+
+    Args:
+        error (Exception): Błąd zgłoszony przez klienta OpenAI.
+
+    Returns:
+        bool: True dla błędu insufficient_quota.
+    """
+    return getattr(error, "code", None) == "insufficient_quota"
+
+def is_rate_limit_error(error):
+    """
+    Sprawdza, czy błąd oznacza chwilowe przekroczenie limitu zapytań (HTTP 429).
+
+    Args:
+        error (Exception): Błąd zgłoszony przez klienta OpenAI.
+
+    Returns:
+        bool: True dla błędu 429, po którym warto ponowić zapytanie.
+    """
+    return getattr(error, "status_code", None) == 429 and not is_quota_exhausted(error)
+
+class TokenBucket:
+    """Kubełek tokenów ograniczający liczbę zapytań na minutę."""
+
+    def __init__(self, requests_per_minute):
+        """
+        Inicjalizuje pełny kubełek.
+
+        Args:
+            requests_per_minute (float): Limit zapytań na minutę.
+        """
+        self.max_rate = requests_per_minute / 60.0
+        self.rate = self.max_rate
+        # Pojemność pozwala na krótkie serie bez czekania
+        self.capacity = max(1.0, requests_per_minute / 10.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        """Dolicza tokeny przybyłe od ostatniej aktualizacji."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self):
+        """
+        Próbuje pobrać jeden token.
+
+        Returns:
+            float: 0.0 jeśli token pobrano, w przeciwnym razie czas do pojawienia się tokena.
+        """
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def slow_down(self):
+        """Zmniejsza tempo o połowę po odpowiedzi 429 (adaptacyjne spowolnienie)."""
+        self._refill()
+        self.rate = max(self.max_rate * _MIN_RATE_FACTOR, self.rate / 2)
+
+    def speed_up(self):
+        """Stopniowo przywraca skonfigurowane tempo po udanym zapytaniu."""
+        self._refill()
+        self.rate = min(self.max_rate, self.rate * 1.1)
+
+class RequestScheduler:
+    """Kolejka priorytetowa zapytań z limitami per klucz API i model oraz ponawianiem po 429."""
+
+    def __init__(self, rate_limits=None, default_rate_limit=DEFAULT_RATE_LIMIT,
+                 max_retries=SCHEDULER_MAX_RETRIES, base_backoff=SCHEDULER_BASE_BACKOFF,
+                 max_backoff=SCHEDULER_MAX_BACKOFF, max_limit_keys=SCHEDULER_MAX_LIMIT_KEYS):
+        """
+        Inicjalizuje harmonogram.
+
+        Args:
+            rate_limits (dict, optional): Limity zapytań na minutę dla modeli.
+            default_rate_limit (float, optional): Limit dla modeli spoza rate_limits.
+            max_retries (int, optional): Maksymalna liczba ponowień po 429.
+            base_backoff (float, optional): Bazowe opóźnienie ponowienia w sekundach.
+            max_backoff (float, optional): Maksymalne opóźnienie ponowienia w sekundach.
+            max_limit_keys (int, optional): Maksymalna liczba par (klucz API, model) z kubełkiem.
+        """
+        self.rate_limits = dict(RATE_LIMITS if rate_limits is None else rate_limits)
+        self.default_rate_limit = default_rate_limit
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_limit_keys = max_limit_keys
+
+        self._cond = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._buckets = OrderedDict()
+        self._blocked_until = {}
+
+        # Metryki
+        self._wait_times = deque(maxlen=1000)
+        self._rate_limited_total = 0
+        self._retries_total = 0
+
+    def _bucket(self, limit_key):
+        """
+        Zwraca kubełek tokenów pary (klucz API, model), tworząc go przy pierwszym użyciu.
+
+        Po przekroczeniu max_limit_keys usuwany jest kubełek najdawniej używanej pary
+        (nieużywany kubełek i tak napełnia się do pełna, więc para zaczyna od nowa).
+        """
+        bucket = self._buckets.get(limit_key)
+        if bucket is None:
+            _, model = limit_key
+            bucket = TokenBucket(self.rate_limits.get(model, self.default_rate_limit))
+            self._buckets[limit_key] = bucket
+            while len(self._buckets) > self.max_limit_keys:
+                evicted_key, _ = self._buckets.popitem(last=False)
+                self._blocked_until.pop(evicted_key, None)
+        else:
+            self._buckets.move_to_end(limit_key)
+        return bucket
+
+    def _is_next_for_limit(self, entry):
+        """Sprawdza, czy wpis jest pierwszy w kolejce wśród zapytań z tym samym limitem."""
+        return entry == min(item for item in self._queue if item[2] == entry[2])
+
+    def acquire(self, model, priority=PRIORITY_INTERACTIVE, tenant=None):
+        """
+        Czeka w kolejce, aż zapytanie do modelu może zostać wysłane.
+
+        Args:
+            model (str): Nazwa modelu.
+            priority (int, optional): Priorytet zapytania. Domyślnie PRIORITY_INTERACTIVE.
+            tenant (str, optional): Skrót klucza API, którego limit obowiązuje.
+
+        Returns:
+            float: Czas oczekiwania w kolejce w sekundach.
+        """
+        limit_key = (tenant, model)
+        entry = (priority, next(self._sequence), limit_key)
+        started = time.monotonic()
+        with self._cond:
+            self._queue.append(entry)
+            try:
+                while True:
+                    wait = 0.05
+                    if self._is_next_for_limit(entry):
+                        blocked_for = self._blocked_until.get(limit_key, 0.0) - time.monotonic()
+                        if blocked_for > 0:
+                            wait = blocked_for
+                        else:
+                            self._blocked_until.pop(limit_key, None)
+                            wait = self._bucket(limit_key).try_consume()
+                            if wait == 0.0:
+                                break
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._queue.remove(entry)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - started
+            self._wait_times.append(waited)
+            return waited
+
+    def _on_success(self, limit_key):
+        """Przywraca tempo pary (klucz API, model) po udanym zapytaniu."""
+        with self._cond:
+            self._bucket(limit_key).speed_up()
+
+    def _on_rate_limited(self, limit_key, error, attempt):
+        """
+        Wstrzymuje parę (klucz API, model) po odpowiedzi 429.
+
+        Para jest wstrzymywana także wtedy, gdy zapytanie nie będzie już ponawiane -
+        limit dotyczy wszystkich zapytań tej pary.
+
+        Args:
+            limit_key (tuple): Skrót klucza API i nazwa modelu.
+            error (Exception): Błąd 429.
+            attempt (int): Numer próby (od 0).
+
+        Returns:
+            float: Czas wstrzymania pary w sekundach.
+        """
+        backoff = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        delay = random.uniform(backoff / 2, backoff)
+        header_delay = _header_delay(error)
+        if header_delay is not None:
+            delay = max(delay, header_delay)
+
+        with self._cond:
+            self._rate_limited_total += 1
+            self._bucket(limit_key).slow_down()
+            self._blocked_until[limit_key] = max(self._blocked_until.get(limit_key, 0.0), time.monotonic() + delay)
+            self._cond.notify_all()
+        return delay
+
+    def run(self, model, fn, priority=PRIORITY_INTERACTIVE, tenant=None):
+        """
+        Wykonuje zapytanie w ramach limitów, ponawiając je po odpowiedzi 429.
+
+        Args:
+            model (str): Nazwa modelu.
+            fn (callable): Funkcja wykonująca zapytanie.
+            priority (int, optional): Priorytet zapytania. Domyślnie PRIORITY_INTERACTIVE.
+            tenant (str, optional): Skrót klucza API, którego limit obowiązuje.
+
+        Returns:
+            Any: Wynik funkcji fn.
+        """
+        limit_key = (tenant, model)
+        attempt = 0
+        while True:
+            self.acquire(model, priority, tenant)
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                self._on_rate_limited(limit_key, e, attempt)
+                if attempt >= self.max_retries:
+                    raise
+                with self._cond:
+                    self._retries_total += 1
+                attempt += 1
+                continue
+            self._on_success(limit_key)
+            return result
+
+    def stats(self):
+        """
+        Zwraca metryki kolejki.
+
+        Returns:
+            dict: Głębokość kolejki (łącznie i wg priorytetu), percentyle czasu
+                  oczekiwania w sekundach, liczba odpowiedzi 429 (także tych, po których
+                  zapytanie nie było już ponawiane), liczba ponowień i liczba par z kubełkiem.
+        """
+        with self._cond:
+            depth_by_priority = {}
+            for priority, _, _ in self._queue:
+                depth_by_priority[priority] = depth_by_priority.get(priority, 0) + 1
+            wait_times = list(self._wait_times)
+            return {
+                "queue_depth": len(self._queue),
+                "queue_depth_by_priority": depth_by_priority,
+                "wait_p50": percentile(wait_times, 50) or 0.0,
+                "wait_p95": percentile(wait_times, 95) or 0.0,
+                "wait_max": max(wait_times) if wait_times else 0.0,
+                "rate_limited_total": self._rate_limited_total,
+                "retries_total": self._retries_total,
+                "limit_keys": len(self._buckets),
+            }
+
+# Wspólny harmonogram dla całego procesu serwera
+scheduler = RequestScheduler()
@@ -0,0 +1,87 @@
+"""
+Łączenie identycznych, równocześnie wykonywanych zadań (single-flight).
+
+Jeśli kilka sesji (lub podwójne kliknięcie) zleci to samo zadanie w tym samym
+czasie, wykonywane jest ono tylko raz, a wynik otrzymują wszyscy oczekujący.
+"""
+import hashlib
+import threading
+from concurrent.futures import Future
+
+def make_key(*parts):
+    """
+    Tworzy klucz zadania z jego parametrów.
+
+    Args:
+        *parts: Parametry jednoznacznie opisujące zadanie (str, bytes, liczby, krotki).
+
+    Returns:
+        str: Skrót SHA-256 parametrów.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else repr(part).encode("utf-8")
+        # Długość zapobiega kolizjom przy sklejaniu sąsiednich części
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+class SingleFlight:
+    """Grupa zadań, w której identyczne zadania w locie są współdzielone."""
+
+    def __init__(self):
+        """
+        Inicjalizuje pustą grupę zadań.
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Wykonuje zadanie lub dołącza do identycznego zadania, które już trwa.
+
+        Args:
+            key (str): Klucz zadania (patrz make_key).
+            fn (callable): Funkcja wykonująca zadanie.
+            *args: Argumenty pozycyjne funkcji.
+            **kwargs: Argumenty nazwane funkcji.
+
+        Returns:
+            Any: Wynik zadania (wspólny dla wszystkich oczekujących).
+
+        Raises:
+            Exception: Wyjątek zgłoszony przez zadanie trafia do wszystkich oczekujących.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self):
+        """
+        Zwraca liczbę zadań w toku.
+
+        Returns:
+            int: Liczba trwających zadań.
+        """
+        with self._lock:
+            return len(self._calls)
+
+# Wspólna grupa zadań dla całego procesu serwera
+single_flight = SingleFlight()
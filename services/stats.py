@@ -0,0 +1,20 @@
+"""
+Funkcje statystyczne wspólne dla usług (percentyle opóźnień itp.).
+"""
+
+def percentile(samples, percent):
+    """
+    Zwraca percentyl z listy próbek (metoda najbliższej rangi).
+
+    Args:
+        samples (list): Próbki.
+        percent (float): Percentyl (0-100).
+
+    Returns:
+        float: Wartość percentyla lub None dla pustej listy.
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
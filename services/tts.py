@@ -0,0 +1,177 @@
+"""
+Wymienne silniki syntezy mowy (TTS).
+
+Głosy OpenAI służą do finalnych nagrań, a lokalny silnik espeak-ng (CPU, bez sieci)
+do szybkich podglądów i jako zastępstwo, gdy OpenAI API jest niedostępne.
+Głosy z VOICE_OPTIONS są mapowane na lokalny silnik przez LOCAL_VOICE_MAP.
+"""
+import abc
+import io
+import logging
+import shutil
+import subprocess
+from pydub import AudioSegment
+from services.scheduler import PRIORITY_INTERACTIVE
+from services.circuit_breaker import ServiceUnavailableError
+from monitoring.timing import timed, KIND_SERVICE
+from monitoring.metrics import TTS_REQUESTS, TTS_LATENCY, OUTCOME_OK, OUTCOME_ERROR
+from monitoring.tracing import span, traced, set_attribute
+from config.constants import (
+    LOCAL_VOICE_MAP,
+    LOCAL_TTS_BINARY,
+    LOCAL_TTS_BASE_WPM,
+    LOCAL_TTS_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKEND_OPENAI = "openai"
+BACKEND_LOCAL = "local"
+
+class TTSBackend(abc.ABC):
+    """Interfejs silnika syntezy mowy."""
+
+    name = None
+
+    def is_available(self):
+        """
+        Sprawdza, czy silnik może być użyty.
+
+        Returns:
+            bool: True, jeśli silnik jest dostępny.
+        """
+        return True
+
+    @abc.abstractmethod
+    def synthesize(self, text, voice="fable", speed=0.9, priority=PRIORITY_INTERACTIVE):
+        """
+        Zamienia tekst na mowę.
+
+        Args:
+            text (str): Tekst do zamiany na mowę.
+            voice (str, optional): Głos OpenAI z VOICE_OPTIONS. Domyślnie "fable".
+            speed (float, optional): Prędkość mówienia (0.5-1.5). Domyślnie 0.9.
+            priority (int, optional): Priorytet w harmonogramie zapytań.
+
+        Returns:
+            bytes: Dane audio w formacie MP3.
+        """
+
+class OpenAITTSBackend(TTSBackend):
+    """Synteza mowy przez OpenAI API (finalne nagrania)."""
+
+    name = BACKEND_OPENAI
+
+    def __init__(self, openai_service, model="tts-1"):
+        """
+        Inicjalizuje silnik OpenAI.
+
+        Args:
+            openai_service (OpenAIService): Instancja serwisu OpenAI.
+            model (str, optional): Model TTS. Domyślnie "tts-1".
+        """
+        self.openai_service = openai_service
+        self.model = model
+
+    def synthesize(self, text, voice="fable", speed=0.9, priority=PRIORITY_INTERACTIVE):
+        return self.openai_service.generate_affirmation_audio(
+            text, voice=voice, model=self.model, speed=speed, priority=priority
+        )
+
+class EspeakTTSBackend(TTSBackend):
+    """Lokalna synteza mowy w języku polskim przez program espeak-ng."""
+
+    name = BACKEND_LOCAL
+
+    def __init__(self, binary=LOCAL_TTS_BINARY, voice_map=LOCAL_VOICE_MAP, base_wpm=LOCAL_TTS_BASE_WPM,
+                 timeout=LOCAL_TTS_TIMEOUT):
+        """
+        Inicjalizuje lokalny silnik.
+
+        Args:
+            binary (str, optional): Nazwa lub ścieżka programu espeak-ng.
+            voice_map (dict, optional): Mapowanie głosów OpenAI na głosy espeak-ng.
+            base_wpm (int, optional): Tempo w słowach na minutę dla prędkości 1.0.
+            timeout (float, optional): Limit czasu syntezy w sekundach.
+        """
+        self.binary = binary
+        self.voice_map = voice_map
+        self.base_wpm = base_wpm
+        self.timeout = timeout
+
+    def is_available(self):
+        return shutil.which(self.binary) is not None
+
+    def synthesize(self, text, voice="fable", speed=0.9, priority=PRIORITY_INTERACTIVE):
+        # Priorytet nie ma znaczenia - synteza lokalna nie korzysta z limitów API
+        espeak_voice = self.voice_map.get(voice, "pl")
+        # espeak-ng akceptuje tempo 80-450 słów na minutę
+        wpm = min(450, max(80, int(self.base_wpm * speed)))
+
+        ok = False
+        try:
+            with TTS_LATENCY.time(backend=self.name):
+                with span("tts.local.synthesize"):
+                    result = subprocess.run(
+                        [self.binary, "-v", espeak_voice, "-s", str(wpm), "--stdout", "--stdin"],
+                        input=text.encode("utf-8"),
+                        capture_output=True,
+                        timeout=self.timeout,
+                        check=True
+                    )
+                # espeak-ng zwraca WAV; aplikacja wszędzie operuje na MP3
+                with span("tts.local.encode"):
+                    segment = AudioSegment.from_wav(io.BytesIO(result.stdout))
+                    buffer = io.BytesIO()
+                    segment.export(buffer, format="mp3")
+            ok = True
+            return buffer.getvalue()
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Błąd lokalnej syntezy mowy: {e.stderr.decode('utf-8', errors='replace').strip()}")
+        except Exception as e:
+            raise Exception(f"Błąd lokalnej syntezy mowy: {str(e)}")
+        finally:
+            TTS_REQUESTS.inc(backend=self.name, outcome=OUTCOME_OK if ok else OUTCOME_ERROR)
+
+# Lokalny silnik jest bezstanowy, więc jedna instancja wystarcza dla całego procesu
+local_tts = EspeakTTSBackend()
+
+@timed(KIND_SERVICE)
+@traced()
+def synthesize_speech(openai_service, text, voice="fable", speed=0.9, preview=False,
+                      priority=PRIORITY_INTERACTIVE):
+    """
+    Zamienia tekst na mowę, wybierając silnik.
+
+    Podgląd korzysta z lokalnego silnika (jeśli jest dostępny). Finalne nagrania
+    powstają w OpenAI, a przy niedostępności usługi - lokalnie.
+
+    Args:
+        openai_service (OpenAIService): Instancja serwisu OpenAI.
+        text (str): Tekst do zamiany na mowę.
+        voice (str, optional): Głos OpenAI z VOICE_OPTIONS. Domyślnie "fable".
+        speed (float, optional): Prędkość mówienia (0.5-1.5). Domyślnie 0.9.
+        preview (bool, optional): Czy wystarczy szybki podgląd. Domyślnie False.
+        priority (int, optional): Priorytet w harmonogramie zapytań.
+
+    Returns:
+        tuple: (dane audio MP3, nazwa użytego silnika)
+
+    Raises:
+        ServiceUnavailableError: Gdy OpenAI jest niedostępne, a lokalny silnik nie jest zainstalowany.
+        Exception: W przypadku innego błędu syntezy.
+    """
+    if preview and local_tts.is_available():
+        set_attribute("backend", local_tts.name)
+        return local_tts.synthesize(text, voice, speed, priority), local_tts.name
+
+    try:
+        audio = OpenAITTSBackend(openai_service).synthesize(text, voice, speed, priority)
+        set_attribute("backend", BACKEND_OPENAI)
+        return audio, BACKEND_OPENAI
+    except ServiceUnavailableError:
+        if not local_tts.is_available():
+            raise
+        logger.info("OpenAI TTS niedostępne - używam lokalnej syntezy mowy")
+        set_attribute("backend", local_tts.name)
+        return local_tts.synthesize(text, voice, speed, priority), local_tts.name
@@ -0,0 +1,80 @@
+"""
+Pamięć podręczna nagrań TTS współdzielona przez cały proces serwera.
+"""
+import threading
+from collections import OrderedDict
+from services.single_flight import make_key
+from config.constants import TTS_CACHE_MAX_BYTES
+
+def tts_cache_key(model, voice, speed, text):
+    """
+    Tworzy klucz nagrania dla pamięci podręcznej i łączenia zapytań.
+
+    Args:
+        model (str): Model TTS.
+        voice (str): Głos.
+        speed (float): Prędkość mówienia.
+        text (str): Tekst nagrania.
+
+    Returns:
+        str: Klucz nagrania.
+    """
+    return make_key("tts", model, voice, speed, text)
+
+class TTSCache:
+    """Pamięć podręczna LRU ograniczona łącznym rozmiarem nagrań."""
+
+    def __init__(self, max_bytes=TTS_CACHE_MAX_BYTES):
+        """
+        Inicjalizuje pustą pamięć podręczną.
+
+        Args:
+            max_bytes (int, optional): Maksymalny łączny rozmiar nagrań w bajtach.
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Zwraca nagranie z pamięci podręcznej.
+
+        Args:
+            key (str): Klucz nagrania.
+
+        Returns:
+            bytes: Dane MP3 lub None, jeśli nagrania nie ma.
+        """
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+            return audio
+
+    def put(self, key, audio):
+        """
+        Zapisuje nagranie, usuwając najdawniej używane po przekroczeniu limitu.
+
+        Args:
+            key (str): Klucz nagrania.
+            audio (bytes): Dane MP3.
+        """
+        if not audio or len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = audio
+            self._size += len(audio)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+# Wspólna pamięć podręczna dla wszystkich sesji
+tts_cache = TTSCache()
@@ -0,0 +1,60 @@
+"""
+Testy puli afirmacji: wspólne kubełki, uzupełnianie kluczem serwisowym i wstawianie imienia.
+"""
+import time
+from config.constants import CUSTOM_FOCUS_AREA, NAME_PLACEHOLDER
+from modules.affirmation_pool import AffirmationPool, pool_key
+from services.async_openai_service import AsyncOpenAIService
+
+FORM = {
+    "user_name": "Anna",
+    "focus_area": "Pewność siebie",
+    "specific_goal": "",
+    "emotion_state": "Spokojny",
+    "preferred_style": "Prosty",
+    "affirmation_length": "Krótka",
+    "affirmation_timing": "Rano",
+    "affirmation_tone": "Spokojny",
+}
+
+class FakeService:
+    def __init__(self, templates):
+        self.templates = list(templates)
+        self.prompts = []
+
+    def generate_affirmation(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return self.templates.pop(0)
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_pool_key_is_shared_and_ignores_personal_fields():
+    other_user = dict(FORM, user_name="Ola")
+
+    assert pool_key(FORM) == pool_key(other_user)
+    assert pool_key(dict(FORM, focus_area=CUSTOM_FOCUS_AREA, specific_goal="Medytacja")) is None
+
+def test_pool_without_service_key_is_disabled():
+    pool = AffirmationPool(api_key=None)
+
+    assert not pool.enabled
+    assert not pool.refill_async(pool_key(FORM), "prompt")
+
+def test_refill_uses_service_key_and_serves_any_user():
+    pool = AffirmationPool(target_size=2, low_watermark=0, api_key="sk-service")
+    pool._service = AsyncOpenAIService(FakeService([f"Ja, {NAME_PLACEHOLDER}, jestem pewna siebie.", "Bez znacznika imienia."]))
+    key = pool_key(FORM)
+
+    assert pool.refill_async(key, "prompt")
+    assert wait_for(lambda: not pool._refilling)
+
+    # Wariant bez znacznika imienia jest odrzucany
+    assert pool.size(key) == 1
+    assert pool.take(key, "Ola") == "Ja, Ola, jestem pewna siebie."
+    assert pool.take(key, "Anna") is None
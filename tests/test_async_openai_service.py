@@ -0,0 +1,81 @@
+"""
+Testy asynchronicznej nakładki na serwis OpenAI: współbieżność, limit zapytań i kontekst śledzenia.
+"""
+import threading
+import time
+import pytest
+from monitoring.tracing import current_span, trace
+from services.async_openai_service import AsyncOpenAIService, gather_sync, run_sync
+
+class SlowService:
+    """Serwis synchroniczny, którego wywołania czekają jak na sieć."""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        self.spans.append(current_span())
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+
+    def generate_affirmation(self, prompt, **kwargs):
+        self._wait()
+        return f"afirmacja: {prompt}"
+
+    def generate_affirmation_audio(self, text, **kwargs):
+        self._wait()
+        return b"mp3:" + text.encode()
+
+    def generator_affirmation_system_prompt(self):
+        return "system"
+
+def test_calls_overlap_network_waits():
+    service = AsyncOpenAIService(SlowService(delay=0.2), max_concurrency=4)
+
+    started = time.monotonic()
+    results = gather_sync(
+        service.generate_affirmation("a"),
+        service.generate_affirmation_audio("b"),
+        service.generate_affirmation("c"),
+    )
+
+    assert results == ["afirmacja: a", b"mp3:b", "afirmacja: c"]
+    assert time.monotonic() - started < 0.5
+
+def test_concurrency_is_limited():
+    slow = SlowService(delay=0.05)
+    service = AsyncOpenAIService(slow, max_concurrency=2)
+
+    gather_sync(*(service.generate_affirmation(str(i)) for i in range(6)))
+
+    assert slow.max_active == 2
+
+def test_errors_are_returned_or_raised():
+    class FailingService(SlowService):
+        def generate_affirmation(self, prompt, **kwargs):
+            raise Exception("HTTP 500")
+
+    service = AsyncOpenAIService(FailingService())
+
+    with pytest.raises(Exception, match="HTTP 500"):
+        run_sync(service.generate_affirmation("a"))
+    [result] = gather_sync(service.generate_affirmation("a"), return_exceptions=True)
+    assert isinstance(result, Exception)
+
+def test_calls_run_inside_callers_trace():
+    slow = SlowService(delay=0.01)
+    service = AsyncOpenAIService(slow)
+
+    with trace("pool.refill") as root:
+        gather_sync(service.generate_affirmation("a"), service.generate_affirmation("b"))
+
+    assert slow.spans == [root, root]
+    assert service.generator_affirmation_system_prompt() == "system"
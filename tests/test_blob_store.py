@@ -0,0 +1,133 @@
+"""
+Testy magazynu plików: zliczanie odwołań, limit sesji, TTL i zapis na dysk.
+"""
+import os
+import pytest
+from services import blob_store as blob_store_module
+from services.blob_store import BlobStore, BlobQuotaExceededError
+
+KB = 1024
+
+@pytest.fixture
+def make_store(tmp_path):
+    def factory(**kwargs):
+        options = {"memory_limit": 100 * KB, "session_quota": 50 * KB, "ttl_seconds": 60,
+                   "spill_dir": str(tmp_path / "blobs")}
+        options.update(kwargs)
+        return BlobStore(**options)
+    return factory
+
+def test_identical_data_is_stored_once(make_store):
+    store = make_store()
+    data = b"a" * KB
+
+    first = store.put("s1", data)
+    second = store.put("s2", data)
+
+    assert first == second
+    assert store.stats() == {"blobs": 1, "sessions": 2, "memory_bytes": KB, "total_bytes": KB}
+    assert store.get("s1", first) == data
+
+def test_blob_is_removed_after_last_release(make_store):
+    store = make_store()
+    blob_id = store.put("s1", b"x" * KB)
+    store.put("s1", b"x" * KB)
+    store.put("s2", b"x" * KB)
+
+    store.release("s1", blob_id)
+    store.release("s1", blob_id)
+    assert store.get("s2", blob_id) == b"x" * KB
+
+    store.release("s2", blob_id)
+    assert store.get("s2", blob_id) is None
+    assert store.stats()["memory_bytes"] == 0
+
+def test_release_of_unknown_reference_is_ignored(make_store):
+    store = make_store()
+    blob_id = store.put("s1", b"x")
+
+    store.release("s2", blob_id)
+    store.release("s1", "missing")
+
+    assert store.get("s1", blob_id) == b"x"
+
+def test_session_quota_evicts_oldest_blobs(make_store):
+    store = make_store(session_quota=3 * KB)
+    first = store.put("s1", b"1" * KB)
+    second = store.put("s1", b"2" * KB)
+    third = store.put("s1", b"3" * (2 * KB))
+
+    assert store.get("s1", first) is None
+    assert store.get("s1", second) == b"2" * KB
+    assert store.get("s1", third) == b"3" * (2 * KB)
+
+def test_blob_larger_than_quota_is_rejected(make_store):
+    store = make_store(session_quota=KB)
+    with pytest.raises(BlobQuotaExceededError):
+        store.put("s1", b"x" * (KB + 1))
+
+def test_inactive_sessions_expire_after_ttl(make_store, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(blob_store_module.time, "monotonic", lambda: clock[0])
+    store = make_store(ttl_seconds=60)
+    old_id = store.put("idle", b"old")
+    shared_id = store.put("idle", b"shared")
+    clock[0] += 30
+    store.put("active", b"shared")
+
+    clock[0] += 31
+    store.put("active", b"new")
+
+    assert store.get("active", old_id) is None
+    assert store.get("active", shared_id) == b"shared"
+    assert store.stats()["sessions"] == 1
+
+def test_least_recently_used_blobs_spill_to_disk(make_store, tmp_path):
+    store = make_store(memory_limit=2 * KB)
+    first = store.put("s1", b"1" * KB)
+    second = store.put("s1", b"2" * KB)
+    third = store.put("s1", b"3" * KB)
+
+    spilled = tmp_path / "blobs" / os.path.basename(store._process_dir) / f"{first}.blob"
+    assert spilled.exists()
+    assert store.stats() == {"blobs": 3, "sessions": 1, "memory_bytes": 2 * KB, "total_bytes": 3 * KB}
+    assert store.get("s1", first) == b"1" * KB
+    assert store.get("s1", second) == b"2" * KB
+    assert store.get("s1", third) == b"3" * KB
+
+    store.release("s1", first)
+    assert not spilled.exists()
+
+def test_processes_do_not_touch_each_others_spill_files(make_store, tmp_path):
+    spill_dir = tmp_path / "blobs"
+    other_process_dir = spill_dir / "proc-1-other"
+    other_process_dir.mkdir(parents=True)
+    (other_process_dir / "live.blob").write_bytes(b"live")
+
+    store = make_store(memory_limit=KB)
+    store.put("s1", b"1" * KB)
+    store.put("s1", b"2" * KB)
+    process_dir = store._process_dir
+
+    assert os.path.dirname(process_dir) == str(spill_dir)
+    assert len(os.listdir(process_dir)) == 1
+
+    store.close()
+    assert not os.path.exists(process_dir)
+    assert (other_process_dir / "live.blob").read_bytes() == b"live"
+
+def test_blob_released_during_spill_is_not_left_on_disk(make_store):
+    store = make_store()
+    first = store.put("s1", b"1" * KB)
+    store.put("s1", b"2" * KB)
+    store.memory_limit = KB
+    with store._lock:
+        selected = store._select_spill()
+    assert [blob_id for blob_id, _ in selected] == [first]
+
+    # Zapis na dysk odbywa się poza blokadą - plik może zostać zwolniony w tym czasie
+    store.release("s1", first)
+    store._spill(selected)
+
+    assert os.listdir(store._process_dir) == []
+    assert store.stats() == {"blobs": 1, "sessions": 1, "memory_bytes": KB, "total_bytes": KB}
@@ -0,0 +1,149 @@
+"""
+Testy bezpiecznika: przejścia między stanami i sprawdzanie usługi w tle.
+"""
+import threading
+import time
+import uuid
+import pytest
+from services.circuit_breaker import (
+    CircuitBreaker,
+    ServiceUnavailableError,
+    STATE_CLOSED,
+    STATE_OPEN,
+    STATE_HALF_OPEN,
+    get_breaker,
+)
+
+class Outage(Exception):
+    pass
+
+class AuthError(Exception):
+    pass
+
+def is_outage(error):
+    return isinstance(error, Outage)
+
+def fail(error):
+    def call():
+        raise error
+    return call
+
+def trip(breaker):
+    """Otwiera bezpiecznik serią awarii."""
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ServiceUnavailableError):
+            breaker.call(fail(Outage("timeout")), is_outage)
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_opens_after_consecutive_outages():
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=60)
+
+    for _ in range(2):
+        with pytest.raises(ServiceUnavailableError):
+            breaker.call(fail(Outage()), is_outage)
+    assert breaker.state == STATE_CLOSED
+
+    with pytest.raises(ServiceUnavailableError):
+        breaker.call(fail(Outage()), is_outage)
+    assert breaker.is_open
+
+    calls = []
+    with pytest.raises(ServiceUnavailableError):
+        breaker.call(lambda: calls.append(1), is_outage)
+    assert calls == []
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+
+    with pytest.raises(ServiceUnavailableError):
+        breaker.call(fail(Outage()), is_outage)
+    assert breaker.call(lambda: "ok", is_outage) == "ok"
+    with pytest.raises(ServiceUnavailableError):
+        breaker.call(fail(Outage()), is_outage)
+
+    assert breaker.state == STATE_CLOSED
+
+def test_client_errors_do_not_count_as_outages():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60)
+
+    with pytest.raises(AuthError):
+        breaker.call(fail(AuthError("401")), is_outage)
+
+    assert breaker.state == STATE_CLOSED
+
+def test_half_open_trial_without_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.05)
+    trip(breaker)
+
+    with pytest.raises(ServiceUnavailableError):
+        breaker.call(lambda: "ok", is_outage)
+
+    time.sleep(0.06)
+    # Nieudana próba od razu otwiera bezpiecznik ponownie
+    with pytest.raises(ServiceUnavailableError):
+        breaker.call(fail(Outage()), is_outage)
+    assert breaker.is_open
+
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok", is_outage) == "ok"
+    assert breaker.state == STATE_CLOSED
+
+def test_half_open_state_is_entered_before_trial_call():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.0)
+    trip(breaker)
+    states = []
+
+    breaker.call(lambda: states.append(breaker.state), is_outage)
+
+    assert states == [STATE_HALF_OPEN]
+
+def test_background_probe_closes_breaker():
+    service_up = threading.Event()
+
+    def probe():
+        if not service_up.is_set():
+            raise Outage("still down")
+
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.02, probe=probe)
+    trip(breaker)
+
+    time.sleep(0.1)
+    assert breaker.is_open
+    # Z funkcją sprawdzającą wywołania nie są przepuszczane na próbę
+    with pytest.raises(ServiceUnavailableError):
+        breaker.call(lambda: "ok", is_outage)
+
+    service_up.set()
+    assert wait_for(lambda: breaker.state == STATE_CLOSED)
+
+def test_get_breaker_sets_probe_only_once():
+    endpoint = f"test-{uuid.uuid4().hex[:8]}"
+    first_probe = []
+
+    breaker = get_breaker(endpoint, lambda: first_probe.append(1))
+    assert get_breaker(endpoint, fail(Outage("other session"))) is breaker
+
+    breaker.recovery_timeout = 0.02
+    trip(breaker)
+
+    assert wait_for(lambda: breaker.state == STATE_CLOSED)
+    assert first_probe
+
+def test_get_breaker_starts_probing_when_probe_arrives_late():
+    endpoint = f"test-{uuid.uuid4().hex[:8]}"
+    breaker = get_breaker(endpoint)
+    breaker.recovery_timeout = 60
+    trip(breaker)
+    assert breaker.state == STATE_OPEN
+
+    breaker.recovery_timeout = 0.02
+    get_breaker(endpoint, lambda: None)
+
+    assert wait_for(lambda: breaker.state == STATE_CLOSED)
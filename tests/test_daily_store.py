@@ -0,0 +1,33 @@
+"""
+Testy magazynu afirmacji dnia: klucz użytkownika, dnia i tematu oraz wybór tematu.
+"""
+import datetime
+from modules.daily_store import DailyAffirmationStore, select_daily_topic
+
+TODAY = datetime.date(2026, 10, 19)
+
+def test_topic_is_stable_within_a_day():
+    assert select_daily_topic("Anna", TODAY) == select_daily_topic("  anna ", TODAY)
+
+def test_affirmation_is_returned_for_the_same_user_name_and_day():
+    store = DailyAffirmationStore()
+    store.put("user-a", "Anna", TODAY, "spokój", "Ja, Anna, jestem spokojna.")
+
+    assert store.get("user-a", " ANNA", TODAY, "spokój") == "Ja, Anna, jestem spokojna."
+    assert store.get("user-a", "Anna", TODAY, "odwaga") is None
+
+def test_same_name_with_another_api_key_does_not_see_the_affirmation():
+    store = DailyAffirmationStore()
+    store.put("user-a", "Anna", TODAY, "spokój", "Ja, Anna, jestem spokojna.")
+
+    assert store.get("user-b", "Anna", TODAY, "spokój") is None
+
+def test_entries_from_previous_days_are_removed():
+    store = DailyAffirmationStore()
+    yesterday = TODAY - datetime.timedelta(days=1)
+    store.put("user-a", "Anna", yesterday, "spokój", "Wczorajsza")
+
+    store.put("user-b", "Ola", TODAY, "odwaga", "Dzisiejsza")
+
+    assert store.get("user-a", "Anna", yesterday, "spokój") is None
+    assert len(store) == 1
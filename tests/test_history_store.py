@@ -0,0 +1,106 @@
+"""
+Testy trwałej historii afirmacji: wyszukiwanie pełnotekstowe i stronicowanie.
+"""
+import pytest
+from modules import history_store as history_store_module
+from modules.history_store import HistoryStore, fold_text, get_history_store, user_id_from_api_key
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.db"))
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Kolejne zapisy dostają rosnące znaczniki czasu."""
+    now = [1_700_000_000.0]
+
+    def tick():
+        now[0] += 1
+        return now[0]
+
+    monkeypatch.setattr("modules.history_store.time.time", tick)
+    return now
+
+def test_user_id_is_a_hash_of_the_key():
+    user_id = user_id_from_api_key("sk-test")
+
+    assert user_id == user_id_from_api_key("sk-test")
+    assert user_id != user_id_from_api_key("sk-other")
+    assert "sk-test" not in user_id
+
+def test_fold_text_removes_polish_diacritics():
+    assert fold_text("Żółć ŁĄKA") == "zolc laka"
+
+def test_recent_is_paginated_newest_first(store, clock):
+    for number in range(5):
+        store.add("user", f"Afirmacja {number}")
+
+    first_page, has_more = store.recent("user", page=0, page_size=2)
+    last_page, has_more_after_last = store.recent("user", page=2, page_size=2)
+
+    assert first_page == ["Afirmacja 4", "Afirmacja 3"]
+    assert has_more
+    assert last_page == ["Afirmacja 0"]
+    assert not has_more_after_last
+
+def test_adding_again_moves_affirmation_to_the_front(store, clock):
+    store.add("user", "Pierwsza")
+    store.add("user", "Druga")
+    store.add("user", "Pierwsza")
+
+    assert store.recent("user")[0] == ["Pierwsza", "Druga"]
+    assert store.count("user") == 2
+
+def test_search_matches_word_prefixes_without_diacritics(store, clock):
+    store.add("user", "Jestem pewna siebie i spokojna.")
+    store.add("user", "Każdy dzień przynosi mi radość.")
+    store.add("user", "Zasługuję na miłość i szacunek.")
+
+    assert store.search("user", "pewn sieb")[0] == ["Jestem pewna siebie i spokojna."]
+    assert store.search("user", "zasluguje milosc")[0] == ["Zasługuję na miłość i szacunek."]
+    assert store.search("user", "RADOŚĆ")[0] == ["Każdy dzień przynosi mi radość."]
+    assert store.search("user", "smutek")[0] == []
+
+def test_search_treats_operators_as_plain_words(store, clock):
+    store.add("user", "Jestem spokojna OR pewna siebie.")
+
+    assert store.search("user", 'spokojna OR "NOT')[0] == []
+    assert store.search("user", "spokojna OR")[0] == ["Jestem spokojna OR pewna siebie."]
+
+def test_search_without_words_falls_back_to_recent(store, clock):
+    store.add("user", "Pierwsza")
+    store.add("user", "Druga")
+
+    assert store.search("user", " ?! ") == (["Druga", "Pierwsza"], False)
+
+def test_search_is_paginated(store, clock):
+    for number in range(3):
+        store.add("user", f"Jestem spokojna {number}")
+
+    first_page, has_more = store.search("user", "spokoj", page=0, page_size=2)
+    second_page, has_more_after = store.search("user", "spokoj", page=1, page_size=2)
+
+    assert first_page == ["Jestem spokojna 2", "Jestem spokojna 1"]
+    assert has_more
+    assert second_page == ["Jestem spokojna 0"]
+    assert not has_more_after
+
+def test_users_do_not_see_each_other(store, clock):
+    store.add("alice", "Jestem odważna.")
+    store.add("bob", "Jestem odważny.")
+
+    assert store.search("alice", "odwaz")[0] == ["Jestem odważna."]
+    assert store.recent("bob")[0] == ["Jestem odważny."]
+    assert store.count("alice") == 1
+
+def test_history_survives_reopening(tmp_path, clock):
+    path = str(tmp_path / "history.db")
+    HistoryStore(path).add("user", "Jestem wdzięczna.")
+
+    assert HistoryStore(path).search("user", "wdziecz")[0] == ["Jestem wdzięczna."]
+
+def test_shared_store_is_created_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store_module, "HISTORY_DB_PATH", str(tmp_path / "shared.db"))
+    monkeypatch.setattr(history_store_module, "_history_store", None)
+
+    assert get_history_store() is get_history_store()
@@ -0,0 +1,69 @@
+"""
+Testy rejestru metryk: format Prometheus i wartości liczników dla sesji.
+"""
+import contextvars
+import threading
+from monitoring.metrics import Counter, MetricsRegistry, set_metrics_session
+
+def in_session(session_id, fn):
+    """Wykonuje funkcję w osobnym kontekście przypisanym do sesji (jak jedno odświeżenie)."""
+    def run():
+        set_metrics_session(session_id)
+        fn()
+    contextvars.copy_context().run(run)
+
+def test_counter_renders_prometheus_samples():
+    registry = MetricsRegistry()
+    counter = registry.counter("afirmator_test_total", "Test", ("outcome",))
+    counter.inc(outcome="ok")
+    counter.inc(2, outcome="error")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE afirmator_test_total counter" in lines
+    assert 'afirmator_test_total{outcome="error"} 2' in lines
+    assert 'afirmator_test_total{outcome="ok"} 1' in lines
+
+def test_session_values_are_kept_per_session():
+    counter = Counter("afirmator_test_total", "Test", ("outcome",))
+    in_session("a", lambda: counter.inc(outcome="ok"))
+    in_session("a", lambda: counter.inc(outcome="error"))
+    in_session("b", lambda: counter.inc(outcome="ok"))
+    # Zadanie w tle bez sesji liczy się tylko do sumy serwera
+    counter.inc(outcome="ok")
+
+    assert counter.value(outcome="ok") == 3
+    assert counter.session_value("a", outcome="ok") == 1
+    assert counter.session_value("a") == 2
+    assert counter.session_value("b") == 1
+    assert counter.session_value("unknown") == 0
+
+def test_session_values_are_not_rendered():
+    registry = MetricsRegistry()
+    counter = registry.counter("afirmator_test_total", "Test", ("outcome",))
+    in_session("secret-session", lambda: counter.inc(outcome="ok"))
+
+    assert "secret-session" not in registry.render()
+
+def test_threads_with_copied_context_inherit_session():
+    counter = Counter("afirmator_test_total", "Test", ("outcome",))
+
+    def run_in_thread():
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(counter.inc,), kwargs={"outcome": "ok"})
+        thread.start()
+        thread.join()
+
+    in_session("a", run_in_thread)
+
+    assert counter.session_value("a") == 1
+
+def test_least_recently_active_sessions_are_dropped():
+    counter = Counter("afirmator_test_total", "Test", ("outcome",), max_sessions=2)
+    for session_id in ("a", "b", "a", "c"):
+        in_session(session_id, lambda: counter.inc(outcome="ok"))
+
+    assert counter.session_value("a") == 2
+    assert counter.session_value("b") == 0
+    assert counter.session_value("c") == 1
+    assert counter.value() == 4
@@ -0,0 +1,86 @@
+"""
+Testy routera modeli: budżet opóźnień, awarie i osobne okna rodzajów wywołań.
+"""
+from services.model_router import (
+    ModelRouter,
+    CALL_COMPLETE,
+    CALL_STREAM,
+    CALL_VARIANTS,
+    REASON_PRIMARY,
+    REASON_LATENCY,
+    REASON_BEST_EFFORT,
+)
+
+ROUTES = {"daily": {"models": ["primary", "fallback"], "latency_budget": 2.0, "cost_budget": 1.0}}
+
+def new_router(**kwargs):
+    options = {"routes": ROUTES, "min_samples": 5, "max_failure_rate": 0.2}
+    options.update(kwargs)
+    return ModelRouter(**options)
+
+def record_many(router, model, latency, ok, count, call=CALL_COMPLETE):
+    for _ in range(count):
+        router.record("daily", model, REASON_PRIMARY, latency, ok, call)
+
+def test_slow_primary_falls_back():
+    router = new_router()
+    record_many(router, "primary", 5.0, True, 5)
+
+    decision = router.route("daily", max_tokens=100)
+
+    assert decision.model == "fallback"
+    assert decision.reason == REASON_LATENCY
+
+def test_failing_primary_falls_back_without_successful_samples():
+    router = new_router()
+    # Same limity czasu - żadnej udanej próbki do percentyli
+    record_many(router, "primary", 30.0, False, 5)
+
+    decision = router.route("daily", max_tokens=100)
+
+    assert decision.model == "fallback"
+    assert decision.reason == REASON_LATENCY
+    assert router.latency_stats("primary")["failure_rate"] == 1.0
+
+def test_failure_rate_over_threshold_is_a_breach():
+    router = new_router()
+    record_many(router, "primary", 0.5, True, 6)
+    record_many(router, "primary", 30.0, False, 2)
+
+    assert router.route("daily", max_tokens=100).model == "fallback"
+
+def test_occasional_failure_keeps_primary():
+    router = new_router()
+    record_many(router, "primary", 0.5, True, 9)
+    record_many(router, "primary", 30.0, False, 1)
+
+    decision = router.route("daily", max_tokens=100)
+
+    assert decision.model == "primary"
+    assert decision.reason == REASON_PRIMARY
+
+def test_best_effort_prefers_less_failing_model():
+    router = new_router()
+    record_many(router, "primary", 30.0, False, 5)
+    record_many(router, "fallback", 3.0, True, 5)
+
+    decision = router.route("daily", max_tokens=100)
+
+    assert decision.model == "fallback"
+    assert decision.reason == REASON_BEST_EFFORT
+
+def test_stream_and_variant_latencies_do_not_affect_single_completions():
+    router = new_router()
+    record_many(router, "primary", 6.0, True, 5, call=CALL_VARIANTS)
+    record_many(router, "primary", 6.0, True, 5, call=CALL_STREAM)
+    record_many(router, "primary", 0.5, True, 5, call=CALL_COMPLETE)
+
+    assert router.route("daily", max_tokens=100, call=CALL_COMPLETE).model == "primary"
+    assert router.route("daily", max_tokens=100, call=CALL_VARIANTS).model == "fallback"
+    assert router.route("daily", max_tokens=100, call=CALL_STREAM).model == "fallback"
+    assert router.latency_stats("primary", CALL_COMPLETE)["p95"] == 0.5
+    assert router.series() == [
+        ("primary", CALL_COMPLETE),
+        ("primary", CALL_STREAM),
+        ("primary", CALL_VARIANTS),
+    ]
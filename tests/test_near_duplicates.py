@@ -0,0 +1,77 @@
+"""
+Testy indeksu MinHash i scalania prawie identycznych afirmacji w historii sesji.
+"""
+import pytest
+from modules.near_duplicates import MinHashIndex, shingles
+from modules.history import AffirmationHistory
+
+ORIGINAL = "Każdego dnia staję się coraz bardziej pewna siebie, spokojna i wdzięczna za wszystko, co mnie spotyka."
+NEAR_DUPLICATE = "Każdego dnia staję się coraz bardziej pewna siebie, spokojna i wdzięczna za to, co mnie spotyka."
+UNRELATED = "Moje ciało jest silne, a oddech głęboki i równy."
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingles("Jestem SPOKOJNA!") == shingles("jestem, spokojna")
+    assert shingles("") == set()
+    assert shingles("abc") == {"abc"}
+
+def test_signature_is_stable_between_instances():
+    assert MinHashIndex().signature(ORIGINAL) == MinHashIndex().signature(ORIGINAL)
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        MinHashIndex(num_perm=10, bands=3)
+
+def test_query_finds_near_duplicates_only():
+    index = MinHashIndex()
+    index.add("original", ORIGINAL)
+    index.add("unrelated", UNRELATED)
+
+    matches = index.query(NEAR_DUPLICATE, threshold=0.8)
+
+    assert [key for key, _ in matches] == ["original"]
+    assert 0.8 <= matches[0][1] < 1.0
+    assert index.query("Kocham zimowe wędrówki po górach.", threshold=0.8) == []
+
+def test_remove_and_replace_entries():
+    index = MinHashIndex()
+    index.add("key", ORIGINAL)
+    index.add("key", UNRELATED)
+
+    assert len(index) == 1
+    assert index.query(ORIGINAL, threshold=0.8) == []
+
+    index.remove("key")
+    index.remove("missing")
+
+    assert len(index) == 0
+    assert index.query(UNRELATED, threshold=0.8) == []
+
+def test_history_merges_near_duplicates_keeping_newest_wording():
+    history = AffirmationHistory()
+
+    assert history.add(ORIGINAL) is True
+    assert history.add(UNRELATED) is True
+    assert history.add(NEAR_DUPLICATE) is False
+
+    assert history.to_list() == [NEAR_DUPLICATE, UNRELATED]
+
+def test_history_keeps_limit_and_skips_duplicates_from_older_entries():
+    history = AffirmationHistory(max_items=2)
+    history.add(ORIGINAL)
+    history.add_older([NEAR_DUPLICATE, UNRELATED, "Jestem odważna."])
+
+    assert history.to_list() == [ORIGINAL, UNRELATED]
+
+    history.add("Jestem odważna.")
+
+    assert history.to_list() == ["Jestem odważna.", ORIGINAL]
+    assert UNRELATED not in history
+
+def test_similar_to_excludes_the_affirmation_itself():
+    history = AffirmationHistory(similarity_threshold=1.0)
+    history.add(ORIGINAL)
+    history.add(NEAR_DUPLICATE)
+
+    similar = history.similar_to(ORIGINAL, threshold=0.8)
+
+    assert [text for text, _ in similar] == [NEAR_DUPLICATE]
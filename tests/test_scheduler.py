@@ -0,0 +1,172 @@
+"""
+Testy harmonogramu zapytań: kubełek tokenów, nagłówki Retry-After i ponawianie po 429.
+"""
+import time
+import pytest
+from services.scheduler import (
+    RequestScheduler,
+    TokenBucket,
+    _header_delay,
+    _parse_duration,
+    is_rate_limit_error,
+)
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+class FakeAPIError(Exception):
+    """Błąd o kształcie APIStatusError z klienta OpenAI."""
+
+    def __init__(self, status_code=429, code="rate_limit_exceeded", headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.code = code
+        self.response = FakeResponse(headers or {})
+
+def fast_scheduler(**kwargs):
+    options = {"rate_limits": {"gpt-4o": 600}, "max_retries": 3, "base_backoff": 0.001, "max_backoff": 0.002}
+    options.update(kwargs)
+    return RequestScheduler(**options)
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(requests_per_minute=60)
+
+    assert bucket.capacity == 6.0
+    assert all(bucket.try_consume() == 0.0 for _ in range(6))
+
+    wait = bucket.try_consume()
+    assert 0.9 < wait <= 1.0
+
+def test_token_bucket_slows_down_and_recovers():
+    bucket = TokenBucket(requests_per_minute=600)
+
+    for _ in range(10):
+        bucket.slow_down()
+    assert bucket.rate == pytest.approx(bucket.max_rate * 0.1)
+
+    for _ in range(100):
+        bucket.speed_up()
+    assert bucket.rate == bucket.max_rate
+
+@pytest.mark.parametrize("value, expected", [
+    ("1s", 1.0),
+    ("6m0s", 360.0),
+    ("250ms", 0.25),
+    ("1h2m", 3720.0),
+    ("soon", None),
+])
+def test_parse_duration(value, expected):
+    assert _parse_duration(value) == expected
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "1500", "retry-after": "9"}, 1.5),
+    ({"retry-after": "2"}, 2.0),
+    ({"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "6m0s"}, 360.0),
+    ({}, None),
+])
+def test_header_delay(headers, expected):
+    assert _header_delay(FakeAPIError(headers=headers)) == expected
+
+def test_header_delay_accepts_http_date():
+    retry_date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+
+    delay = _header_delay(FakeAPIError(headers={"retry-after": retry_date}))
+
+    assert 25 <= delay <= 30
+
+def test_quota_exhaustion_is_not_a_retryable_rate_limit():
+    assert is_rate_limit_error(FakeAPIError())
+    assert not is_rate_limit_error(FakeAPIError(code="insufficient_quota"))
+    assert not is_rate_limit_error(FakeAPIError(status_code=500))
+
+def test_run_retries_rate_limited_requests():
+    scheduler = fast_scheduler()
+    attempts = []
+
+    def request():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise FakeAPIError()
+        return "ok"
+
+    assert scheduler.run("gpt-4o", request) == "ok"
+    assert len(attempts) == 3
+    assert scheduler.stats()["rate_limited_total"] == 2
+
+def test_run_gives_up_after_max_retries():
+    scheduler = fast_scheduler(max_retries=2)
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        raise FakeAPIError()
+
+    with pytest.raises(FakeAPIError):
+        scheduler.run("gpt-4o", request)
+    assert len(attempts) == 3
+    # Ostatnia odpowiedź 429 jest liczona, ale nie jest już ponawiana
+    assert scheduler.stats()["rate_limited_total"] == 3
+    assert scheduler.stats()["retries_total"] == 2
+
+@pytest.mark.parametrize("error", [
+    FakeAPIError(code="insufficient_quota"),
+    FakeAPIError(status_code=401, code="invalid_api_key"),
+])
+def test_run_raises_non_retryable_errors_immediately(error):
+    scheduler = fast_scheduler()
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        raise error
+
+    with pytest.raises(FakeAPIError):
+        scheduler.run("gpt-4o", request)
+    assert len(attempts) == 1
+    assert scheduler.stats()["retries_total"] == 0
+
+def test_retry_waits_for_retry_after_header():
+    scheduler = fast_scheduler()
+    attempts = []
+
+    def request():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise FakeAPIError(headers={"retry-after-ms": "200"})
+        return "ok"
+
+    scheduler.run("gpt-4o", request)
+
+    assert attempts[1] - attempts[0] >= 0.2
+
+def test_rate_limit_blocks_only_the_same_key_and_model():
+    scheduler = fast_scheduler()
+    scheduler._on_rate_limited(("tenant-a", "gpt-4o"), FakeAPIError(headers={"retry-after": "5"}), attempt=0)
+
+    assert scheduler.acquire("gpt-4o", tenant="tenant-b") < 0.1
+    assert scheduler.acquire("gpt-4o-mini", tenant="tenant-a") < 0.1
+    assert scheduler._blocked_until[("tenant-a", "gpt-4o")] - time.monotonic() > 4
+
+def test_least_recently_used_limit_keys_are_evicted():
+    scheduler = fast_scheduler(max_limit_keys=2)
+    scheduler.acquire("gpt-4o", tenant="tenant-a")
+    scheduler.acquire("gpt-4o", tenant="tenant-b")
+    scheduler._on_rate_limited(("tenant-b", "gpt-4o"), FakeAPIError(headers={"retry-after": "5"}), attempt=0)
+    scheduler.acquire("gpt-4o", tenant="tenant-a")
+
+    scheduler.acquire("gpt-4o", tenant="tenant-c")
+
+    assert list(scheduler._buckets) == [("tenant-a", "gpt-4o"), ("tenant-c", "gpt-4o")]
+    assert ("tenant-b", "gpt-4o") not in scheduler._blocked_until
+    assert scheduler.stats()["limit_keys"] == 2
+
+def test_stats_reports_wait_percentiles():
+    scheduler = fast_scheduler()
+    for _ in range(5):
+        scheduler.acquire("gpt-4o")
+
+    stats = scheduler.stats()
+
+    assert stats["queue_depth"] == 0
+    assert stats["wait_p95"] >= stats["wait_p50"] >= 0.0
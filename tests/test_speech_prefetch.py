@@ -0,0 +1,62 @@
+"""
+Testy nagrań w tle: nagranie przygotowane po zapisaniu afirmacji ma być trafieniem
+w pamięci podręcznej dla pierwszego kliknięcia "Generuj Audio" z domyślnymi ustawieniami.
+"""
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("openai")
+pytest.importorskip("pydub")
+
+from config.constants import VOICE_OPTIONS, DEFAULT_VOICE_INDEX, DEFAULT_TTS_SPEED
+from modules.speech_prefetch import SpeechPrefetcher, reader_speech_settings
+from services.openai_service import OpenAIService
+from services.tts import synthesize_speech
+from services.tts_cache import TTSCache
+
+class FakeSpeech:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return type("Response", (), {"content": b"mp3:" + kwargs["input"].encode()})()
+
+@pytest.fixture
+def service(monkeypatch):
+    cache = TTSCache()
+    monkeypatch.setattr("services.openai_service.tts_cache", cache)
+    monkeypatch.setattr("modules.speech_prefetch.tts_cache", cache)
+    service = OpenAIService(api_key="test-key", base_url="http://127.0.0.1:9")
+    service.client.audio.speech = FakeSpeech()
+    return service
+
+def test_default_settings_match_reader_widgets():
+    voice, speed = reader_speech_settings({})
+
+    assert voice == list(VOICE_OPTIONS.values())[DEFAULT_VOICE_INDEX]
+    assert speed == DEFAULT_TTS_SPEED
+
+def test_settings_follow_reader_widgets_changed_in_session():
+    voice, speed = reader_speech_settings({
+        "audio_player_voice_select": "Delikatny kobiecy",
+        "audio_player_speed_slider": 1.1,
+    })
+
+    assert (voice, speed) == ("nova", 1.1)
+
+def test_prefetched_recording_is_a_cache_hit_for_default_request(service):
+    text = "Ja, Ala, jestem spokojna i pewna siebie."
+    prefetcher = SpeechPrefetcher()
+    voice, speed = reader_speech_settings({})
+
+    assert prefetcher.prefetch(service, text, voice, speed)
+    for future in list(prefetcher._pending.values()):
+        future.result(timeout=5)
+
+    # Pierwsze kliknięcie w zakładce czytania z domyślnym głosem i prędkością
+    default_voice = VOICE_OPTIONS[list(VOICE_OPTIONS)[DEFAULT_VOICE_INDEX]]
+    audio, backend = synthesize_speech(service, text, voice=default_voice, speed=DEFAULT_TTS_SPEED)
+
+    assert audio == b"mp3:" + text.encode()
+    assert len(service.client.audio.speech.calls) == 1
@@ -0,0 +1,44 @@
+"""
+Testy pomiarów czasu: wyjątki sterujące Streamlit nie są liczone jako błędy.
+"""
+import pytest
+from monitoring.timing import TimingRegistry, timed, timer
+
+class RerunException(BaseException):
+    """Odpowiednik wyjątku st.rerun - dziedziczy po BaseException jak w Streamlit."""
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = TimingRegistry()
+    monkeypatch.setattr("monitoring.timing.timings", registry)
+    return registry
+
+def test_successful_block_is_ok(registry):
+    with timer("section"):
+        pass
+
+    assert registry.records(name="section")[-1]["ok"] is True
+
+def test_error_is_recorded_as_failure(registry):
+    with pytest.raises(ValueError):
+        with timer("section"):
+            raise ValueError("boom")
+
+    assert registry.records(name="section")[-1]["ok"] is False
+
+def test_streamlit_control_flow_is_not_an_error(registry):
+    @timed(name="section")
+    def rerun():
+        raise RerunException()
+
+    with pytest.raises(RerunException):
+        rerun()
+
+    assert registry.records(name="section")[-1]["ok"] is True
+
+def test_other_base_exception_is_recorded_and_reraised(registry):
+    with pytest.raises(KeyboardInterrupt):
+        with timer("section"):
+            raise KeyboardInterrupt()
+
+    assert registry.records(name="section")[-1]["ok"] is False
@@ -0,0 +1,3 @@
+"""
+Narzędzia deweloperskie Afirmatora (uruchamiane z katalogu głównego przez python -m tools.<nazwa>).
+"""
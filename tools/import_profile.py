@@ -0,0 +1,155 @@
+"""
+Profil czasu importu modułów Afirmatora (zimny start).
+
+Każdy pomiar to osobny proces `python -X importtime -c "import <moduł>"`, więc
+moduły nie są jeszcze załadowane - tak jak przy starcie serwera Streamlit.
+Raport pokazuje łączny czas importu oraz pakiety i moduły, które kosztują najwięcej.
+
+Ekran powitalny (tylko app.py i lekkie moduły):
+    python -m tools.import_profile
+
+Porównanie z modułami zakładek:
+    python -m tools.import_profile app modules.visual_quote modules.musical_affirmation --runs 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_LINE_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+def parse_importtime(output):
+    """
+    Przetwarza wyjście `-X importtime`.
+
+    Args:
+        output (str): Wyjście błędów procesu Pythona.
+
+    Returns:
+        list: Słowniki z kluczami name, depth, self_us, cumulative_us (w kolejności wyjścia).
+    """
+    entries = []
+    for line in output.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        entries.append({
+            "name": name,
+            "depth": (len(indent) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return entries
+
+def _run_importtime(code, python):
+    """Uruchamia kod w nowym procesie z `-X importtime` i zwraca przetworzone wpisy."""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        last_line = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else ""
+        raise Exception(f"Polecenie {code!r} nie powiodło się: {last_line}")
+    return parse_importtime(result.stderr)
+
+def profile_import(module_name, python=sys.executable):
+    """
+    Importuje moduł w nowym procesie i zwraca czasy importu.
+
+    Moduły ładowane przy samym starcie interpretera (site, encodings...) są pomijane.
+
+    Args:
+        module_name (str): Nazwa modułu, np. "app".
+        python (str, optional): Interpreter Pythona.
+
+    Returns:
+        list: Wpisy jak w parse_importtime.
+
+    Raises:
+        Exception: Gdy import modułu się nie powiódł.
+    """
+    startup = {entry["name"] for entry in _run_importtime("pass", python)}
+    return [entry for entry in _run_importtime(f"import {module_name}", python) if entry["name"] not in startup]
+
+def summarize(module_name, entries, top=15):
+    """
+    Podsumowuje czasy importu modułu.
+
+    Args:
+        module_name (str): Nazwa mierzonego modułu.
+        entries (list): Wpisy jak w profile_import.
+        top (int, optional): Liczba najdroższych pakietów i modułów w raporcie.
+
+    Returns:
+        dict: Łączny czas (ms), najdroższe pakiety (czas własny) i moduły (czas łączny).
+    """
+    total_us = sum(entry["self_us"] for entry in entries)
+    packages = {}
+    for entry in entries:
+        package = entry["name"].split(".")[0]
+        packages[package] = packages.get(package, 0) + entry["self_us"]
+    top_packages = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    top_modules = sorted(
+        (entry for entry in entries if entry["name"] != module_name),
+        key=lambda entry: entry["cumulative_us"],
+        reverse=True
+    )[:top]
+    return {
+        "module": module_name,
+        "total_ms": round(total_us / 1000, 1),
+        "modules_loaded": len(entries),
+        "packages": [{"package": name, "self_ms": round(us / 1000, 1)} for name, us in top_packages],
+        "slowest": [
+            {"module": entry["name"], "cumulative_ms": round(entry["cumulative_us"] / 1000, 1)}
+            for entry in top_modules
+        ],
+    }
+
+def print_report(summary, runs):
+    """Wypisuje czytelny raport dla jednego modułu."""
+    print(f"\n=== import {summary['module']} ===")
+    timings = ", ".join(f"{value:.1f}" for value in runs)
+    print(f"Czas importu: {summary['total_ms']:.1f} ms (mediana z {len(runs)}: {timings} ms)")
+    print(f"Załadowane moduły: {summary['modules_loaded']}")
+    print("\nPakiety (czas własny):")
+    for item in summary["packages"]:
+        print(f"  {item['package']:<32} {item['self_ms']:>9.1f} ms")
+    print("\nNajwolniejsze moduły (czas łączny):")
+    for item in summary["slowest"]:
+        print(f"  {item['module']:<48} {item['cumulative_ms']:>9.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Profil czasu importu modułów Afirmatora")
+    parser.add_argument("modules", nargs="*", default=["app"], help="Moduły do zmierzenia (domyślnie app)")
+    parser.add_argument("--runs", type=int, default=3, help="Liczba pomiarów każdego modułu")
+    parser.add_argument("--top", type=int, default=15, help="Liczba pozycji w zestawieniach")
+    parser.add_argument("--json", action="store_true", help="Wynik w formacie JSON")
+    args = parser.parse_args()
+
+    summaries = []
+    for module_name in args.modules:
+        runs = []
+        for _ in range(max(1, args.runs)):
+            entries = profile_import(module_name)
+            summary = summarize(module_name, entries, args.top)
+            runs.append(summary["total_ms"])
+        # Szczegóły z ostatniego pomiaru, czas łączny jako mediana
+        summary["total_ms"] = round(statistics.median(runs), 1)
+        summary["runs_ms"] = runs
+        summaries.append(summary)
+        if not args.json:
+            print_report(summary, runs)
+
+    if args.json:
+        print(json.dumps(summaries, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
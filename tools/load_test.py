@@ -0,0 +1,271 @@
+"""
+Test obciążeniowy Afirmatora.
+
+Symuluje N równoczesnych użytkowników przechodzących kolejno przez zakładki:
+afirmacja dnia, generator, wizualny cytat, czytanie afirmacji i muzyczna afirmacja.
+Etapy wywołują te same funkcje modułów i serwisów co interfejs (bez warstwy Streamlit),
+a wynikiem jest przepustowość oraz percentyle opóźnień dla każdego etapu.
+
+Domyślnie uruchamia w tle lokalny serwer udający OpenAI API, więc nie zużywa
+kredytów API i nie wymaga sieci:
+    python -m tools.load_test --users 20 --iterations 3
+
+Przeciwko zewnętrznemu serwerowi (np. tools.mock_openai_server):
+    python -m tools.load_test --users 50 --base-url http://127.0.0.1:8089/v1
+
+Uwaga: zapytania przechodzą przez harmonogram zapytań, więc limity z RATE_LIMITS
+obowiązują również w teście.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.openai_service import OpenAIService
+from services.single_flight import single_flight, make_key
+from services.stats import percentile
+from services.scheduler import scheduler
+from modules.daily import stream_daily_affirmation
+from modules.generator import _build_prompt
+from modules.visual_quote import create_visual_quote, _render_key
+from modules.musical_affirmation import _create_mixed_audio
+from config.constants import (
+    FOCUS_AREAS,
+    CUSTOM_FOCUS_AREA,
+    EMOTION_STATES,
+    AFFIRMATION_STYLES,
+    AFFIRMATION_LENGTH_OPTIONS,
+    AFFIRMATION_TIMING,
+    AFFIRMATION_TONES,
+    VOICE_OPTIONS,
+    GRADIENT_PRESETS,
+    BACKGROUND_SOUNDS,
+)
+from tools.mock_openai_server import add_config_arguments, config_from_args, start_in_background
+
+logger = logging.getLogger(__name__)
+
+STAGES = ["daily", "generator", "visual", "reader", "music"]
+
+class StageStats:
+    """Zbiera czasy i błędy etapów testu (bezpieczne dla wątków)."""
+
+    def __init__(self):
+        self._samples = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, ok=True):
+        """
+        Zapisuje wynik etapu.
+
+        Args:
+            stage (str): Nazwa etapu.
+            seconds (float): Czas trwania w sekundach.
+            ok (bool, optional): Czy etap zakończył się sukcesem.
+        """
+        with self._lock:
+            if ok:
+                self._samples.setdefault(stage, []).append(seconds)
+            else:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+
+    def summary(self, elapsed):
+        """
+        Zwraca podsumowanie etapów.
+
+        Args:
+            elapsed (float): Całkowity czas testu w sekundach.
+
+        Returns:
+            dict: Dla każdego etapu liczba operacji, błędy, przepustowość i percentyle.
+        """
+        with self._lock:
+            stages = sorted(set(self._samples) | set(self._errors), key=_stage_order)
+            return {
+                stage: {
+                    "count": len(self._samples.get(stage, [])),
+                    "errors": self._errors.get(stage, 0),
+                    "throughput": len(self._samples.get(stage, [])) / elapsed if elapsed else 0.0,
+                    "p50": percentile(self._samples.get(stage, []), 50),
+                    "p95": percentile(self._samples.get(stage, []), 95),
+                    "p99": percentile(self._samples.get(stage, []), 99),
+                }
+                for stage in stages
+            }
+
+def _stage_order(stage):
+    """Klucz sortowania etapów w kolejności przechodzenia przez aplikację."""
+    base = stage.split(":")[0]
+    return (STAGES.index(base) if base in STAGES else len(STAGES), stage)
+
+def _timed(stats, stage, fn, *args, **kwargs):
+    """
+    Wykonuje etap i zapisuje jego czas.
+
+    Returns:
+        Any: Wynik funkcji lub None w przypadku błędu.
+    """
+    started = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        stats.record(stage, time.perf_counter() - started, ok=False)
+        logger.warning("Etap %s zakończony błędem: %s", stage, str(e))
+        return None
+    stats.record(stage, time.perf_counter() - started)
+    return result
+
+def _consume_stream(stats, stage, token_stream):
+    """
+    Odczytuje strumień afirmacji, zapisując osobno czas do pierwszego fragmentu.
+
+    Returns:
+        str: Pełny tekst afirmacji.
+    """
+    started = time.perf_counter()
+    parts = []
+    for chunk in token_stream:
+        if not parts:
+            stats.record(f"{stage}:first_token", time.perf_counter() - started)
+        parts.append(chunk)
+    return "".join(parts).strip('"')
+
+def _random_form_data(user_name):
+    """Losuje dane formularza generatora."""
+    focus_area = random.choice([area for area in FOCUS_AREAS if area != CUSTOM_FOCUS_AREA])
+    return {
+        "user_name": user_name,
+        "focus_area": focus_area,
+        "specific_goal": focus_area,
+        "emotion_state": random.choice(EMOTION_STATES),
+        "preferred_style": random.choice(AFFIRMATION_STYLES),
+        "affirmation_length": random.choice(AFFIRMATION_LENGTH_OPTIONS),
+        "affirmation_timing": random.choice(AFFIRMATION_TIMING),
+        "affirmation_tone": random.choice(AFFIRMATION_TONES),
+    }
+
+def _render_visual(text):
+    """Renderuje wizualny cytat tak jak zakładka wizualna i koduje go do PNG."""
+    gradient = random.choice([colors for colors in GRADIENT_PRESETS.values() if colors != "custom"])
+    render_params = dict(text=text, background_type="gradient", gradient_colors=gradient)
+    image = single_flight.do(_render_key(render_params), create_visual_quote, **render_params)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def _mix_music(openai_service, text, voice, backgrounds):
+    """Generuje audio i miksuje je z podkładem tak jak zakładka muzyczna."""
+    affirmation_audio = openai_service.generate_affirmation_audio(text, voice=voice, speed=0.9)
+    background = random.choice(backgrounds)
+    repetitions, pause_seconds, volume = 3, 2, 40
+    key = make_key("mix", affirmation_audio, background, repetitions, pause_seconds, volume)
+    return single_flight.do(
+        key, _create_mixed_audio, affirmation_audio, None, background,
+        repetitions, pause_seconds, volume / 100.0
+    )
+
+def run_user(user_id, openai_service, stats, iterations, backgrounds):
+    """
+    Przeprowadza jednego użytkownika przez wszystkie zakładki.
+
+    Args:
+        user_id (int): Numer użytkownika.
+        openai_service (OpenAIService): Serwis OpenAI.
+        stats (StageStats): Zbiór wyników.
+        iterations (int): Liczba przejść przez aplikację.
+        backgrounds (list): Nazwy dostępnych podkładów muzycznych.
+    """
+    user_name = f"Tester{user_id}"
+    voice = random.choice(list(VOICE_OPTIONS.values()))
+
+    for _ in range(iterations):
+        journey_started = time.perf_counter()
+
+        daily = _timed(stats, "daily", lambda: _consume_stream(
+            stats, "daily", stream_daily_affirmation(openai_service, user_name)
+        ))
+
+        form_data = _random_form_data(user_name)
+        affirmation = _timed(stats, "generator", lambda: _consume_stream(
+            stats, "generator", openai_service.generate_affirmation_stream(_build_prompt(form_data, user_name))
+        ))
+        text = affirmation or daily or f"Ja, {user_name}, jestem spokojny i pewny siebie."
+
+        _timed(stats, "visual", _render_visual, text)
+        _timed(stats, "reader", openai_service.generate_affirmation_audio, text, voice=voice, speed=1.0)
+        if backgrounds:
+            _timed(stats, "music", _mix_music, openai_service, text, voice, backgrounds)
+
+        stats.record("journey", time.perf_counter() - journey_started)
+
+def _format_seconds(value):
+    """Formatuje czas w sekundach do tabeli."""
+    return "-" if value is None else f"{value:8.3f}"
+
+def print_report(summary, elapsed, users):
+    """Wypisuje tabelę wyników."""
+    print(f"\nUżytkownicy: {users}, czas testu: {elapsed:.1f} s")
+    print(f"{'etap':<24}{'ok':>7}{'błędy':>7}{'op/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for stage, row in summary.items():
+        print(
+            f"{stage:<24}{row['count']:>7}{row['errors']:>7}{row['throughput']:>9.2f}"
+            f"{_format_seconds(row['p50'])}{_format_seconds(row['p95'])}{_format_seconds(row['p99'])}"
+        )
+    scheduler_stats = scheduler.stats()
+    print(
+        f"\nHarmonogram: 429={scheduler_stats['rate_limited_total']}, "
+        f"ponowienia={scheduler_stats['retries_total']}, "
+        f"oczekiwanie p95={scheduler_stats['wait_p95']:.3f} s"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Test obciążeniowy Afirmatora")
+    parser.add_argument("--users", type=int, default=10, help="Liczba równoczesnych użytkowników")
+    parser.add_argument("--iterations", type=int, default=1, help="Liczba przejść każdego użytkownika")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Czas stopniowego startu użytkowników (sek.)")
+    parser.add_argument("--base-url", help="Adres API; bez niego uruchamiany jest lokalny serwer testowy")
+    parser.add_argument("--api-key", default="mock-key", help="Klucz API przekazywany do serwera")
+    parser.add_argument("--json", help="Zapisz podsumowanie do pliku JSON")
+    parser.add_argument("--seed", type=int, help="Ziarno losowania (powtarzalne scenariusze)")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_in_background(config=config_from_args(args))
+        print(f"Lokalny serwer testowy: {base_url}")
+
+    openai_service = OpenAIService(api_key=args.api_key, base_url=base_url)
+    backgrounds = [name for name, path in BACKGROUND_SOUNDS.items() if os.path.exists(path)]
+    if not backgrounds:
+        print("Brak plików podkładów - etap muzyczny zostanie pominięty")
+
+    stats = StageStats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users, thread_name_prefix="afirmator-load") as executor:
+        for user_id in range(args.users):
+            if args.ramp_up and user_id:
+                time.sleep(args.ramp_up / args.users)
+            executor.submit(run_user, user_id, openai_service, stats, args.iterations, backgrounds)
+    elapsed = time.perf_counter() - started
+
+    summary = stats.summary(elapsed)
+    print_report(summary, elapsed, args.users)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as report_file:
+            json.dump({"users": args.users, "elapsed": elapsed, "stages": summary}, report_file, indent=2)
+    if server is not None:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+Lokalny serwer udający OpenAI API na potrzeby testów obciążeniowych i CI.
+
+Obsługuje punkty końcowe /v1/chat/completions (również strumieniowo, SSE),
+/v1/audio/speech i /v1/models. Opóźnienia, odsetek błędów 5xx i odpowiedzi 429
+są konfigurowalne, a odpowiedzi audio to gotowe ramki MP3 (cisza).
+
+Uruchomienie:
+    python -m tools.mock_openai_server --port 8089 --chat-latency lognormal:0.8:0.4
+
+Aplikacja korzysta z serwera po ustawieniu zmiennej środowiskowej:
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.constants import NAME_PLACEHOLDER
+from config.fallback_affirmations import FALLBACK_AFFIRMATIONS
+
+logger = logging.getLogger(__name__)
+
+# Ramka MPEG-1 Layer III, 128 kbps, 44.1 kHz, mono; zerowe dane dekodują się jako cisza
+_MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0xC4]) + bytes(413)
+_MP3_FRAMES_PER_SECOND = 38  # 1152 próbki na ramkę przy 44.1 kHz
+
+def silent_mp3(seconds):
+    """
+    Zwraca plik MP3 z ciszą o podanej długości.
+
+    Args:
+        seconds (float): Długość nagrania w sekundach.
+
+    Returns:
+        bytes: Dane MP3.
+    """
+    return _MP3_FRAME * max(1, int(seconds * _MP3_FRAMES_PER_SECOND))
+
+def parse_latency(spec):
+    """
+    Tworzy generator opóźnień na podstawie opisu rozkładu.
+
+    Obsługiwane opisy (wartości w sekundach):
+        fixed:S, uniform:MIN:MAX, normal:ŚREDNIA:ODCHYLENIE, lognormal:MEDIANA:SIGMA
+
+    Args:
+        spec (str): Opis rozkładu.
+
+    Returns:
+        callable: Funkcja bez argumentów zwracająca opóźnienie w sekundach.
+
+    Raises:
+        ValueError: Dla nieznanego rozkładu lub błędnych parametrów.
+    """
+    name, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(":")] if params else []
+
+    if name == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if name == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if name == "normal" and len(values) == 2:
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if name == "lognormal" and len(values) == 2:
+        # Parametryzacja medianą jest czytelniejsza niż średnią logarytmu
+        median, sigma = values
+        return lambda: median * random.lognormvariate(0.0, sigma)
+    raise ValueError(f"Nieprawidłowy opis rozkładu opóźnień: {spec}")
+
+class MockConfig:
+    """Konfiguracja zachowania serwera."""
+
+    def __init__(self, chat_latency="fixed:0.5", tts_latency="fixed:1.0", token_delay=0.02,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0, audio_seconds=3.0,
+                 mp3_payload=None):
+        """
+        Inicjalizuje konfigurację.
+
+        Args:
+            chat_latency (str, optional): Rozkład opóźnienia odpowiedzi czatu (patrz parse_latency).
+            tts_latency (str, optional): Rozkład opóźnienia syntezy mowy.
+            token_delay (float, optional): Odstęp między fragmentami strumienia w sekundach.
+            error_rate (float, optional): Odsetek odpowiedzi z błędem 500 (0.0-1.0).
+            rate_limit_rate (float, optional): Odsetek odpowiedzi 429 (0.0-1.0).
+            retry_after (float, optional): Wartość nagłówka retry-after dla odpowiedzi 429.
+            audio_seconds (float, optional): Długość generowanej ciszy MP3.
+            mp3_payload (bytes, optional): Własne dane MP3 zwracane zamiast ciszy.
+        """
+        self.chat_latency = parse_latency(chat_latency)
+        self.tts_latency = parse_latency(tts_latency)
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.mp3_payload = mp3_payload or silent_mp3(audio_seconds)
+        self.requests_total = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        """Zlicza obsłużone zapytanie."""
+        with self._lock:
+            self.requests_total += 1
+
+def _canned_affirmation(prompt):
+    """
+    Zwraca afirmację z lokalnej biblioteki.
+
+    Jeśli prompt zawiera znacznik imienia (pula afirmacji), znacznik jest zachowywany.
+
+    Args:
+        prompt (str): Prompt użytkownika.
+
+    Returns:
+        str: Tekst afirmacji.
+    """
+    name = NAME_PLACEHOLDER if NAME_PLACEHOLDER in prompt else "Przyjacielu"
+    return random.choice(FALLBACK_AFFIRMATIONS)["text"].format(name=name)
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Obsługa zapytań HTTP serwera testowego."""
+
+    protocol_version = "HTTP/1.1"
+    config = MockConfig()
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _read_json(self):
+        """Odczytuje ciało zapytania jako JSON."""
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        """Wysyła kompletną odpowiedź."""
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, error_type, headers=None):
+        """Wysyła błąd w formacie OpenAI API."""
+        self._send(status, {"error": {"message": message, "type": error_type, "code": None}},
+                   headers=headers)
+
+    def _inject_failure(self):
+        """
+        Losowo zwraca błąd 429 lub 500 zgodnie z konfiguracją.
+
+        Returns:
+            bool: True, jeśli wysłano odpowiedź z błędem.
+        """
+        roll = random.random()
+        if roll < self.config.rate_limit_rate:
+            retry_after = self.config.retry_after
+            self._send_error(429, "Rate limit reached (mock)", "requests", headers={
+                "retry-after-ms": str(int(retry_after * 1000)),
+                "retry-after": str(max(1, round(retry_after))),
+            })
+            return True
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self._send_error(500, "Internal server error (mock)", "server_error")
+            return True
+        return False
+
+    def do_GET(self):
+        self.config.count_request()
+        if self.path.rstrip("/") == "/v1/models":
+            models = ["gpt-4", "gpt-4o", "gpt-4o-mini", "tts-1", "tts-1-hd"]
+            self._send(200, {
+                "object": "list",
+                "data": [{"id": model, "object": "model", "created": 0, "owned_by": "mock"} for model in models],
+            })
+            return
+        self._send_error(404, f"Unknown path {self.path}", "invalid_request_error")
+
+    def do_POST(self):
+        self.config.count_request()
+        try:
+            payload = self._read_json()
+        except ValueError:
+            self._send_error(400, "Invalid JSON body", "invalid_request_error")
+            return
+
+        path = self.path.rstrip("/")
+        if path == "/v1/chat/completions":
+            self._chat_completions(payload)
+        elif path == "/v1/audio/speech":
+            self._audio_speech(payload)
+        else:
+            self._send_error(404, f"Unknown path {self.path}", "invalid_request_error")
+
+    def _chat_completions(self, payload):
+        """Obsługuje /v1/chat/completions (zwykłe i strumieniowe)."""
+        if self._inject_failure():
+            return
+
+        prompt = " ".join(message.get("content", "") for message in payload.get("messages", []))
+        model = payload.get("model", "gpt-4")
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        texts = [_canned_affirmation(prompt) for _ in range(payload.get("n") or 1)]
+
+        if payload.get("stream"):
+            self._stream_chat(completion_id, created, model, texts)
+            return
+
+        time.sleep(self.config.chat_latency())
+        self._send(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {"index": index, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                for index, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": sum(len(text.split()) for text in texts),
+                      "total_tokens": len(prompt.split()) + sum(len(text.split()) for text in texts)},
+        })
+
+    def _stream_chat(self, completion_id, created, model, texts):
+        """Wysyła odpowiedź czatu jako strumień zdarzeń SSE, słowo po słowie."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send_chunk(index, delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": index, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        # Opóźnienie do pierwszego fragmentu odpowiada czasowi przetwarzania promptu
+        time.sleep(self.config.chat_latency())
+        try:
+            for index, text in enumerate(texts):
+                send_chunk(index, {"role": "assistant", "content": ""})
+                words = text.split(" ")
+                for position, word in enumerate(words):
+                    send_chunk(index, {"content": word if position == 0 else " " + word})
+                    time.sleep(self.config.token_delay)
+                send_chunk(index, {}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Klient przerwał strumień
+            pass
+
+    def _audio_speech(self, payload):
+        """Obsługuje /v1/audio/speech."""
+        if self._inject_failure():
+            return
+        if not payload.get("input"):
+            self._send_error(400, "Missing input", "invalid_request_error")
+            return
+        time.sleep(self.config.tts_latency())
+        self._send(200, self.config.mp3_payload, content_type="audio/mpeg")
+
+def create_server(host="127.0.0.1", port=8089, config=None):
+    """
+    Tworzy serwer testowy (bez uruchamiania).
+
+    Args:
+        host (str, optional): Adres nasłuchiwania.
+        port (int, optional): Port (0 oznacza dowolny wolny port).
+        config (MockConfig, optional): Konfiguracja zachowania serwera.
+
+    Returns:
+        ThreadingHTTPServer: Serwer gotowy do serve_forever().
+    """
+    handler = type("ConfiguredMockOpenAIHandler", (MockOpenAIHandler,), {"config": config or MockConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def start_in_background(host="127.0.0.1", port=0, config=None):
+    """
+    Uruchamia serwer testowy w wątku w tle.
+
+    Args:
+        host (str, optional): Adres nasłuchiwania.
+        port (int, optional): Port (domyślnie dowolny wolny).
+        config (MockConfig, optional): Konfiguracja zachowania serwera.
+
+    Returns:
+        tuple: (serwer, adres bazowy API, np. "http://127.0.0.1:54321/v1")
+    """
+    server = create_server(host, port, config)
+    thread = threading.Thread(target=server.serve_forever, name="afirmator-mock-openai", daemon=True)
+    thread.start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}/v1"
+
+def add_config_arguments(parser):
+    """
+    Dodaje do parsera argumenty konfiguracji serwera.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser argumentów.
+    """
+    parser.add_argument("--chat-latency", default="lognormal:0.8:0.4",
+                        help="Rozkład opóźnienia czatu: fixed:S, uniform:MIN:MAX, normal:M:SD, lognormal:MEDIANA:SIGMA")
+    parser.add_argument("--tts-latency", default="lognormal:1.5:0.3", help="Rozkład opóźnienia syntezy mowy")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Odstęp między fragmentami strumienia (sek.)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Odsetek odpowiedzi 500 (0.0-1.0)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Odsetek odpowiedzi 429 (0.0-1.0)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Wartość retry-after dla 429 (sek.)")
+    parser.add_argument("--audio-seconds", type=float, default=3.0, help="Długość zwracanej ciszy MP3 (sek.)")
+    parser.add_argument("--mp3-file", help="Plik MP3 zwracany zamiast ciszy")
+
+def config_from_args(args):
+    """
+    Tworzy konfigurację serwera z argumentów wiersza poleceń.
+
+    Args:
+        args (argparse.Namespace): Argumenty dodane przez add_config_arguments.
+
+    Returns:
+        MockConfig: Konfiguracja serwera.
+    """
+    mp3_payload = None
+    if args.mp3_file:
+        with open(args.mp3_file, "rb") as mp3_file:
+            mp3_payload = mp3_file.read()
+    return MockConfig(
+        chat_latency=args.chat_latency,
+        tts_latency=args.tts_latency,
+        token_delay=args.token_delay,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        audio_seconds=args.audio_seconds,
+        mp3_payload=mp3_payload,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokalny serwer udający OpenAI API")
+    parser.add_argument("--host", default="127.0.0.1", help="Adres nasłuchiwania")
+    parser.add_argument("--port", type=int, default=8089, help="Port")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    server = create_server(args.host, args.port, config_from_args(args))
+    logger.info("Serwer testowy OpenAI: OPENAI_BASE_URL=http://%s:%d/v1", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Raport z profili zapisanych przez monitoring/profiling.py.
+
+Łączy pliki pstats z katalogu profili i pokazuje najgorętsze funkcje, a z zestawień
+tracemalloc - miejsca, które alokują najwięcej pamięci:
+    python -m tools.profile_report
+    python -m tools.profile_report --name mix_audio --sort tottime --top 30
+    python -m tools.profile_report --json
+"""
+import argparse
+import glob
+import json
+import os
+import pstats
+import sys
+from monitoring.profiling import PSTATS_SUFFIX, ALLOC_SUFFIX
+from config.constants import PROFILE_DIR
+
+SORT_KEYS = ("cumtime", "tottime", "calls")
+
+def find_captures(directory, name=None):
+    """
+    Wyszukuje pomiary w katalogu profili.
+
+    Args:
+        directory (str): Katalog profili.
+        name (str, optional): Tylko pomiary tej operacji (np. "mix_audio").
+
+    Returns:
+        list: Ścieżki bazowe pomiarów (bez rozszerzeń), od najstarszego.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "*" + PSTATS_SUFFIX)), key=os.path.getmtime)
+    bases = [path[:-len(PSTATS_SUFFIX)] for path in paths]
+    if name:
+        # Nazwa pliku: <data>-<czas>_<operacja>_<id>
+        bases = [base for base in bases if os.path.basename(base).split("_", 1)[1].rsplit("_", 1)[0] == name]
+    return bases
+
+def hottest_functions(bases, sort="cumtime", top=20):
+    """
+    Łączy profile i zwraca najgorętsze funkcje.
+
+    Args:
+        bases (list): Ścieżki bazowe pomiarów.
+        sort (str, optional): "cumtime" (czas łączny), "tottime" (czas własny) lub "calls".
+        top (int, optional): Liczba funkcji.
+
+    Returns:
+        list: Słowniki z opisem funkcji, liczbą wywołań i czasami (ms).
+    """
+    stats = pstats.Stats(bases[0] + PSTATS_SUFFIX)
+    for base in bases[1:]:
+        stats.add(base + PSTATS_SUFFIX)
+    rows = []
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{function} ({os.path.basename(filename)}:{line})" if line else function,
+            "calls": calls,
+            "tottime_ms": tottime * 1000,
+            "cumtime_ms": cumtime * 1000,
+        })
+    sort_field = {"cumtime": "cumtime_ms", "tottime": "tottime_ms", "calls": "calls"}[sort]
+    rows.sort(key=lambda row: row[sort_field], reverse=True)
+    return rows[:top]
+
+def largest_allocators(bases, top=20):
+    """
+    Sumuje zestawienia tracemalloc według miejsca alokacji.
+
+    Args:
+        bases (list): Ścieżki bazowe pomiarów.
+        top (int, optional): Liczba miejsc.
+
+    Returns:
+        tuple: (lista słowników z miejscem, liczbą pomiarów i bajtami, lista metadanych pomiarów)
+    """
+    per_location = {}
+    captures = []
+    for base in bases:
+        try:
+            with open(base + ALLOC_SUFFIX, encoding="utf-8") as alloc_file:
+                capture = json.load(alloc_file)
+        except (OSError, ValueError):
+            continue
+        captures.append(capture)
+        for allocation in capture.get("allocations", []):
+            # To samo miejsce może się powtarzać z różnymi stosami wywołań
+            location = f"{allocation['file']}:{allocation['line']}"
+            entry = per_location.setdefault(location, {"location": location, "captures": set(), "bytes": 0, "blocks": 0})
+            entry["captures"].add(base)
+            entry["bytes"] += allocation["size_diff"]
+            entry["blocks"] += allocation["count_diff"]
+    rows = sorted(per_location.values(), key=lambda entry: entry["bytes"], reverse=True)[:top]
+    for row in rows:
+        row["captures"] = len(row["captures"])
+    return rows, captures
+
+def _format_bytes(value):
+    """Formatuje liczbę bajtów."""
+    for unit in ("B", "KB", "MB"):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+def print_report(functions, allocators, captures, sort):
+    """Wypisuje czytelny raport."""
+    print(f"Pomiary: {len(captures)}")
+    by_name = {}
+    for capture in captures:
+        by_name.setdefault(capture["name"], []).append(capture)
+    for name, items in sorted(by_name.items()):
+        mean_ms = sum(item["duration_ms"] for item in items) / len(items)
+        peak = max(item.get("peak_bytes", 0) for item in items)
+        print(f"  {name:<44} {len(items):>4}x  średnio {mean_ms:>9.1f} ms  szczyt pamięci {_format_bytes(peak)}")
+
+    print(f"\nNajgorętsze funkcje (sortowanie: {sort}):")
+    print(f"  {'Funkcja':<64} {'Wywołania':>10} {'Własny':>11} {'Łączny':>11}")
+    for row in functions:
+        print(
+            f"  {row['function'][-64:]:<64} {row['calls']:>10} "
+            f"{row['tottime_ms']:>9.1f}ms {row['cumtime_ms']:>9.1f}ms"
+        )
+
+    print("\nNajwięksi alokatorzy (pamięć zajęta na końcu operacji):")
+    print(f"  {'Miejsce':<64} {'Pomiary':>8} {'Bajty':>11} {'Bloki':>9}")
+    for row in allocators:
+        print(f"  {row['location'][-64:]:<64} {row['captures']:>8} {_format_bytes(row['bytes']):>11} {row['blocks']:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Raport z profili Afirmatora (cProfile i tracemalloc)")
+    parser.add_argument("--dir", default=PROFILE_DIR, help="Katalog profili")
+    parser.add_argument("--name", help="Tylko pomiary tej operacji (np. mix_audio)")
+    parser.add_argument("--sort", choices=SORT_KEYS, default="cumtime", help="Sortowanie funkcji")
+    parser.add_argument("--top", type=int, default=20, help="Liczba pozycji w zestawieniach")
+    parser.add_argument("--json", action="store_true", help="Wynik w formacie JSON")
+    args = parser.parse_args()
+
+    bases = find_captures(args.dir, args.name) if os.path.isdir(args.dir) else []
+    if not bases:
+        print(f"Brak profili w {args.dir}", file=sys.stderr)
+        sys.exit(1)
+
+    functions = hottest_functions(bases, args.sort, args.top)
+    allocators, captures = largest_allocators(bases, args.top)
+    if args.json:
+        print(json.dumps({"captures": captures, "functions": functions, "allocators": allocators},
+                         indent=2, ensure_ascii=False))
+    else:
+        print_report(functions, allocators, captures, args.sort)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Porównanie czasu odświeżenia aplikacji: wszystkie zakładki (st.tabs) i tylko wybrana.
+
+Skrypt uruchamia aplikację bez przeglądarki (streamlit.testing AppTest) z lokalnym
+serwerem udającym OpenAI API i dla każdej zakładki mierzy kolejne odświeżenia:
+    python -m tools.rerun_benchmark
+    python -m tools.rerun_benchmark --reruns 30 --json rerun.json
+
+Układ "tabs" odtwarza dawną nawigację, w której st.tabs wykonywało sekcje wszystkich
+zakładek przy każdym odświeżeniu; układ "selected" to bieżący app.py. Oprócz czasu
+całego przebiegu (AppTest.run) raport podaje czas pomiaru "rerun" z rejestru pomiarów.
+Rozgrzewka procesu (modules/warmup.py) kończy się przed pomiarami - działająca w tle
+zawyżałaby czasy układu "selected", bo tylko app.py ją uruchamia.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from monitoring.timing import timings
+from modules.warmup import start_warmup
+from services.stats import percentile
+from config.constants import TABS
+from tools.mock_openai_server import start_in_background
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dawny układ: sekcje wszystkich zakładek w st.tabs przy każdym odświeżeniu
+TABS_LAYOUT_SCRIPT = """
+import streamlit as st
+from app import load_section
+from config.constants import TABS
+from modules.utils import init_session_state, load_persisted_history
+from monitoring.timing import begin_rerun, timer, KIND_RERUN
+from services.openai_service import OpenAIService
+from ui.styles import inject_custom_css
+from ui.sidebar import display_sidebar
+from ui.components import header
+
+begin_rerun()
+with timer("rerun", KIND_RERUN):
+    init_session_state()
+    inject_custom_css()
+    openai_service = OpenAIService()
+    load_persisted_history()
+    header()
+    display_sidebar()
+    for tab, container in zip(TABS, st.tabs(list(TABS.values()))):
+        with container:
+            load_section(tab)(openai_service)
+"""
+
+LAYOUTS = ("tabs", "selected")
+
+def _new_app(layout, api_key, timeout):
+    """Tworzy aplikację testową dla układu."""
+    from streamlit.testing.v1 import AppTest
+    if layout == "tabs":
+        app = AppTest.from_string(TABS_LAYOUT_SCRIPT, default_timeout=timeout)
+    else:
+        app = AppTest.from_file(os.path.join(ROOT_DIR, "app.py"), default_timeout=timeout)
+    app.session_state["api_key"] = api_key
+    return app
+
+def _run(app):
+    """Wykonuje odświeżenie i zwraca jego czas (ms)."""
+    started = time.perf_counter()
+    app.run()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if app.exception:
+        raise Exception(f"Błąd aplikacji: {app.exception[0].message}")
+    return elapsed_ms
+
+def measure(layout, tab, reruns, api_key, timeout):
+    """
+    Mierzy kolejne odświeżenia aplikacji z wybraną zakładką.
+
+    Pierwsze odświeżenie (import modułów, rozgrzewka pamięci podręcznych) jest pomijane.
+
+    Args:
+        layout (str): "tabs" (wszystkie sekcje) lub "selected" (tylko wybrana).
+        tab (str): Klucz zakładki (zob. TABS).
+        reruns (int): Liczba mierzonych odświeżeń.
+        api_key (str): Klucz API przekazywany do serwera testowego.
+        timeout (float): Limit czasu jednego odświeżenia (sek.).
+
+    Returns:
+        dict: Percentyle czasu przebiegu i pomiaru "rerun" (ms).
+    """
+    app = _new_app(layout, api_key, timeout)
+    if layout == "selected":
+        app.session_state["current_tab"] = tab
+    _run(app)
+
+    timings.clear()
+    wall_ms = [_run(app) for _ in range(reruns)]
+    rerun_ms = [entry["duration_ms"] for entry in timings.records(name="rerun")]
+    return {
+        "layout": layout,
+        "tab": tab,
+        "reruns": reruns,
+        "wall_p50_ms": percentile(wall_ms, 50),
+        "wall_p95_ms": percentile(wall_ms, 95),
+        "rerun_p50_ms": percentile(rerun_ms, 50),
+        "rerun_p95_ms": percentile(rerun_ms, 95),
+    }
+
+def _format_ms(value):
+    """Formatuje czas w milisekundach (brak pomiaru jako "-")."""
+    return "-" if value is None else f"{value:.1f}"
+
+def _layout_mean(rows, layout, field):
+    """Zwraca średnią wartości pola dla układu (None bez pomiarów)."""
+    values = [row[field] for row in rows if row["layout"] == layout and row[field] is not None]
+    return statistics.fmean(values) if values else None
+
+def print_report(rows):
+    """Wypisuje tabelę wyników i średnie przyspieszenie (całego przebiegu i kodu aplikacji)."""
+    print(f"{'Układ':<10} {'Zakładka':<12} {'p50 [ms]':>10} {'p95 [ms]':>10} {'rerun p50':>10} {'rerun p95':>10}")
+    for row in rows:
+        print(
+            f"{row['layout']:<10} {row['tab']:<12} {_format_ms(row['wall_p50_ms']):>10} "
+            f"{_format_ms(row['wall_p95_ms']):>10} {_format_ms(row['rerun_p50_ms']):>10} "
+            f"{_format_ms(row['rerun_p95_ms']):>10}"
+        )
+    # Czas AppTest.run obejmuje stały narzut Streamlit, "rerun" - tylko kod aplikacji
+    print()
+    for field, label in (("wall_p50_ms", "przebieg p50"), ("rerun_p50_ms", "rerun p50"), ("rerun_p95_ms", "rerun p95")):
+        before = _layout_mean(rows, "tabs", field)
+        after = _layout_mean(rows, "selected", field)
+        if before and after:
+            print(f"Średnio {label}: wszystkie zakładki {before:.1f} ms, wybrana zakładka {after:.1f} ms "
+                  f"({before / after:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Czas odświeżenia Afirmatora: st.tabs i tylko wybrana zakładka")
+    parser.add_argument("--reruns", type=int, default=20, help="Liczba mierzonych odświeżeń dla zakładki")
+    parser.add_argument("--tabs", nargs="*", choices=list(TABS), default=list(TABS), help="Mierzone zakładki")
+    parser.add_argument("--layout", choices=LAYOUTS, help="Tylko jeden układ (domyślnie oba)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Limit czasu odświeżenia (sek.)")
+    parser.add_argument("--json", help="Zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        print("Pomiar wymaga pakietu streamlit (pip install -r requirements.txt)", file=sys.stderr)
+        sys.exit(1)
+
+    # Sekcje wywołują API tylko po kliknięciu, ale serwis wymaga adresu
+    server, base_url = start_in_background()
+    os.environ["OPENAI_BASE_URL"] = base_url
+    # Wywołanie w app.py niczego już nie uruchamia
+    start_warmup(background=False)
+
+    rows = []
+    for layout in ([args.layout] if args.layout else LAYOUTS):
+        for tab in args.tabs:
+            rows.append(measure(layout, tab, args.reruns, "mock-key", args.timeout))
+
+    print_report(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as report_file:
+            json.dump(rows, report_file, indent=2, ensure_ascii=False)
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Przeglądarka śladów akcji użytkownika zapisanych przez monitoring/tracing.py.
+
+Lista ostatnich akcji (najwolniejsze na górze z opcją --slowest):
+    python -m tools.trace_viewer
+    python -m tools.trace_viewer --name music.generate --slowest
+
+Drzewo spanów jednego śladu z osią czasu (wystarczy początek identyfikatora):
+    python -m tools.trace_viewer --trace 3f2a
+
+Podsumowanie w stylu wykresu płomieniowego - czas własny każdej ścieżki spanów
+we wszystkich śladach (--folded wypisuje format dla flamegraph.pl / speedscope):
+    python -m tools.trace_viewer --summary --name music.generate
+    python -m tools.trace_viewer --folded > music.folded
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+from services.stats import percentile
+from config.constants import TRACE_LOG_PATH
+
+BAR_WIDTH = 40
+
+def load_spans(path):
+    """
+    Wczytuje spany z pliku śladów (oraz z poprzedniego pliku po rotacji, "<plik>.1").
+
+    Args:
+        path (str): Plik JSON Lines.
+
+    Returns:
+        list: Słowniki spanów (uszkodzone linie są pomijane).
+    """
+    spans = []
+    for candidate in (path + ".1", path):
+        if not os.path.exists(candidate):
+            continue
+        with open(candidate, encoding="utf-8") as trace_file:
+            for line in trace_file:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    return spans
+
+def group_traces(spans):
+    """
+    Grupuje spany według śladów.
+
+    Args:
+        spans (list): Słowniki spanów.
+
+    Returns:
+        list: Ślady od najstarszego; każdy to słownik z kluczami trace_id, root i spans.
+              Ślady bez spanu głównego są pomijane.
+    """
+    grouped = {}
+    for span in spans:
+        grouped.setdefault(span["trace_id"], []).append(span)
+    traces = []
+    for trace_id, trace_spans in grouped.items():
+        roots = [span for span in trace_spans if span.get("parent_id") is None]
+        if roots:
+            traces.append({"trace_id": trace_id, "root": roots[0], "spans": trace_spans})
+    traces.sort(key=lambda trace: trace["root"]["start"])
+    return traces
+
+def build_tree(trace_spans):
+    """
+    Buduje drzewo spanów.
+
+    Args:
+        trace_spans (list): Spany jednego śladu.
+
+    Returns:
+        dict: span_id -> lista spanów podrzędnych (posortowanych według początku);
+              klucz None zawiera span główny.
+    """
+    children = {}
+    for span in trace_spans:
+        children.setdefault(span.get("parent_id"), []).append(span)
+    for group in children.values():
+        group.sort(key=lambda span: span["start"])
+    return children
+
+def self_times(trace_spans):
+    """
+    Liczy czas własny każdej ścieżki spanów (bez czasu spanów podrzędnych).
+
+    Args:
+        trace_spans (list): Spany jednego śladu.
+
+    Returns:
+        dict: Ścieżka ("korzeń;dziecko;...") -> czas własny w milisekundach.
+    """
+    children = build_tree(trace_spans)
+    result = {}
+
+    def visit(span, prefix):
+        path = f"{prefix};{span['name']}" if prefix else span["name"]
+        nested = children.get(span["span_id"], [])
+        own = max(0.0, span["duration_ms"] - sum(child["duration_ms"] for child in nested))
+        result[path] = result.get(path, 0.0) + own
+        for child in nested:
+            visit(child, path)
+
+    for root in children.get(None, []):
+        visit(root, "")
+    return result
+
+def _format_time(timestamp):
+    """Formatuje czas rozpoczęcia spanu."""
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+def print_trace_list(traces, limit):
+    """Wypisuje listę śladów."""
+    print(f"{'Identyfikator':<18} {'Początek':<20} {'Akcja':<28} {'Czas [ms]':>10}  Spany  Status")
+    for trace in traces[:limit]:
+        root = trace["root"]
+        errors = sum(1 for span in trace["spans"] if span.get("status") == "error")
+        status = f"błędy: {errors}" if errors else "ok"
+        print(
+            f"{trace['trace_id']:<18} {_format_time(root['start']):<20} {root['name']:<28} "
+            f"{root['duration_ms']:>10.1f}  {len(trace['spans']):>5}  {status}"
+        )
+
+def print_trace_tree(trace):
+    """Wypisuje drzewo spanów śladu z osią czasu względem spanu głównego."""
+    root = trace["root"]
+    total_ms = max(root["duration_ms"], 0.001)
+    children = build_tree(trace["spans"])
+    print(f"Ślad {trace['trace_id']} - {root['name']}, {_format_time(root['start'])}, {root['duration_ms']:.1f} ms\n")
+
+    def visit(span, depth):
+        offset_ms = (span["start"] - root["start"]) * 1000
+        begin = min(BAR_WIDTH - 1, int(BAR_WIDTH * offset_ms / total_ms))
+        length = max(1, int(round(BAR_WIDTH * span["duration_ms"] / total_ms)))
+        bar = (" " * begin + "█" * length)[:BAR_WIDTH].ljust(BAR_WIDTH)
+        label = ("  " * depth + span["name"])[:48]
+        marker = "  ✗ " + span.get("error", "") if span.get("status") == "error" else ""
+        print(f"{label:<48} {span['duration_ms']:>10.1f} ms {span['duration_ms'] / total_ms:>6.1%} |{bar}|{marker}")
+        for key, value in (span.get("attributes") or {}).items():
+            print(f"{'  ' * (depth + 1)}· {key}={value}")
+        for child in children.get(span["span_id"], []):
+            visit(child, depth + 1)
+
+    visit(root, 0)
+
+def summarize(traces):
+    """
+    Podsumowuje czasy własne ścieżek spanów we wszystkich śladach.
+
+    Args:
+        traces (list): Ślady z group_traces.
+
+    Returns:
+        list: Słowniki (path, traces, total_ms, mean_ms, p95_ms, share) od największego udziału.
+    """
+    per_path = {}
+    for trace in traces:
+        for path, own_ms in self_times(trace["spans"]).items():
+            per_path.setdefault(path, []).append(own_ms)
+    grand_total = sum(sum(values) for values in per_path.values()) or 1.0
+    rows = []
+    for path, values in per_path.items():
+        rows.append({
+            "path": path,
+            "traces": len(values),
+            "total_ms": sum(values),
+            "mean_ms": statistics.fmean(values),
+            "p95_ms": percentile(values, 95),
+            "share": sum(values) / grand_total,
+        })
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows
+
+def print_summary(rows, limit):
+    """Wypisuje podsumowanie czasów własnych."""
+    print(f"{'Ścieżka spanów (czas własny)':<64} {'Śladów':>6} {'Średnio':>10} {'p95':>10} {'Udział':>7}")
+    for row in rows[:limit]:
+        bar = "█" * max(1, int(round(20 * row["share"])))
+        print(
+            f"{row['path'][-64:]:<64} {row['traces']:>6} {row['mean_ms']:>8.1f}ms "
+            f"{row['p95_ms']:>8.1f}ms {row['share']:>7.1%} {bar}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Przeglądarka śladów akcji Afirmatora")
+    parser.add_argument("--file", default=TRACE_LOG_PATH, help="Plik śladów JSON Lines")
+    parser.add_argument("--name", help="Tylko akcje o tej nazwie (np. music.generate)")
+    parser.add_argument("--trace", help="Pokaż drzewo śladu o tym identyfikatorze (lub jego początku)")
+    parser.add_argument("--slowest", action="store_true", help="Sortuj listę od najwolniejszej akcji")
+    parser.add_argument("--summary", action="store_true", help="Czas własny ścieżek spanów we wszystkich śladach")
+    parser.add_argument("--folded", action="store_true", help="Format stosów dla flamegraph.pl / speedscope")
+    parser.add_argument("--limit", type=int, default=20, help="Liczba pozycji na liście")
+    args = parser.parse_args()
+
+    if not args.file or not os.path.exists(args.file):
+        print(f"Brak pliku śladów: {args.file}", file=sys.stderr)
+        sys.exit(1)
+
+    traces = group_traces(load_spans(args.file))
+    if args.name:
+        traces = [trace for trace in traces if trace["root"]["name"] == args.name]
+    if not traces:
+        print("Brak śladów.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.trace:
+        matches = [trace for trace in traces if trace["trace_id"].startswith(args.trace)]
+        if not matches:
+            print(f"Nie znaleziono śladu {args.trace}", file=sys.stderr)
+            sys.exit(1)
+        print_trace_tree(matches[-1])
+    elif args.folded:
+        totals = {}
+        for trace in traces:
+            for path, own_ms in self_times(trace["spans"]).items():
+                totals[path] = totals.get(path, 0.0) + own_ms
+        for path, own_ms in sorted(totals.items()):
+            # Wartości w mikrosekundach - format stosów wymaga liczb całkowitych
+            print(f"{path} {int(round(own_ms * 1000))}")
+    elif args.summary:
+        print_summary(summarize(traces), args.limit)
+    else:
+        if args.slowest:
+            traces = sorted(traces, key=lambda trace: trace["root"]["duration_ms"], reverse=True)
+        else:
+            traces = list(reversed(traces))
+        print_trace_list(traces, args.limit)
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 Współdzielone komponenty interfejsu użytkownika - wersja ulepszona.
 """
 import streamlit as st
+from config.constants import TABS, TAB_WIDGET_KEYS
 
 def header():
     """
@@ -17,12 +18,45 @@ def header():
 
 def create_tabs():
     """
-    Tworzy zakładki aplikacji z ikonkami.
+    Tworzy nawigację między zakładkami aplikacji.
+    
+    W przeciwieństwie do st.tabs, które wykonuje kod wszystkich zakładek przy każdym
+    odświeżeniu, wybór jest zapisywany w stanie sesji ("current_tab"), więc aplikacja
+    może wykonać tylko widoczną sekcję.
     
     Returns:
-        tuple: Obiekty zakładek (tab1, tab2, tab3, tab4, tab5).
+        str: Klucz wybranej zakładki (zob. TABS).
+    """
+    current_tab = st.radio(
+        "Zakładka",
+        options=list(TABS),
+        format_func=TABS.get,
+        horizontal=True,
+        key="current_tab",
+        label_visibility="collapsed"
+    )
+    keep_hidden_tab_state(current_tab)
+    return current_tab
+
+def keep_hidden_tab_state(current_tab):
     """
-    return st.tabs(["🌟 Afirmacja dnia", "🛠️ Generator afirmacji", "🎨 Wizualny cytat", "🎧 Czytanie afirmacji", "🎵 Muzyczna afirmacja"])
+    Zachowuje wartości widżetów zakładek, które nie są wyświetlane w tym odświeżeniu.
+    
+    Streamlit usuwa po odświeżeniu stan widżetów, które nie zostały wyrenderowane,
+    więc po powrocie do zakładki jej formularz byłby pusty. Przypisanie wartości
+    do tego samego klucza zamienia ją w zwykłą wartość stanu sesji, która przetrwa
+    do ponownego wyrenderowania widżetu. Widżety wybranej zakładki są pomijane -
+    ustawienie ich wartości w tym samym odświeżeniu wywołałoby ostrzeżenie Streamlit.
+    
+    Args:
+        current_tab (str): Klucz wybranej zakładki (zob. TABS).
+    """
+    for tab, keys in TAB_WIDGET_KEYS.items():
+        if tab == current_tab:
+            continue
+        for key in keys:
+            if key in st.session_state:
+                st.session_state[key] = st.session_state[key]
 
 def api_key_input():
     """
@@ -108,6 +142,31 @@ def affirmation_card(text):
         unsafe_allow_html=True
     )
 
+def stream_affirmation_card(token_stream, placeholder=None):
+    """
+    Wyświetla afirmację w karcie, dopisując kolejne fragmenty na bieżąco.
+    
+    Args:
+        token_stream (iterable): Strumień fragmentów tekstu afirmacji.
+        placeholder (DeltaGenerator, optional): Miejsce (st.empty) na kartę.
+                                                Jeśli None, tworzy nowe.
+        
+    Returns:
+        tuple: (placeholder, text) - miejsce z kartą oraz pełny tekst bez cudzysłowów.
+    """
+    if placeholder is None:
+        placeholder = st.empty()
+    text = ""
+    for token in token_stream:
+        text += token
+        with placeholder.container():
+            affirmation_card(text.lstrip('"') + "▌")
+    
+    text = text.strip('"')
+    with placeholder.container():
+        affirmation_card(text)
+    return placeholder, text
+
 def button_with_icon(label, icon="", key=None, help=None, type="primary", use_container_width=True):
     """
     Tworzy przycisk z ikonką.
@@ -152,6 +211,23 @@ def centered_text(text, size="medium"):
         </div>
     """, unsafe_allow_html=True)
 
+def section_header(title, subtitle=None):
+    """
+    Wyświetla nagłówek sekcji zakładki (tytuł i podtytuł) jako jeden element.
+    
+    Odstępy i wyrównanie pochodzą z arkusza stylów (klasa section-header),
+    więc przy odświeżeniu wysyłany jest tylko krótki fragment HTML.
+    
+    Args:
+        title (str): Tytuł sekcji.
+        subtitle (str, optional): Podtytuł.
+    """
+    subtitle_html = f"<h8>{subtitle}</h8>" if subtitle else ""
+    st.markdown(
+        f'<div class="section-header"><h2>{title}</h2>{subtitle_html}</div>',
+        unsafe_allow_html=True
+    )
+
 def spacer(height="1rem"):
     """
     Dodaje odstęp pionowy.
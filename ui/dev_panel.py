@@ -0,0 +1,132 @@
+"""
+Panel deweloperski z pomiarami czasu i decyzjami routera modeli
+(włączany zmienną AFIRMATOR_DEV_PANEL=1).
+"""
+import datetime
+import streamlit as st
+from monitoring.timing import timings
+from services.model_router import model_router
+from config.constants import TIMING_WINDOW_SECONDS, LATENCY_WINDOW_SECONDS
+
+def _bucket_label(bound, previous):
+    """Zwraca opis przedziału histogramu."""
+    if bound is None:
+        return f"> {previous} ms"
+    return f"≤ {bound} ms"
+
+def _format_seconds(value):
+    """Formatuje opóźnienie w sekundach (None jako brak próbek)."""
+    return "-" if value is None else round(value, 2)
+
+def _display_router_section():
+    """
+    Wyświetla opóźnienia modeli i ostatnie decyzje routera.
+    """
+    series = model_router.series()
+    if not series:
+        return
+    
+    st.caption(f"Router modeli - ostatnie {LATENCY_WINDOW_SECONDS // 60} min")
+    rows = []
+    for model, call in series:
+        stats = model_router.latency_stats(model, call)
+        rows.append({
+            "Model": model,
+            "Wywołanie": call,
+            "Udane": stats["count"],
+            "Nieudane": stats["failures"],
+            "p50 [s]": _format_seconds(stats["p50"]),
+            "p95 [s]": _format_seconds(stats["p95"]),
+        })
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    
+    st.caption("Ostatnie decyzje routera")
+    st.dataframe(
+        [
+            {
+                "Czas": datetime.datetime.fromtimestamp(decision["timestamp"]).strftime("%H:%M:%S"),
+                "Zastosowanie": decision["use_case"],
+                "Wywołanie": decision["call"],
+                "Model": decision["model"],
+                "Powód": decision["reason"],
+                "Czas [s]": round(decision["latency"], 2),
+                "OK": "✓" if decision["ok"] else "✗",
+            }
+            for decision in model_router.recent_decisions(limit=20)
+        ],
+        hide_index=True,
+        use_container_width=True
+    )
+
+def display_dev_panel():
+    """
+    Wyświetla czasy ostatniego odświeżenia, decyzje routera modeli
+    oraz statystyki z okna kroczącego.
+    """
+    with st.expander("🛠️ Panel deweloperski", expanded=False):
+        rerun_id = st.session_state.get("last_rerun_id")
+        if rerun_id:
+            st.caption("Ostatnie odświeżenie")
+            st.dataframe(
+                [
+                    {"Pomiar": entry["name"], "ms": round(entry["duration_ms"], 1)}
+                    for entry in timings.records(rerun=rerun_id)
+                ],
+                hide_index=True,
+                use_container_width=True
+            )
+        
+        _display_router_section()
+        
+        summary = timings.summary()
+        if not summary:
+            st.caption("Brak pomiarów.")
+            return
+        
+        st.caption(f"Ostatnie {TIMING_WINDOW_SECONDS // 60} min")
+        st.dataframe(
+            [
+                {
+                    "Pomiar": row["name"],
+                    "Rodzaj": row["kind"],
+                    "Liczba": row["count"],
+                    "p50 [ms]": round(row["p50_ms"], 1),
+                    "p95 [ms]": round(row["p95_ms"], 1),
+                    "max [ms]": round(row["max_ms"], 1),
+                    "Błędy": row["errors"],
+                }
+                for row in summary
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+        
+        # Histogram wybranego pomiaru
+        selected = st.selectbox("Histogram:", [row["name"] for row in summary], key="dev_panel_histogram")
+        row = next(row for row in summary if row["name"] == selected)
+        buckets = row["histogram"]
+        st.dataframe(
+            [
+                {
+                    "Przedział": _bucket_label(bound, buckets[index - 1][0] if index else 0),
+                    "Liczba": count,
+                }
+                for index, (bound, count) in enumerate(buckets)
+            ],
+            column_config={
+                "Liczba": st.column_config.ProgressColumn(
+                    "Liczba", format="%d", min_value=0, max_value=max(1, row["count"])
+                )
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+        
+        st.download_button(
+            "💾 Pobierz pomiary (JSON Lines)",
+            data=timings.to_jsonl(),
+            file_name="afirmator_timings.jsonl",
+            mime="application/x-ndjson",
+            use_container_width=True,
+            key="dev_panel_export"
+        )
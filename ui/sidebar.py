@@ -1,9 +1,19 @@
 """
 Komponenty interfejsu dla panelu bocznego - wersja ulepszona.
 """
+import logging
 import streamlit as st
+from modules.history_store import get_history_store
+from modules.utils import get_user_id, clear_session_blob, get_session_id
 from ui.components import button_with_icon
+from ui.dev_panel import display_dev_panel
+from monitoring.timing import timed, KIND_SECTION
+from monitoring.metrics import CACHE_REQUESTS, CHAT_REQUESTS, CONTENT_SERVED, OUTCOME_OK
+from config.constants import DEV_PANEL_ENABLED
 
+logger = logging.getLogger(__name__)
+
+@timed(KIND_SECTION)
 def display_sidebar():
     """
     Wyświetla zawartość panelu bocznego z ulepszonym wyglądem.
@@ -30,6 +40,11 @@ def display_sidebar():
         # Pomoc i wsparcie
         _display_help_section()
         
+        # Pomiary czasu (tylko z AFIRMATOR_DEV_PANEL=1)
+        if DEV_PANEL_ENABLED:
+            st.markdown("---")
+            display_dev_panel()
+        
         # Footer
         st.markdown("""
             <div class="sidebar-footer">
@@ -55,11 +70,14 @@ def _display_history_section():
         )
         st.markdown("<div style='margin-bottom: 0.rem;'></div>", unsafe_allow_html=True)  # Spacer
         
-        # Filtrowanie historii
-        filtered_history = [
-            aff for aff in st.session_state.history 
-            if search_term.lower() in aff.lower()
-        ] if search_term else st.session_state.history
+        # Nowe wyszukiwanie zaczyna się od pierwszej strony
+        if st.session_state.get("history_page_query") != search_term:
+            st.session_state.history_page_query = search_term
+            st.session_state.history_page = 0
+        page = st.session_state.get("history_page", 0)
+        
+        # Wyszukiwanie w pełnej historii użytkownika (indeks pełnotekstowy)
+        filtered_history, has_more = _search_history(search_term, page)
         
         if filtered_history:
             # Dodajemy własny styl dla selectbox
@@ -88,39 +106,102 @@ def _display_history_section():
                     </div>
                 """, unsafe_allow_html=True)
                 
+                # Podobne afirmacje z bieżącej sesji (indeks MinHash)
+                similar = st.session_state.history.similar_to(selected, limit=3)
+                if similar:
+                    st.caption(f"Podobne afirmacje w historii: {len(similar)}")
+                
                 if button_with_icon("Użyj tej afirmacji", "▶️", key="use_history_affirmation"):
                     st.session_state.edited_affirmation = selected
                     st.session_state.affirmation = selected
-                    st.session_state.audio_data = None
+                    clear_session_blob('audio_data')
                     st.session_state.current_tab = "generator"
                     st.rerun()
+            
+            # Stronicowanie wyników
+            if page > 0 or has_more:
+                col_prev, col_next = st.columns(2)
+                with col_prev:
+                    if page > 0 and st.button("◀ Nowsze", use_container_width=True, key="history_prev_page"):
+                        st.session_state.history_page = page - 1
+                        st.rerun()
+                with col_next:
+                    if has_more and st.button("Starsze ▶", use_container_width=True, key="history_next_page"):
+                        st.session_state.history_page = page + 1
+                        st.rerun()
         else:
             st.markdown("<p style='color: rgba(255, 255, 255, 0.8);'>Nie znaleziono afirmacji pasujących do wyszukiwania.</p>", unsafe_allow_html=True)
     else:
         st.markdown("<p style='color: rgba(255, 255, 255, 0.8);'>Historia jest pusta. Stwórz swoją pierwszą afirmację!</p>", unsafe_allow_html=True)
 
+def _search_history(search_term, page):
+    """
+    Wyszukuje afirmacje w historii użytkownika.
+    
+    Args:
+        search_term (str): Wyszukiwana fraza (może być pusta).
+        page (int): Numer strony wyników (od 0).
+        
+    Returns:
+        tuple: (lista afirmacji, czy istnieje kolejna strona)
+    """
+    user_id = get_user_id()
+    if user_id is not None:
+        try:
+            return get_history_store().search(user_id, search_term, page)
+        except Exception:
+            logger.exception("Nie udało się przeszukać historii afirmacji")
+    
+    # Bez trwałej historii przeszukujemy afirmacje z bieżącej sesji
+    filtered_history = [
+        aff for aff in st.session_state.history 
+        if search_term.lower() in aff.lower()
+    ] if search_term else st.session_state.history.to_list()
+    return filtered_history, False
+
 def _display_stats_section():
     """
     Wyświetla statystyki użytkowania aplikacji.
+    
+    Liczniki bieżącej sesji pochodzą z rejestru metryk (wartości sesji, zob.
+    monitoring/metrics.py). Skuteczność wspólnej pamięci podręcznej nagrań dotyczy
+    całego serwera, tak jak sumy na punkcie końcowym /metrics.
     """
     st.markdown("<h3 style='color: white;'>📊 Statystyki</h3>", unsafe_allow_html=True)
     
+    session_id = get_session_id()
     total_affirmations = len(st.session_state.history)
+    ai_requests = CHAT_REQUESTS.session_value(session_id, outcome=OUTCOME_OK)
+    recordings = (
+        CONTENT_SERVED.session_value(session_id, kind="speech")
+        + CONTENT_SERVED.session_value(session_id, kind="music")
+    )
+    cache_hits = CACHE_REQUESTS.value(cache="tts", result="hit")
+    cache_total = CACHE_REQUESTS.value(cache="tts")
     
     col1, col2 = st.columns(2)
     with col1:
         st.metric(
             label="Wygenerowane",
             value=total_affirmations,
-            help="Łączna liczba wygenerowanych afirmacji"
+            help="Afirmacje w historii tej sesji"
+        )
+        st.metric(
+            label="Nagrania",
+            value=int(recordings),
+            help="Nagrania utworzone w tej sesji"
         )
     
     with col2:
-        # Można dodać więcej statystyk w przyszłości
         st.metric(
-            label="Dzisiaj",
-            value=1 if st.session_state.get('daily_affirmation') else 0,
-            help="Afirmacje wygenerowane dzisiaj"
+            label="Zapytania AI",
+            value=int(ai_requests),
+            help="Udane zapytania do modelu w tej sesji"
+        )
+        st.metric(
+            label="Cache nagrań (serwer)",
+            value=f"{cache_hits / cache_total:.0%}" if cache_total else "-",
+            help="Odsetek nagrań wszystkich użytkowników serwera podanych z pamięci podręcznej, bez zapytania do API"
         )
 
 def _display_help_section():
@@ -1,11 +1,25 @@
 """
 Style CSS dla aplikacji Afirmator - wersja z naprawionymi gradientami.
+
+Arkusz stylów jest składany i minifikowany raz na proces serwera (dla każdego
+motywu) i wysyłany do przeglądarki raz na sesję - kolejne odświeżenia go nie wysyłają.
 """
+import hashlib
+import json
+import re
 import streamlit as st
+import streamlit.components.v1 as components
+from monitoring.timing import timed, KIND_SECTION
 
-def inject_custom_css():
+def _css_source(theme):
     """
-    Wstrzykuje niestandardowy CSS do aplikacji.
+    Zwraca pełny (nieskompresowany) arkusz stylów dla motywu.
+    
+    Args:
+        theme (str): "light" lub "dark".
+        
+    Returns:
+        str: Kod CSS.
     """
     # Definicje kolorów dla trybów jasnego i ciemnego
     light_styles = """
@@ -117,6 +131,13 @@ def inject_custom_css():
         -webkit-text-fill-color: transparent;
         text-align: center;
     }
+    
+    /* Nagłówek sekcji (ui.components.section_header) */
+    .section-header {
+        text-align: center;
+        width: 100%;
+        padding: 2.5rem 0 1.5rem 0;
+    }
         
     /* Karty afirmacji */
     .affirmation-card {
@@ -484,13 +505,79 @@ def inject_custom_css():
     """
     
     # Wybór stylu w zależności od trybu
-    if st.session_state.get('theme', 'light') == 'light':
-        css = light_styles + common_styles
-    else:
-        css = dark_styles + common_styles
-    
-    st.markdown(f"""
-        <style>
-            {css}
-        </style>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    if theme == 'light':
+        return light_styles + common_styles
+    return dark_styles + common_styles
+
+def minify_css(css):
+    """
+    Usuwa z CSS komentarze i zbędne białe znaki.
+    
+    Args:
+        css (str): Kod CSS.
+        
+    Returns:
+        str: Skrócony kod CSS.
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    # Spacja przed dwukropkiem może należeć do selektora (np. "div :hover"), więc zostaje
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+@st.cache_resource
+def build_stylesheet(theme="light"):
+    """
+    Składa i minifikuje arkusz stylów (raz na proces dla każdego motywu).
+    
+    Args:
+        theme (str, optional): "light" lub "dark".
+        
+    Returns:
+        tuple: (skrócony kod CSS, skrót treści)
+    """
+    css = minify_css(_css_source(theme))
+    return css, hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+
+def _stylesheet_script(css, digest):
+    """
+    Tworzy skrypt umieszczający arkusz stylów w nagłówku strony aplikacji.
+    
+    Args:
+        css (str): Kod CSS.
+        digest (str): Skrót treści arkusza.
+        
+    Returns:
+        str: Kod HTML komponentu.
+    """
+    # "</" w treści zamknąłby znacznik <script>
+    css_literal = json.dumps(css).replace("</", "<\\/")
+    return f"""<script>
+    const doc = window.parent.document;
+    const current = doc.getElementById("afirmator-css");
+    if (!current || current.dataset.digest !== "{digest}") {{
+        const style = doc.createElement("style");
+        style.id = "afirmator-css";
+        style.dataset.digest = "{digest}";
+        style.textContent = {css_literal};
+        if (current) {{ current.remove(); }}
+        doc.head.appendChild(style);
+    }}
+    </script>"""
+
+@timed(KIND_SECTION)
+def inject_custom_css():
+    """
+    Wstrzykuje niestandardowy CSS do aplikacji (raz na sesję i motyw).
+    
+    Element <style> wysłany przez st.markdown znika po odświeżeniu, które go nie wysłało,
+    dlatego arkusz trafia do nagłówka strony przez skrypt w komponencie HTML. Styl
+    w nagłówku zostaje na stronie, więc kolejne odświeżenia sesji niczego nie wysyłają;
+    skrypt jest wysyłany ponownie tylko po zmianie motywu.
+    """
+    css, digest = build_stylesheet(st.session_state.get('theme', 'light'))
+    if st.session_state.get('injected_css') == digest:
+        return
+    components.html(_stylesheet_script(css, digest), height=0)
+    st.session_state.injected_css = digest
\ No newline at end of file